@@ -104,6 +104,112 @@
 #              0034     - Add a script logic to monitor the Intercom group connectivity and initiate back
 #                         a call to the intercom group with a prescribed delay. This is to make sure a
 #                         connectivity to the intercom group are always in tact and connected.
+#              0035     - Config file write-behind persistence. REST API config update are applied in memory first,
+#                         each config group file are then written once after a short coalescing window through
+#                         a write temporary file, fsync and rename sequence. Number of bytes written and fsync call
+#                         are available at /ricstats.
+#              0036     - Keyed config file loader. Config file are parsed in one pass by config key (SIPUSERNAME:,
+#                         DELAYAINDIV:, ICOMSET: ...), line order are not important and a missing key will use its
+#                         default value. Parsed config file are cached by inode/mtime/size. Config file edited
+#                         outside the daemon are detected by inotify and applied without restarting the daemon.
+#              0037     - Indexed SIP contact whitelist. Contact list are no longer limited to 100 entry, exact SIP
+#                         address use a hash set lookup, extension prefix and wildcard entry (sip:10*@server,
+#                         sip:*@server) use a prefix trie lookup. Run daemon with BENCHMARK macro for whitelist
+#                         lookup benchmark.
+#              0038     - REST Web API for SIP contact whitelist - list, add, remove and bulk import (/contacts).
+#                         Bulk import request body are parsed line by line (newline or CSV). Contact update are
+#                         appended to a journal file (sipradioCont.journal) and compacted into the contact list
+#                         file periodically. Contact whitelist are always loaded, filtering still need CALLFILTER.
+#              0039     - Add macro for production web server (PRODSERVER). REST web API are served by cheroot WSGI
+#                         server with a bounded worker thread pool and HTTP keep-alive, HTTP or HTTPS (SECURE).
+#                         Fall back to Flask web server if cheroot are not installed.
+#              0040     - Versioned REST API data set (ricinfo, voxconfig, sipconfig, intercomconfig). GET response
+#                         carry an ETag and are answered with 304 for a matching If-None-Match. JSON body are
+#                         cached until the data set changed.
+#              0041     - Daemon status stream (/ricinfo/stream) at stream web server port 5001. Each daemon status
+#                         change are pushed as a Server-Sent Events delta event with a sequence number, subscriber
+#                         can resume using Last-Event-ID. All subscriber are served by a single select() thread.
+#              0042     - WebSocket PTT control (/ptt) at stream web server port 5001. PTT_ON/PTT_OFF text frame are
+#                         authenticated by PTTTOKEN (SIP config file) and drive the PTT GPIO directly from the stream
+#                         web server thread, ACK are sent back immediately. PTT are released if the PTT holder
+#                         connection drop. Run daemon with BENCHMARK macro for frame to GPIO latency benchmark.
+#              0043     - Daemon status and config data set store (daemonStat, sipConfigData, voxParamData,
+#                         icomParamData). Each data set are a single slotted record guarded by a lock, multi field
+#                         update are applied, versioned and published at once. REST API response are serialized
+#                         from a consistent snapshot.
+#              0044     - DTMF PTT are received by linphone DTMF callback instead of the log message and no longer
+#                         sampled every 2 seconds. The first PTT key act immediately, repeated key within the
+#                         debounce time are ignored. DTMFPTTON/DTMFPTTOFF key (same key toggle the PTT) and
+#                         DTMFDEBOUNCE (ms) are set in SIP config file. PTT are released when the call END for all
+#                         manual PTT source. Run daemon with BENCHMARK macro for DTMF to GPIO latency benchmark.
+#              0045     - SIP client core iterate scheduler. Core are iterated every 10 ms during a call, registration
+#                         or after a SIP event, and back off up to 320 ms when idle. Config update and intercom mode
+#                         change wake up SIP client thread immediately. Wakeups/s, CPU usage and wake up latency
+#                         are available at /ricstats (sipcore).
+#              0046     - Multi-channel mode. Several radio are integrated to one RIC, each radio channel have its own
+#                         SIP account, sound card capture device, PTT/PTT mode GPIO, VOX controller serial port, config
+#                         file (sipradioCnfg.<ID>.conf, voxradioCnfg.<ID>.conf) and daemon status record. Channel are
+#                         listed in sipradioChan.list, primary channel (000) keep the original config file and are the
+#                         only channel serving the intercom mode. REST API config ID (/sipconfig/<ID>, /voxconfig/<ID>)
+#                         address the channel, WebSocket PTT control select the channel by ?channel=<ID>.
+#              0047     - PTT state machine. All PTT source (DTMF, SIP message, WebSocket, PTT time out, call end, PTT
+#                         mode change and intercom) drive the PTT through one table driven state machine (pttFsmTable).
+#                         PTT GPIO are written in order and only when the GPIO level changed. Each transition are time
+#                         stamped, event to GPIO latency for each PTT source are available at /ricstats (ptt).
+#              0048     - Daemon timer scheduler. PTT time out, alive LED blink, intercom rejoin delay and DTMF
+#                         debounce are monotonic clock deadline kept in one timer heap instead of the 0.5 s monitor
+#                         counter. PTT time out are armed when PTT ON and cancelled when PTT released, monitor thread
+#                         only wake up at the earliest armed deadline. Timer statistics are available at /ricstats
+#                         (timer).
+#              0049     - VOX controller serial reader and writer. Reader block on the serial port and pass each
+#                         received line to the writer immediately, writer send the config command from a queue, ACK
+#                         are matched as soon as received. Command resend and ALIVE request are daemon timer. Config
+#                         command round trip time are available at /ricstats (vox), run daemon with BENCHMARK macro for
+#                         round trip benchmark against a pty VOX controller stand-in.
+#              0050     - VOX config command queue. Each VOX parameter are queued once, repeated update of a queued
+#                         parameter only update its value (latest value sent). Command with the same value already
+#                         acknowledged by VOX controller are skipped. VOX config update are no longer ignored while
+#                         VOX controller busy, pending and in progress parameter are reported by REST API
+#                         (/voxconfig/<ID> PUT - voxcommand) and /ricstats (vox).
+#              0051     - VOX controller serial frame parser. Received data are parsed into <..> frame as it arrive,
+#                         partial and concatenated frame are handled. Frame are classified as ACK (<06>), NAK (<15>),
+#                         status (<03..>) or unknown, noise and broken frame are counted as framing error at
+#                         /ricstats (vox). NAK resend the config command immediately. Run daemon with BENCHMARK macro
+#                         for parser fuzz check and throughput.
+#              0052     - VOX profile transaction (/voxprofile/<ID> PUT). The whole Mode 1 or Mode 2 parameter set are
+#                         sent to VOX controller as one pipelined command sequence within one round trip budget. VOX
+#                         config file are written once after all ACK received, on NAK or time out all parameter are
+#                         rolled back and sent back to VOX controller with the previous value.
+#              0053     - VOX controller serial link telemetry. Round trip time histogram for each command, resend and
+#                         time out counter are available at /ricstats (vox). Command without ACK are resent with
+#                         exponential back off (1, 2, 4, 8 s) and reverted after 4 resend. VOX controller status are
+#                         OFFLINE after 3 ALIVE request (<03>) NOT answered and ALIVE again on any received frame.
+#              0054     - RIH VOX controller simulator. Run daemon with RIHSIM macro (RIHSIM=latency,loss,garbage,
+#                         disconnect) to talk to a simulated VOX controller at a pseudo-terminal (/tmp/rihsim_<ID>)
+#                         instead of the real serial port, with ACK delay (s), answer lost, garbage byte and serial
+#                         link disconnect probability. Primary channel serial port are set with VOXSERIAL=<path>
+#                         macro. Serial port are reopened every 1 s after the serial link lost.
+#              0055     - GPIO backend. PTT, PTT mode and ALIVE LED GPIO are written via Linux GPIO character device
+#                         (libgpiod), RPi.GPIO or mock GPIO (record each GPIO edge, daemon can run without GPIO).
+#                         Backend and primary channel GPIO are set at gpioCnfg.conf (BACKEND:AUTO/GPIOD/RPI/MOCK,
+#                         CHIP, PTTPIN, MODEPIN, ALIVELED). Run daemon with BENCHMARK macro for GPIO write latency.
+#              0056     - Simulation mode. Run daemon with SIMULATION macro (or SIMULATION=<config directory>) to run
+#                         the whole daemon without linphone, GPIO and VOX controller hardware. Simulated SIP core
+#                         inject incoming call, DTMF, SIP message and registration event, GPIO are mock GPIO, each
+#                         channel VOX controller are RIH simulator and config file are kept at a temporary directory.
+#                         Run with SIMULATION and BENCHMARK macro for end to end latency and REST API throughput.
+#              0057     - Log writer thread. Log record are queued and formatted and written to the log file by the
+#                         log writer thread, NOT by SIP client thread. Same log call site more than 20 time in 10 s
+#                         are suppressed and counted. linphone log below SIPLOG macro level (SIPLOG=debug/info/warning/
+#                         error, default warning) are dropped. Log statistics are available at /ricstats (log).
+#              0058     - Log ring buffer. Recent log event (time, level, subsystem, event and fields) are kept in
+#                         memory and available at /logs (?since=<sequence>&level=<level>&subsystem=<subsystem>&limit=
+#                         <count>, 200 log event by default).
+#                         Run daemon with LOGSPILL=<file> macro to append log event to a gzip JSON line file.
+#              0059     - Daemon metric at /metrics (Prometheus text format). Call accepted and declined, whitelist
+#                         hit and miss, PTT activation and airtime, PTT event to GPIO latency, VOX command round
+#                         trip time and resend, intercom join attempt, REST API latency and SIP core iterate lag.
+#                         Metric are updated by each thread without lock and summed when /metrics requested.
 #  
 #              ----------------------------------------------------------------------------------------------   
 # Author : Ahmad Bahari Nizam B. Abu Bakar.
@@ -112,6 +218,7 @@
 # Version: 1.1.1 - Add NEW feature [0019,0020,0021]. Please refer above description
 # Version: 1.1.2 - Bug fixing item [0023]. Please refer above description
 # Version: 1.2.1 - Add NEW feature [0024,0025,0026,0027,0028,0029,0030,0031,0032,0033,0034]. Please refer above description
+# Version: 1.3.1 - Add NEW feature [0035,0036,0037,0038,0039,0040,0041,0042,0043,0044,0045,0046,0047,0048,0049,0050,0051,0052,0053,0054,0055,0056,0057,0058,0059]. Please refer above description
 #
 # Date   : 24/06/2019 (INITIAL RELEASE DATE)
 #          UPDATED - 29/09/2019
@@ -123,10 +230,10 @@
 #          UPDATED - 16/03/2020 - 1.1.1
 #          UPDATED - 16/03/2020 - 1.1.2
 #          UPDATED - 20/08/2021 - 1.2.1
+#          UPDATED - 17/10/2026 - 1.3.1
 #
 #############################################################################################################
 
-import linphone
 import logging
 import logging.handlers
 import sys
@@ -134,13 +241,71 @@ import os
 import signal
 import time
 import thread
+import threading
+import ctypes
+import ctypes.util
+import struct
+import collections
+import functools
+import fcntl
+import json
+import select
+import tty
+import random
+import bisect
+import heapq
+import socket
+import ssl
+import base64
+import hashlib
+import hmac
+import tempfile
+import gzip
+import itertools
+
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+try:
+    import Queue
+except ImportError:
+    import queue as Queue
+try:
+    from urllib import unquote
+except ImportError:
+    from urllib.parse import unquote
 import serial
-import RPi.GPIO as GPIO
 
 # REST API library
 from flask import Flask
 from flask import jsonify
 from flask import request
+from flask import redirect
+from flask import abort
+
+# SIP library - Optional in simulation mode (SIMULATION macro), simulated SIP core are used instead
+try:
+    import linphone
+except ImportError:
+    linphone = None
+
+# Production web server library - Optional, fall back to Flask web server if not installed
+try:
+    from cheroot import wsgi as cherootWsgi
+    from cheroot.ssl.builtin import BuiltinSSLAdapter
+except ImportError:
+    cherootWsgi = None
+
+# GPIO library - Optional, GPIO backend are selected at gpioCnfg.conf
+try:
+    import gpiod
+except ImportError:
+    gpiod = None
+try:
+    import RPi.GPIO as RPiGPIO
+except (ImportError, RuntimeError):
+    RPiGPIO = None
 
 app = Flask(__name__)
             
@@ -152,22 +317,262 @@ logger.setLevel(logging.INFO)
 logfile = logging.handlers.TimedRotatingFileHandler('/tmp/sipradio.log', when="midnight", backupCount=3)
 formatter = logging.Formatter('%(asctime)s %(levelname)-8s %(message)s')
 logfile.setFormatter(formatter)
-logger.addHandler(logfile)
-
-# Setup GPIO 
-GPIO.setmode(GPIO.BCM)
-# GPIO4 for PTT activation
-GPIO.setup(4, GPIO.OUT)
-# GPIO17 for ALIVE indicator - Optional GPIO6
-#GPIO.setup(17, GPIO.OUT)
-GPIO.setup(6, GPIO.OUT)
-# GPIO12 for PTT mode selection
-GPIO.setup(12, GPIO.OUT)
-
-# Initialize GPIO4 for PTT activation
-GPIO.output(4, GPIO.LOW)
-# Initialize GPIO12 for PTT mode selection
-GPIO.output(12, GPIO.LOW)
+
+# Log writer - Log record are queued by the logging thread, formatted and written to the log file by the log
+# writer thread. Log record are dropped when the log writer are too slow and the queue full
+logQueueSize  = 4096   # Log record waiting for the log writer
+logRateBurst  = 20     # Same log call site allowed within the rate limit interval, the rest are suppressed
+logRateIntv   = 10     # Log message rate limit interval (s)
+logQueue      = Queue.Queue(logQueueSize)
+logStat       = {'queued' : 0, 'written' : 0, 'dropped' : 0, 'suppressed' : 0, 'sipfiltered' : 0,
+                 'spilled' : 0, 'errors' : 0}  # Log statistics
+logLevels     = {'debug' : logging.DEBUG, 'info' : logging.INFO, 'warning' : logging.WARNING,
+                 'error' : logging.ERROR, 'critical' : logging.CRITICAL}
+
+# Log ring buffer - Recent log event, (sequence, time, level, subsystem, event, fields)
+logRingSize   = 4096   # Log event kept in memory
+logPageSize   = 200    # Log event returned by /logs when the request do NOT carry limit, up to logRingSize
+logEventLen   = 48     # Maximum event name length, longer log message are kept as a MESSAGE event
+logRing       = collections.deque(maxlen=logRingSize)
+logRingSeq    = 0      # Last log event sequence number
+logRingLock   = threading.Lock()  # Guard log ring buffer
+logSpillFile  = ''     # Log event spill file (gzip JSON line), NO spill when NOT set - LOGSPILL macro
+logSpillBatch = 256    # Log event written to the spill file at once
+logSpillIntv  = 60     # Maximum time a log event waiting to be written to the spill file (s)
+logSpillMax   = 8388608  # Spill file size before the spill file are rotated (.1)
+logSpillBuf   = []     # Log event waiting to be written to the spill file
+logSpillTime  = time.time()
+logSpillLock  = threading.Lock()  # Guard spill file and log event waiting to be written
+
+# Log message rate limit - Same log call site (logger, source line and logEvent() event) are allowed logRateBurst
+# time in each rate limit interval, the suppressed count are added to the first log message of the next interval.
+# Log message are formatted before logged, so the message text do NOT tell apart the log call site.
+# linphone log are logged from one call site (sipLog), rate limited as a whole
+class logRateFilter(logging.Filter):
+    def __init__(self):
+        logging.Filter.__init__(self)
+        self.lock = threading.Lock()
+        self.window = {}        # Log call site -> [interval start time, log message count]
+        self.pruneTime = time.time()
+
+    def filter(self, record):
+        key = (record.name, record.pathname, record.lineno, getattr(record, 'event', None))
+        with self.lock:
+            window = self.window.get(key)
+            if window is None or record.created - window[0] >= logRateIntv:
+                # Expired rate limit interval are removed once each interval
+                if record.created - self.pruneTime >= logRateIntv:
+                    for oldKey in [ oldKey for oldKey in self.window if record.created - self.window[oldKey][0] >= logRateIntv ]:
+                        del self.window[oldKey]
+                    self.pruneTime = record.created
+                suppressed = window[1] - logRateBurst if window is not None else 0
+                self.window[key] = [record.created, 1]
+                if suppressed > 0:
+                    record.msg = '%s (%d same log message suppressed)' % (record.getMessage(), suppressed)
+                    record.args = None
+                return True
+            window[1] += 1
+            if window[1] > logRateBurst:
+                logStat['suppressed'] += 1
+                return False
+        return True
+
+# Append log record to the log ring buffer as a log event
+# Log event logged by logEvent() keep its subsystem, event and fields. Other log message are split by the daemon
+# log message format, 'DEBUG_<subsystem>: <event>: <value>'
+def logRingAppend(record):
+    global logRingSeq
+
+    subsystem = getattr(record, 'subsystem', None)
+    event = getattr(record, 'event', None)
+    fields = getattr(record, 'fields', None)
+    if event is None:
+        message = record.getMessage()
+        tag, sep, text = message.partition(': ')
+        if sep != '' and tag.startswith('DEBUG_'):
+            subsystem = subsystem or tag[6:]
+            message = text
+        event, sep, value = message.partition(': ')
+        fields = {'value' : value} if sep != '' else {}
+        if len(event) > logEventLen:
+            event = 'MESSAGE'
+            fields = {'message' : message}
+    if subsystem is None:
+        subsystem = 'DAEMON' if record.name == 'root' else record.name.upper()
+
+    with logRingLock:
+        logRingSeq += 1
+        logEntry = (logRingSeq, record.created, record.levelno, subsystem, event, fields)
+        logRing.append(logEntry)
+    if logSpillFile != '':
+        with logSpillLock:
+            logSpillBuf.append(logEntry)
+
+# Log event record for REST API and spill file
+def logEntryData(logEntry):
+    seq, created, levelno, subsystem, event, fields = logEntry
+    return {'seq' : seq, 'time' : round(created, 3), 'level' : logging.getLevelName(levelno),
+            'subsystem' : subsystem, 'event' : event, 'fields' : fields}
+
+# Write waiting log event to the spill file, one gzip member for each write
+def logSpill():
+    global logSpillTime
+
+    with logSpillLock:
+        logSpillTime = time.time()
+        if len(logSpillBuf) == 0:
+            return
+        logEntries = logSpillBuf[:]
+        del logSpillBuf[:len(logEntries)]
+        if os.path.exists(logSpillFile) and os.path.getsize(logSpillFile) >= logSpillMax:
+            os.rename(logSpillFile, logSpillFile + '.1')
+        spill = gzip.open(logSpillFile, 'ab')
+        spill.write(''.join([ json.dumps(logEntryData(logEntry)) + '\n' for logEntry in logEntries ]).encode('utf-8'))
+        spill.close()
+        logStat['spilled'] += len(logEntries)
+
+# Log a structured event - Log file line are 'DEBUG_<subsystem>: <event>: <field>=<value>, ...', log ring
+# buffer keep the fields
+def logEvent(subsystem, event, fields, level=logging.INFO):
+    text = ', '.join([ '%s=%s' % (key, fields[key]) for key in sorted(fields) ])
+    logger.log(level, "DEBUG_%s: %s: %s" % (subsystem, event, text),
+               extra={'subsystem' : subsystem, 'event' : event, 'fields' : fields})
+
+# Queue log record for the log writer thread, log record are NOT formatted here
+class logQueueHandler(logging.Handler):
+    def emit(self, record):
+        try:
+            logQueue.put_nowait(record)
+            logStat['queued'] += 1
+        except Queue.Full:
+            logStat['dropped'] += 1
+
+# Thread for log writer - Format and write queued log record to the log file, keep it at the log ring buffer
+def log_writer(threadname):
+    while True:
+        record = logQueue.get()
+        try:
+            logRingAppend(record)
+            logfile.handle(record)
+            logStat['written'] += 1
+            if len(logSpillBuf) >= logSpillBatch or (len(logSpillBuf) > 0 and time.time() - logSpillTime >= logSpillIntv):
+                logSpill()
+        except Exception:
+            logStat['errors'] += 1
+        finally:
+            logQueue.task_done()
+
+# Wait until queued log record are written, before the daemon terminated
+def flushLog(timeout=2.0):
+    endTime = time.time() + timeout
+    while logQueue.unfinished_tasks > 0 and time.time() < endTime:
+        time.sleep(0.01)
+    if logSpillFile != '':
+        try:
+            logSpill()
+        except (OSError, IOError):
+            logStat['errors'] += 1
+
+logHandler = logQueueHandler()
+logHandler.addFilter(logRateFilter())
+logger.addHandler(logHandler)
+thread.start_new_thread(log_writer, ("[log_writer]", ))
+
+# GPIO backend - Each backend set up a GPIO as output (initially LOW) and write the GPIO level
+# PTT activation and PTT mode selection GPIO are set up by each radio channel, ALIVE LED GPIO at start up
+# Linux GPIO character device via libgpiod, libgpiod 2.x (request_lines) and 1.x (Chip.get_line) are supported
+class gpiodGpio:
+    HIGH = 1
+    LOW = 0
+    name = 'GPIOD'
+
+    def __init__(self, chipPath):
+        self.chipPath = chipPath
+        self.chip = gpiod.Chip(chipPath)
+        self.lines = {}     # Requested GPIO line, GPIO -> line request
+        self.writes = 0
+        if hasattr(gpiod, 'request_lines'):
+            self.values = {self.LOW : gpiod.line.Value.INACTIVE, self.HIGH : gpiod.line.Value.ACTIVE}
+
+    def setup(self, pin):
+        if hasattr(gpiod, 'request_lines'):
+            settings = gpiod.LineSettings(direction=gpiod.line.Direction.OUTPUT, output_value=self.values[self.LOW])
+            self.lines[pin] = gpiod.request_lines(self.chipPath, consumer='sipradio', config={pin : settings})
+        else:
+            line = self.chip.get_line(pin)
+            line.request(consumer='sipradio', type=gpiod.LINE_REQ_DIR_OUT, default_vals=[self.LOW])
+            self.lines[pin] = line
+
+    def output(self, pin, level):
+        self.writes += 1
+        if hasattr(gpiod, 'request_lines'):
+            self.lines[pin].set_value(pin, self.values[level])
+        else:
+            self.lines[pin].set_value(level)
+
+# RPi.GPIO - Broadcom SoC GPIO number (BCM)
+class rpiGpio:
+    HIGH = 1
+    LOW = 0
+    name = 'RPI'
+
+    def __init__(self):
+        RPiGPIO.setwarnings(False)
+        RPiGPIO.setmode(RPiGPIO.BCM)
+        self.writes = 0
+
+    def setup(self, pin):
+        RPiGPIO.setup(pin, RPiGPIO.OUT, initial=RPiGPIO.LOW)
+
+    def output(self, pin, level):
+        self.writes += 1
+        RPiGPIO.output(pin, RPiGPIO.HIGH if level == self.HIGH else RPiGPIO.LOW)
+
+# Mock GPIO - Keep GPIO level in memory and record each GPIO edge, (time, GPIO, level)
+# Used when NO GPIO are available (daemon running off a Raspberry Pi) and by benchmark
+class mockGpio:
+    HIGH = 1
+    LOW = 0
+    name = 'MOCK'
+
+    def __init__(self):
+        self.level = {}     # Current GPIO level, GPIO -> level
+        self.edges = collections.deque(maxlen=4096)
+        self.writes = 0
+
+    def setup(self, pin):
+        self.level[pin] = self.LOW
+
+    def output(self, pin, level):
+        self.writes += 1
+        if self.level.get(pin) != level:
+            self.edges.append((time.time(), pin, level))
+        self.level[pin] = level
+
+    # GPIO edge time for one GPIO
+    def edgeTimes(self, pin):
+        return [ edgeTime for edgeTime, edgePin, level in list(self.edges) if edgePin == pin ]
+
+# Open GPIO backend - AUTO select libgpiod when GPIO character device exist, then RPi.GPIO, then mock GPIO
+def openGpio(backend, chipPath):
+    if backend == 'AUTO':
+        if gpiod is not None and os.path.exists(chipPath):
+            backend = 'GPIOD'
+        elif RPiGPIO is not None:
+            backend = 'RPI'
+        else:
+            backend = 'MOCK'
+
+    try:
+        if backend == 'GPIOD' and gpiod is not None:
+            return gpiodGpio(chipPath)
+        if backend == 'RPI' and RPiGPIO is not None:
+            return rpiGpio()
+    except (OSError, IOError, RuntimeError) as error:
+        logger.info("DEBUG_GPIO: Unable to open GPIO backend %s: %s" % (backend, error))
+    if backend != 'MOCK':
+        logger.info("DEBUG_GPIO: GPIO backend %s NOT available, use mock GPIO" % (backend))
+    return mockGpio()
 
 # Retrieve daemon configuration
 # Configuration parameter
@@ -180,60 +585,63 @@ GPIO.output(12, GPIO.LOW)
 # 7 - Audio multicast enable
 
 # Global declaration
-sipUserName  = ''    # SIP registrar username
-sipPswd      = ''    # SIP registrar password
-asteriskIP   = ''    # Asterisk server IP address
-micSet       = ''    # MIC setting
-pttToVal     = ''    # PTT time out value
-pttMode      = ''    # PTT control mode of operation
-micEnDis     = False # MIC enable or disable
-pttSet       = ''    # PTT setting
-pttEnDis     = False # PTT enable or disable
-audioSet     = ''    # Audio setting
-audioEnDis   = False # Audio enable or disable
-audMultSet   = ''    # Audio muticast setting
-audMultEnDis = False # Audio multicast enable or disable
+# SIP setting, PTT and VOX controller status are kept for each radio channel (radioChannel)
 callStatus   = ''    # Current RIC call status
 currCallId   = ''    # 
 
-pttCnt       = 0     # PTT sampling counter
 lengthStr    = 0     # String manipulation length
-pttTOcnt     = 0     # PTT time out counter
-ledBlnkCnt   = 0     # Alive LED blinking counter
-pttTimeOut   = 0     # PTT time out value from config file
-pttModeOper  = 0     # PTT mode of operation value from config file
-dtmfSmplCnt  = 0     # DTMF character '#' sampling counter
-dtmfRx       = False # Receive DTMF character '#'
-DTMFMETHOD   = True  # DTMF logic new method
-
-pttRx        = False
-wdog         = False
-ledEn        = False
-callconn     = False
-pttIsON      = False
-
-voxStatus      = ''  # Current VOX controller status
-delayaindiv    = ''  # VOX PTT delay analog input delay division factor
-pDelayaindiv   = ''  # Previous value for VOX PTT delay analog input delay division factor
-delayvaladd    = ''  # VOX PTT delay addition factor
-pDelayvaladd   = ''  # Previous value for VOX PTT delay addition factor
-threshmultp    = ''  # VOX threshold analog input multiplication factor
-pThreshmultp   = ''  # Previous value for VOX threshold analog input multiplication factor
-threshadd      = ''  # VOX threshold analog input addition factor
-pThreshadd     = ''  # Previous value for VOX threshold analog input addition factor
-delayvalue     = ''  # VOX total delay
-pDelayvalue    = ''  # Previous value for VOX total delay
-thresholdvalue = ''  # VOX total threshold
-pThresvalue    = ''  # Previous value for VOX total threshold
-voxMode        = ''  # VOX controller current mode
-pVoxMode       = ''  # Previous value for VOX controller current mode
-
-sendCmdType    = 0   # VOX command type to send
-commBusy    = False  # Communication still active between RIC and VOX during configuring process
+ledBlinkOff  = 0.5   # Alive LED OFF time for each blink (s)
+dtmfStat     = {'received' : 0, 'debounced' : 0, 'ptt' : 0}  # DTMF PTT statistics
+
 macCallFilt = False  # Macro definition for call list filtering
 macSecInSec = False  # Macro definition for option between http and https
-
-siplist     = []     # SIP contact list
+macBenchmark = False # Macro definition for running benchmark instead of the daemon
+macProdServer = False # Macro definition for production web server
+macVoxSerial = None  # Macro definition for primary channel VOX controller serial port
+macRihSim = None     # Macro definition for RIH VOX controller simulator, (latency, loss, garbage, disconnect)
+macSimulation = False # Macro definition for running the daemon without SIP, GPIO and VOX controller hardware
+macSimRoot = ''      # Macro definition for simulation mode config directory, temporary directory if NOT set
+macSipLog = 'warning' # Macro definition for linphone log level written to the log file
+
+restPort      = 5000   # REST web API port
+restWorkers   = 8      # Production web server worker thread
+restQueueSize = 32     # Production web server accepted connection waiting for a worker thread
+restKeepAlive = 10     # Production web server idle keep-alive connection time out (s)
+sslCertFile   = 'asterisk.pem'  # HTTPS certificate
+sslKeyFile    = 'ca.key'        # HTTPS certificate key
+
+streamPort       = 5001        # Stream web server port - Daemon status stream
+streamMaxClients = 64          # Stream web server maximum client connection
+streamBufMax     = 262144      # Stream web server client pending data limit, slow client are disconnected
+streamKeepAlive  = 15          # Status stream keep-alive interval (s)
+streamStat       = {'subscribers' : 0, 'events' : 0, 'pttclients' : 0, 'pttframes' : 0}  # Stream web server statistics
+wsFrameMax       = 1024        # WebSocket PTT control maximum frame payload
+wsGuid           = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'  # WebSocket handshake key suffix (RFC 6455)
+pttLock          = threading.Lock()  # Guard PTT state machine, all PTT source and GPIO write are serialized
+pttLatency       = {}          # PTT event received to PTT GPIO written latency, PTT source -> recent latency (s)
+pttTransCnt      = {}          # PTT state transition count, PTT source -> transition count
+
+voxBaudRate  = 9600   # VOX controller serial communication baudrate
+voxReadTmo   = 1.0    # VOX controller serial port read time out (s)
+voxRetryIntv = 1.0    # VOX config command first resend interval when NO ACK received, doubled for each resend (s)
+voxRetryMaxIntv = 8.0 # VOX config command maximum resend interval (s)
+voxRetryMax  = 4      # VOX config command resend before the command time out
+voxAliveIntv = 60     # VOX controller status request interval (s)
+voxAliveMiss = 3      # VOX controller status request NOT answered before VOX controller OFFLINE
+voxRttBuckets = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)  # VOX command round trip time histogram bucket (ms)
+voxAckCmd    = '<06>\n'  # ACK command data from VOX controller
+voxReopenIntv = 1.0   # VOX controller serial port reopen interval after the serial link lost (s)
+voxFrameMax  = 32     # VOX controller serial frame maximum payload length
+voxTxnBudget = 1.0    # VOX profile transaction time out, all command ACK must be received within this time (s)
+rihLinkPath  = '/tmp/rihsim'  # RIH VOX controller simulator serial port, channel ID are appended
+rihDownTime  = 2.0    # RIH VOX controller simulator serial link disconnect duration (s)
+rihSim       = {}     # RIH VOX controller simulator, channel ID -> simulator
+
+coreBusyIntv = 0.01   # SIP client core iterate interval during a call, registration or after a SIP event (s)
+coreIdleIntv = 0.32   # SIP client core maximum iterate interval when idle, interval are doubled up to this value (s)
+coreStatIntv = 5      # SIP client core statistics update interval (s)
+
+siplist     = None   # SIP contact whitelist
 
 icomSet       = ''     # Intercom features enable/disable string
 icomLoc       = ''     # Intercom group location
@@ -242,10 +650,10 @@ sipIcomAddr   = ''     # Intercom group full SIP address
 icomEnaDis    = False  # Intercom features enable/disable flag
 strtJoinIcom  = False  # Initiate call to intercom group flag
 registStat    = False  # Regitration to server flag
-strtTmrJoin   = False  # Join intercom delay flag
+icomJoinTimer = None   # Join intercom delay timer
 icomToRoIP    = False  # Revert setting back from intercom to RoIP
 retryJoinIcom = 0      # Intercom join attempt counter
-joinIcomCnt   = 0      # Intercom reconnection delay counter
+icomJoinDly   = 10     # Intercom reconnection delay (s)
 
 # Check for call list filtering macro
 if (len(sys.argv) > 1):
@@ -256,219 +664,1058 @@ if (len(sys.argv) > 1):
         # Optional macro if we want to enable https
         elif (x == "SECURE"):
             macSecInSec = True
-            
-# Config data - load default data first
-sipConfigData=[
-    {
-        'id' : '000',
-        'sipusername' : '1002',
-        'sippassword' : '1234',
-        'asteriskip' : '192.168.8.101',
-        'pttset' : 'TRUE',
-        'micset' : 'TRUE',
-        'audioset' : 'TRUE',
-        'audmultset' : 'TRUE',
-        'pttto' : '60',
-        'pttmode' : '1'
-    }
-]
-
-# VOX setting data - load default vox data first
-voxParamData=[
-    {
-        'id' : '000',
-        'delayaindiv' : '5',
-        'delayvaladd' : '2',
-        'threshmultp' : '0.8',
-        'threshadd' : '70',
-        'delayvalue' : '95',
-        'thresholdvalue' : '267',
-        'mode' : 'Mode 2'
-    }
-]
+        # Optional macro if we want to run benchmark
+        elif (x == "BENCHMARK"):
+            macBenchmark = True
+        # Optional macro if we want to run production web server
+        elif (x == "PRODSERVER"):
+            macProdServer = True
+        # Optional macro if we want to use other serial port for primary channel VOX controller
+        elif x.startswith("VOXSERIAL="):
+            macVoxSerial = x[len("VOXSERIAL="):]
+        # Optional macro if we want to run with simulated VOX controller - RIHSIM or RIHSIM=0.02,0.1,0.05,0.01
+        elif x == "RIHSIM" or x.startswith("RIHSIM="):
+            macRihSim = [ float(val) for val in x[len("RIHSIM="):].split(',') if val != '' ]
+        # Optional macro if we want to run the daemon without hardware - SIMULATION or SIMULATION=<config directory>
+        elif x == "SIMULATION" or x.startswith("SIMULATION="):
+            macSimulation = True
+            macSimRoot = x[len("SIMULATION="):]
+        # Optional macro if we want to change linphone log level - SIPLOG=debug, info, warning or error
+        elif x.startswith("SIPLOG="):
+            macSipLog = x[len("SIPLOG="):].lower()
+        # Optional macro if we want to keep log event in a file - LOGSPILL=/var/log/sipradio-events.gz
+        elif x.startswith("LOGSPILL="):
+            logSpillFile = x[len("LOGSPILL="):]
+
+# linphone log level - linphone log below this level are dropped before a log record created
+sipLogLevel  = logLevels.get(macSipLog, logging.WARNING)
+
+# Configuration files location - Simulation mode config files are kept at a temporary directory
+cnfgDir      = '/etc/conf.d/sipradio'
+if macSimulation == True:
+    cnfgDir = macSimRoot if macSimRoot != '' else tempfile.mkdtemp(prefix='sipradio-sim-')
+    if not os.path.isdir(cnfgDir):
+        os.makedirs(cnfgDir)
+sipCnfgFile  = cnfgDir + '/sipradioCnfg.conf'   # SIP configuration file - Primary channel
+voxCnfgFile  = cnfgDir + '/voxradioCnfg.conf'   # VOX controller configuration file - Primary channel
+chanListFile = cnfgDir + '/sipradioChan.list'   # Radio channel list file
+icomCnfgFile = cnfgDir + '/icomradioCnfg.conf'  # Intercom configuration file
+gpioCnfgFile = cnfgDir + '/gpioCnfg.conf'       # GPIO backend and primary channel GPIO configuration file
+contListFile = cnfgDir + '/sipradioCont.list'   # SIP contact list file
+contJournalFile = cnfgDir + '/sipradioCont.journal' # SIP contact list update journal
+
+cnfgCache    = {}      # Parsed config file cache, config file -> (file stamp, config data)
+cnfgOwnStamp = {}      # File stamp of config file written by this daemon
+
+# Primary channel (000) radio interface - (channel ID, PTT GPIO, PTT mode GPIO, VOX controller serial port,
+# sound card capture device)
+primChanDef  = ('000', 4, 12, '/dev/serial0', 'audioinjector-pi-soundcard')
+sipBasePort  = 5060    # Primary channel SIP port, secondary channel use the next port
+
+# Config data fields that can be updated via REST API
+sipCnfgKeys  = ['sipusername', 'sippassword', 'asteriskip', 'pttset', 'micset', 'audioset', 'audmultset', 'pttto', 'pttmode',
+                'dtmfptton', 'dtmfpttoff', 'dtmfdebounce']
+icomCnfgKeys = ['icomset', 'icomloc', 'icomextid']
+voxCnfgKeys  = ['delayaindiv', 'delayvaladd', 'threshmultp', 'threshadd', 'delayvalue', 'thresholdvalue', 'mode'] # VOX command type 1 - 7
+
+# Linux inotify event for config file hot reload
+IN_CLOSE_WRITE = 0x00000008  # Config file closed after written
+IN_MOVED_TO    = 0x00000080  # Config file renamed into config directory
+
+cnfgFlushDly = 0.2                     # Config file write-behind coalescing window (s)
+cnfgDirty    = {}                      # Config group waiting to be written, group -> first update time
+cnfgCond     = threading.Condition()   # Guard config write-behind data and statistics
+
+# Config file persistence statistics
+persistStat = {
+    'updatereq' : 0,   # Config group update request
+    'coalesced' : 0,   # Update request merged into a pending write
+    'filewrite' : 0,   # Config file written to SD card
+    'byteswritten' : 0,# Total bytes written to SD card
+    'fsync' : 0,       # Total fsync call
+    'writeerror' : 0,  # Config file write error
+    'journalappend' : 0, # Contact update appended to contact journal
+    'compaction' : 0   # Contact journal compaction
+}
+
+contJournal    = None              # Contact journal file, opened for append
+contJournalCnt = 0                 # Contact update in contact journal
+contCompactCnt = 500               # Contact journal compaction threshold
+contBatchSize  = 500               # Contact bulk import batch size
+contLineMax    = 1024              # Maximum contact bulk import line length
+contLock       = threading.Lock()  # Guard contact whitelist update and contact journal
+
+# REST API data set version - Each data set version are increased whenever its data changed
+# GET request are answered from a cached JSON body until the next change (ETag/If-None-Match)
+dataCache   = {}                   # Cached JSON body, data set -> (version, JSON body)
+dataLock    = threading.Lock()     # Guard cached JSON body
+bootId      = '%x' % (int(time.time()))  # Make ETag unique across daemon restart
+
+# Daemon status change event - Published to status stream (/ricinfo/stream) subscriber
+ricEvents     = collections.deque(maxlen=512)  # Recent status event for resume, (sequence, event data)
+ricEventSeq   = 0                              # Last status event sequence number
+ricEventLock  = threading.Lock()               # Guard status event sequence and recent status event
+ricEventWake  = os.pipe()                      # Wake up stream web server when status event are published
+fcntl.fcntl(ricEventWake[1], fcntl.F_SETFL, os.O_NONBLOCK)
+
+# Publish daemon status change to status stream subscriber
+def publishRicEvent(eventData):
+    global ricEventSeq
+
+    with ricEventLock:
+        ricEventSeq += 1
+        ricEvents.append((ricEventSeq, eventData))
+    try:
+        os.write(ricEventWake[1], b'\0')
+    except OSError:
+        pass # Stream web server already have a pending wake up
+
+# Data set record - Field value are kept in slot, one slot for each data set field
+class dataRecord(object):
+    __slots__ = ()
+
+# Data set store - Shared by SIP client, REST API, serial and monitor thread
+# Field read are a single slot access, field update are done under the data set lock. Data set version are
+# increased and the change are published once for each update, however many field are updated together
+class dataStore(object):
+    def __init__(self, dataName, data, publish=None):
+        self.dataName = dataName
+        self.fields = tuple(sorted(data.keys()))
+        self.version = 0
+        self.publish = publish            # Called with the changed field under the data set lock
+        self.lock = threading.RLock()
+        self.record = type(dataName + 'Record', (dataRecord,), {'__slots__' : self.fields})()
+        for field in self.fields:
+            setattr(self.record, field, data[field])
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self.record, field)
+        except AttributeError:
+            raise KeyError(field)
+
+    def __setitem__(self, field, value):
+        self.update({field : value})
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    # Update one or more field at once, return the changed field
+    def update(self, fields):
+        changed = {}
+        with self.lock:
+            for field in fields:
+                if self[field] != fields[field]:
+                    setattr(self.record, field, fields[field])
+                    changed[field] = fields[field]
+            if len(changed) > 0:
+                self.version += 1
+                if self.publish is not None:
+                    self.publish(dict(changed, id=self.record.id))
+        return changed
+
+    # Consistent copy of the data set
+    def snapshot(self):
+        with self.lock:
+            return dict([ (field, getattr(self.record, field)) for field in self.fields ])
 
 # Intercom setting data - load default intercom data first
-icomParamData=[
-    {
-        'id' : '000',
-        'icomset' : 'FALSE',
-        'icomloc' : 'NA',
-        'icomextid' : 'NA'
-    }
-]
-
-# Daemon status data
-daemonStat=[
-    {
-        'id' : '000',
-        'callstatus' : 'LISTENING',
-        'pttstatus' : 'OFF',
-        'pttmode' : 'Mode 1',
-        'voxmode' : 'Mode 2',
-        'voxstatus' : 'OFFLINE',
-        'intercom' : 'DISABLE',
-        'intercomstatus' : 'OFFLINE',
-        'currcallid' : 'NO'
-    }
-]
+icomParamData = dataStore('icomconfig', {
+    'id' : '000',
+    'icomset' : 'FALSE',
+    'icomloc' : 'NA',
+    'icomextid' : 'NA'
+})
 
 # String manipulation
 def mid(s, offset, amount):
     return s[offset - 1:offset + amount - 1]
 
-# Open daemon configuration file
-#file = open("/etc/conf.d/sipHFradio/sipHFradioCnfg.conf", "r")
-file = open("/etc/conf.d/sipradio/sipradioCnfg.conf", "r")
-
-# Retrieve SIP username
-sipUserName = file.readline()
-lengthStr = len(sipUserName)
-sipUserName = mid(sipUserName, 13, lengthStr - 13)
-
-# Retrieve SIP password
-sipPswd = file.readline()
-lengthStr = len(sipPswd)
-sipPswd = mid(sipPswd, 9, lengthStr - 9)
-
-# Retrieve Asterisk IP
-asteriskIP = file.readline()
-lengthStr = len(asteriskIP)
-asteriskIP = mid(asteriskIP, 12, lengthStr - 12)
-
-# Retrieve PTT setting
-pttSet = file.readline()
-lengthStr = len(pttSet)
-pttSet = mid(pttSet, 8, lengthStr - 8)
-
-# Set PTT setting flag
-if pttSet == 'TRUE':
-    pttEnDis = True
-else:
-    pttEnDis = False
+# Create SIP config file text from current SIP config data
+def sipCnfgText(chan):
+    return ('SIPUSERNAME:' + chan.sipUserName + '\n' +
+            'SIPPSWD:' + chan.sipPswd + '\n' +
+            'ASTERISKIP:' + chan.asteriskIP + '\n' +
+            'PTTSET:' + chan.pttSet + '\n' +
+            'MICSET:' + chan.micSet + '\n' +
+            'AUDIOSET:' + chan.audioSet + '\n' +
+            'AUDMULTSET:' + chan.audMultSet + '\n' +
+            'PTTTO:' + chan.pttToVal + '\n' +
+            'PTTMODE:' + chan.pttMode + '\n' +
+            'DTMFPTTON:' + chan.dtmfPttOn + '\n' +
+            'DTMFPTTOFF:' + chan.dtmfPttOff + '\n' +
+            'DTMFDEBOUNCE:' + chan.dtmfDbncVal + '\n' +
+            'PTTTOKEN:' + chan.pttToken + '\n')
+
+# Create VOX controller config file text from current VOX config data
+def voxCnfgText(chan):
+    return ('DELAYAINDIV:' + chan.delayaindiv + '\n' +
+            'DELAYVALADD:' + chan.delayvaladd + '\n' +
+            'THRESHMULTP:' + chan.threshmultp + '\n' +
+            'THRESHADD:' + chan.threshadd + '\n' +
+            'DELAYVALUE:' + chan.delayvalue + '\n' +
+            'THRESHOLDVALUE:' + chan.thresholdvalue + '\n' +
+            'MODE:' + chan.voxMode + '\n')
+
+# Create intercom config file text from current intercom config data
+def icomCnfgText():
+    return ('ICOMSET:' + icomSet + '\n' +
+            'ICOMLOC:' + icomLoc + '\n' +
+            'EXTID:' + icomExtId + '\n')
+
+# Config file value converter - 'TRUE' or 'FALSE' string to boolean flag
+def cnfgBool(value):
+    return value == 'TRUE'
+
+# Config file definition - (config key, config data field, value type, default value)
+sipCnfgDef = [
+    ('SIPUSERNAME', 'sipusername', str, '1002'),
+    ('SIPPSWD', 'sippassword', str, '1234'),
+    ('ASTERISKIP', 'asteriskip', str, '192.168.8.101'),
+    ('PTTSET', 'pttset', cnfgBool, 'TRUE'),
+    ('MICSET', 'micset', cnfgBool, 'TRUE'),
+    ('AUDIOSET', 'audioset', cnfgBool, 'TRUE'),
+    ('AUDMULTSET', 'audmultset', cnfgBool, 'TRUE'),
+    ('PTTTO', 'pttto', int, '60'),
+    ('PTTMODE', 'pttmode', int, '1'),
+    ('DTMFPTTON', 'dtmfptton', str, '#'),
+    ('DTMFPTTOFF', 'dtmfpttoff', str, '#'),
+    ('DTMFDEBOUNCE', 'dtmfdebounce', int, '1000'),
+    ('PTTTOKEN', 'ptttoken', str, '')
+]
 
-# Retrieve MIC setting
-micSet = file.readline()
-lengthStr = len(micSet)
-micSet = mid(micSet, 8, lengthStr - 8)
+voxCnfgDef = [
+    ('DELAYAINDIV', 'delayaindiv', str, '5'),
+    ('DELAYVALADD', 'delayvaladd', str, '2'),
+    ('THRESHMULTP', 'threshmultp', str, '0.8'),
+    ('THRESHADD', 'threshadd', str, '70'),
+    ('DELAYVALUE', 'delayvalue', str, '95'),
+    ('THRESHOLDVALUE', 'thresholdvalue', str, '267'),
+    ('MODE', 'mode', str, '2')
+]
 
-# Set MIC setting flag
-if micSet == 'TRUE':
-    micEnDis = True
-else:
-    micEnDis = False
+icomCnfgDef = [
+    ('ICOMSET', 'icomset', cnfgBool, 'FALSE'),
+    ('ICOMLOC', 'icomloc', str, 'NA'),
+    ('EXTID', 'icomextid', str, 'NA')
+]
 
-# Retrieve audio setting
-audioSet = file.readline()
-lengthStr = len(audioSet)
-audioSet = mid(audioSet, 10, lengthStr - 10)
+gpioCnfgDef = [
+    ('BACKEND', 'backend', str, 'AUTO'),
+    ('CHIP', 'chip', str, '/dev/gpiochip0'),
+    ('PTTPIN', 'pttpin', int, '4'),
+    ('MODEPIN', 'modepin', int, '12'),
+    ('ALIVELED', 'aliveled', int, '6')
+]
 
-# Set audio setting flag
-if audioSet == 'TRUE':
-    audioEnDis = True
-else:
-    audioEnDis = False
+# Typed config data parsed from a keyed config file
+class configData:
+    def __init__(self, cnfgDef):
+        self.raw = {}       # Config field value string as written in config file
+        self.typed = {}     # Config field value converted to its value type
+        self.missing = []   # Config key not exist in config file
+        self.unknown = []   # Config key in config file that not belong to the config definition
+        for cnfgKey, field, valType, default in cnfgDef:
+            self.raw[field] = default
+
+# Parse keyed config file text in one pass - Each line are in 'KEY:value' format
+# Line order are not important, missing config key will use its default value
+def parseConfigText(text, cnfgDef):
+    cnfg = configData(cnfgDef)
+    keyField = dict([ (cnfgKey, field) for cnfgKey, field, valType, default in cnfgDef ])
+    found = set()
+
+    for line in text.splitlines():
+        sep = line.find(':')
+        if sep < 0:
+            continue
+        cnfgKey = line[:sep].strip().upper()
+        if cnfgKey in keyField:
+            cnfg.raw[keyField[cnfgKey]] = line[sep + 1:]
+            found.add(cnfgKey)
+        else:
+            cnfg.unknown.append(cnfgKey)
+
+    for cnfgKey, field, valType, default in cnfgDef:
+        if cnfgKey not in found:
+            cnfg.missing.append(cnfgKey)
+        try:
+            cnfg.typed[field] = valType(cnfg.raw[field])
+        except ValueError:
+            # Invalid value, fall back to default value
+            logger.info("DEBUG_CNFG: Invalid value for %s: %s, use default: %s" % (cnfgKey, cnfg.raw[field], default))
+            cnfg.raw[field] = default
+            cnfg.typed[field] = valType(default)
+    return cnfg
+
+# Config file identity - Changed each time config file are rewritten or renamed over
+def fileStamp(fileName):
+    try:
+        st = os.stat(fileName)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime, st.st_size)
+
+# Load keyed config file, config file are only parsed again when its inode, mtime or size changed
+def loadConfigFile(fileName, cnfgDef):
+    stamp = fileStamp(fileName)
+    if fileName in cnfgCache and cnfgCache[fileName][0] == stamp:
+        return cnfgCache[fileName][1]
+
+    file = open(fileName, "r")
+    text = file.read()
+    file.close()
 
-# Retrieve multicast audio setting
-audMultSet = file.readline()
-lengthStr = len(audMultSet)
-audMultSet = mid(audMultSet, 12, lengthStr - 12)
+    cnfg = parseConfigText(text, cnfgDef)
+    for cnfgKey in cnfg.missing:
+        logger.info("DEBUG_CNFG: %s missing config key %s, use default value" % (fileName, cnfgKey))
+    for cnfgKey in cnfg.unknown:
+        logger.info("DEBUG_CNFG: %s unknown config key %s, ignored" % (fileName, cnfgKey))
+
+    cnfgCache[fileName] = (stamp, cnfg)
+    return cnfg
+
+# Config group to be written - Config group: (config file, config file text)
+# Each radio channel add its SIP and VOX controller config group
+cnfgGroups = {
+    'icom' : (icomCnfgFile, icomCnfgText),
+    'contacts' : (contListFile, None)
+}
+
+# Write a file atomically, data are written and fsync to a temporary file first and
+# then renamed over the current file. A power loss never leave a half written file
+def atomicWriteFile(fileName, text):
+    data = text.encode('utf-8')
+    tmpName = fileName + '.tmp'
+
+    fd = os.open(tmpName, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        written = 0
+        while written < len(data):
+            written += os.write(fd, data[written:])
+        os.fsync(fd)
+
+        # File stamp are kept by rename, config file hot reload will not reload our own write
+        st = os.fstat(fd)
+        cnfgOwnStamp[fileName] = (st.st_ino, st.st_mtime, st.st_size)
+    finally:
+        os.close(fd)
+    os.rename(tmpName, fileName)
+
+    # Flush the directory entry so the rename survive a power loss
+    dirFd = os.open(os.path.dirname(fileName), os.O_RDONLY)
+    try:
+        os.fsync(dirFd)
+    finally:
+        os.close(dirFd)
+
+    with cnfgCond:
+        persistStat['filewrite'] += 1
+        persistStat['byteswritten'] += len(data)
+        persistStat['fsync'] += 2
+
+# Mark config group as updated, the config file will be written by write-behind thread
+# Several update within the coalescing window will only write the config file once
+def markConfigDirty(group):
+    with cnfgCond:
+        persistStat['updatereq'] += 1
+        if group in cnfgDirty:
+            persistStat['coalesced'] += 1
+        else:
+            cnfgDirty[group] = time.time()
+        cnfgCond.notify()
 
-# Set multicast audio setting flag
-if audMultSet == 'TRUE':
-    audMultEnDis = True
-else:
-    audMultEnDis = False
-
-# Retrive PTT time out value
-pttToVal = file.readline()
-lengthStr = len(pttToVal)
-pttToVal = mid(pttToVal, 7, lengthStr - 7)
-
-# PTT time out in integer value
-pttTimeOut = int(pttToVal) 
-
-# Retrieve PTT mode of operation
-pttMode = file.readline()
-lengthStr = len(pttMode)
-pttMode = mid(pttMode, 9, lengthStr - 9)
-
-# PTT mode of operation in integer value
-pttModeOper = int(pttMode)
-
-# Close config gile
-file.close()
-
-# Open VOX controller configuration file
-#file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "r")
-file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "r")
-
-# Retrieve VOX PTT delay analog input delay division factor
-delayaindiv = file.readline()
-lengthStr = len(delayaindiv)
-delayaindiv = mid(delayaindiv, 13, lengthStr - 13)
-
-# Retrieve VOX PTT delay addition factor
-delayvaladd = file.readline()
-lengthStr = len(delayvaladd)
-delayvaladd = mid(delayvaladd, 13, lengthStr - 13)
-
-# Retrieve VOX threshold analog input multiplication factor
-threshmultp = file.readline()
-lengthStr = len(threshmultp)
-threshmultp = mid(threshmultp, 13, lengthStr - 13)
-
-# Retrieve VOX threshold analog input addition factor
-threshadd = file.readline()
-lengthStr = len(threshadd)
-threshadd = mid(threshadd, 11, lengthStr - 11)
-
-# Retrieve VOX total delay
-delayvalue = file.readline()
-lengthStr = len(delayvalue)
-delayvalue = mid(delayvalue, 12, lengthStr - 12)
-
-# Retrieve VOX total threshold
-thresholdvalue = file.readline()
-lengthStr = len(thresholdvalue)
-thresholdvalue = mid(thresholdvalue, 16, lengthStr - 16)
-
-# Retrieve VOX mode
-voxMode = file.readline()
-lengthStr = len(voxMode)
-voxMode = mid(voxMode, 6, lengthStr - 6)
-
-# Close config gile
-file.close()
-
-# Open intercom configuration file
-file = open("/etc/conf.d/sipradio/icomradioCnfg.conf", "r")
-
-# Retrieve intercom enable/disable flag
-icomSet = file.readline()
-lengthStr = len(icomSet)
-icomSet = mid(icomSet, 9, lengthStr - 9)
-
-# Set intercom enable/disable flag
-if icomSet == 'TRUE':
-    icomEnaDis = True
-else:
-    icomEnaDis = False
+# Write config group file with the current config data
+def writeConfigGroup(group):
+    cnfgFile, cnfgText = cnfgGroups[group]
+    try:
+        # Contact list file are written by contact journal compaction
+        if group == 'contacts':
+            compactContactList()
+        else:
+            atomicWriteFile(cnfgFile, cnfgText())
+    except:
+        with cnfgCond:
+            persistStat['writeerror'] += 1
+        logger.info("DEBUG_CNFG: ERROR during writing config file: %s" % (cnfgFile))
+
+# Write all pending config group immediately - Before daemon terminate
+def flushConfigNow():
+    with cnfgCond:
+        groups = list(cnfgDirty.keys())
+        cnfgDirty.clear()
+    for group in groups:
+        writeConfigGroup(group)
+
+# Daemon metric - Counter and histogram for /metrics (Prometheus text format)
+# Each thread update its own metric shard (thread ID -> label values -> value) without lock, the lock are only
+# taken by a thread first update. Thread ID are reused only after the previous thread ended, so a shard never have
+# two writer. Shard are summed when /metrics requested
+metrics = []   # All metric, in /metrics order
+
+class metricCounter:
+    mtype = 'counter'
+
+    def __init__(self, name, helpText, labelNames=()):
+        self.name = name
+        self.helpText = helpText
+        self.labelNames = labelNames
+        self.buckets = ()
+        self.lock = threading.Lock()  # Guard new thread shard
+        self.shards = {}
+        metrics.append(self)
+
+    # Metric shard of the current thread
+    def shard(self):
+        ident = thread.get_ident()
+        values = self.shards.get(ident)
+        if values is None:
+            with self.lock:
+                values = self.shards.setdefault(ident, {})
+        return values
+
+    def inc(self, labels=(), value=1):
+        values = self.shard()
+        values[labels] = values.get(labels, 0) + value
+
+    # Sum of all thread shard, label values -> value
+    def collect(self):
+        total = {}
+        for values in list(self.shards.values()):
+            for labels, value in dict(values).items():
+                total[labels] = total.get(labels, 0) + value
+        return total
+
+# Histogram - Count for each bucket (value less or equal to the bucket), above the last bucket and value sum
+class metricHistogram(metricCounter):
+    mtype = 'histogram'
+
+    def __init__(self, name, helpText, buckets, labelNames=()):
+        metricCounter.__init__(self, name, helpText, labelNames)
+        self.buckets = buckets
+
+    def observe(self, labels, value):
+        values = self.shard()
+        counts = values.get(labels)
+        if counts is None:
+            counts = values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def collect(self):
+        total = {}
+        for values in list(self.shards.values()):
+            for labels, counts in dict(values).items():
+                prev = total.get(labels)
+                total[labels] = list(counts) if prev is None else [ a + b for a, b in zip(prev, counts) ]
+        return total
+
+# Metric kept by the daemon elsewhere (VOX controller statistics) - Value are read when /metrics requested
+class metricCallback(metricCounter):
+    def __init__(self, name, helpText, mtype, func, labelNames=(), buckets=()):
+        metricCounter.__init__(self, name, helpText, labelNames)
+        self.mtype = mtype
+        self.func = func
+        self.buckets = buckets
+
+    def collect(self):
+        return self.func()
+
+# Metric label text - {name="value",...}
+def metricLabels(labelNames, labels, extra=()):
+    pairs = [ '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+              for name, value in list(zip(labelNames, labels)) + list(extra) ]
+    return '{' + ','.join(pairs) + '}' if len(pairs) > 0 else ''
+
+# Metric text for /metrics - Histogram bucket count are cumulative
+def metricText(metric):
+    lines = ['# HELP %s %s' % (metric.name, metric.helpText), '# TYPE %s %s' % (metric.name, metric.mtype)]
+    values = metric.collect()
+    for labels in sorted(values):
+        if metric.mtype == 'histogram':
+            counts = values[labels]
+            cumulative = 0
+            for bucket, count in zip(list(metric.buckets) + ['+Inf'], counts[:-1]):
+                cumulative += count
+                lines.append('%s_bucket%s %d' % (metric.name, metricLabels(metric.labelNames, labels, [('le', bucket)]), cumulative))
+            lines.append('%s_sum%s %r' % (metric.name, metricLabels(metric.labelNames, labels), float(counts[-1])))
+            lines.append('%s_count%s %d' % (metric.name, metricLabels(metric.labelNames, labels), cumulative))
+        else:
+            lines.append('%s%s %r' % (metric.name, metricLabels(metric.labelNames, labels), values[labels]))
+    return '\n'.join(lines) + '\n'
+
+latencyBuckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)  # (s)
+
+metCalls      = metricCounter('sipradio_calls_total', 'Incoming call accepted or declined', ('channel', 'result'))
+metWhitelist  = metricCounter('sipradio_whitelist_lookups_total', 'SIP contact whitelist lookup for call and SIP message',
+                              ('request', 'result'))
+metPttOn      = metricCounter('sipradio_ptt_activations_total', 'PTT control ON', ('channel', 'source'))
+metPttAirtime = metricCounter('sipradio_ptt_airtime_seconds_total', 'PTT control ON time', ('channel', ))
+metPttLatency = metricHistogram('sipradio_ptt_latency_seconds', 'PTT event received to PTT GPIO written',
+                                latencyBuckets, ('source', ))
+metIcomJoin   = metricCounter('sipradio_intercom_join_total', 'Intercom group join attempt', ('result', ))
+metRest       = metricHistogram('sipradio_rest_request_seconds', 'REST API request time', latencyBuckets, ('route', 'method'))
+metCoreLag    = metricHistogram('sipradio_sip_iterate_lag_seconds', 'SIP client core iterate after its deadline',
+                                latencyBuckets, ('channel', ))
+
+# SIP client core iterate scheduler
+# Core are iterated every busy interval during a call or registration, the interval are doubled up to the idle
+# interval when there is nothing in progress. Work posted by other thread wake up SIP client thread immediately.
+class coreScheduler:
+    def __init__(self, chanId=None):
+        self.chanId = chanId       # Radio channel for iterate lag metric, NO metric when NOT set
+        self.wakePipe = os.pipe()
+        fcntl.fcntl(self.wakePipe[1], fcntl.F_SETFL, os.O_NONBLOCK)
+        self.postTime = 0.0        # First work posted since the last wake up
+        self.interval = coreBusyIntv
+        self.deadline = time.time()
+        self.wakeups = 0
+        self.statTime = time.time()
+        self.statCpu = sum(os.times()[:2])
+        self.dispatch = collections.deque(maxlen=256)  # Recent posted work to wake up latency (s)
+        self.stat = {'wakeups' : 0.0, 'cpu' : 0.0, 'interval' : 0.0, 'dispatchp50' : 0.0, 'dispatchp99' : 0.0}
+
+    # Post a work to SIP client thread
+    def post(self):
+        if self.postTime == 0.0:
+            self.postTime = time.time()
+        try:
+            os.write(self.wakePipe[1], b'\0')
+        except OSError:
+            pass # SIP client thread already have a pending wake up
+
+    # Wait until the next iterate deadline or a posted work
+    def wait(self, busy):
+        if busy == True:
+            self.interval = coreBusyIntv
+        else:
+            self.interval = min(self.interval * 2, coreIdleIntv)
+        self.deadline = max(self.deadline + self.interval, time.time())
+
+        readList, writeList, errList = select.select([self.wakePipe[0]], [], [], max(self.deadline - time.time(), 0.0))
+        now = time.time()
+        self.wakeups += 1
+        if len(readList) > 0:
+            os.read(self.wakePipe[0], 4096)
+            if self.postTime > 0.0:
+                self.dispatch.append(now - self.postTime)
+                self.postTime = 0.0
+            self.deadline = now
+        elif self.chanId is not None:
+            metCoreLag.observe((self.chanId, ), max(now - self.deadline, 0.0))
+
+        # Update statistics
+        if now - self.statTime >= coreStatIntv:
+            cpu = sum(os.times()[:2])
+            dispatch = sorted(self.dispatch)
+            self.stat['wakeups'] = round(self.wakeups / (now - self.statTime), 1)
+            self.stat['cpu'] = round((cpu - self.statCpu) * 100.0 / (now - self.statTime), 1)
+            self.stat['interval'] = round(self.interval * 1e3, 1)
+            if len(dispatch) > 0:
+                self.stat['dispatchp50'] = round(dispatch[len(dispatch) // 2] * 1e3, 2)
+                self.stat['dispatchp99'] = round(dispatch[int(len(dispatch) * 0.99)] * 1e3, 2)
+            self.wakeups = 0
+            self.statTime = now
+            self.statCpu = cpu
+
+# Monotonic clock for timer deadline - Not affected by system time update (NTP or RTC sync)
+# Python 2 do not have time.monotonic, clock_gettime(CLOCK_MONOTONIC) are called through libc
+try:
+    monoTime = time.monotonic
+except AttributeError:
+    class timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+    def monoTime():
+        ts = timespec()
+        libc.clock_gettime(1, ctypes.byref(ts)) # CLOCK_MONOTONIC
+        return ts.tv_sec + ts.tv_nsec * 1e-9
+
+# Daemon timer - One armed deadline at the timer scheduler
+class schedTimer:
+    def __init__(self, deadline, seq, callback, args):
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.pending = True
+
+# Timer scheduler - Armed timer are kept in a heap ordered by deadline, timer scheduler thread sleep until the
+# earliest deadline and block without a time out when there is no armed timer. Arming a new earliest deadline or
+# cancelling the earliest timer wake up the thread to compute its wait time again
+class timerScheduler:
+    def __init__(self):
+        self.heap = []             # Armed timer, (deadline, sequence, timer)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.wakePipe = os.pipe()
+        fcntl.fcntl(self.wakePipe[1], fcntl.F_SETFL, os.O_NONBLOCK)
+        self.fired = 0
+        self.wakeups = 0
+        self.late = collections.deque(maxlen=256)  # Recent timer fired time after its deadline (s)
+
+    # Wake up timer scheduler thread
+    def wake(self):
+        try:
+            os.write(self.wakePipe[1], b'\0')
+        except OSError:
+            pass # Timer scheduler thread already have a pending wake up
+
+    # Arm a timer, callback are called at timer scheduler thread after delay (s)
+    # Timer without callback only mark its own expiry (pending False)
+    def arm(self, delay, callback, *args):
+        with self.lock:
+            self.seq += 1
+            timer = schedTimer(monoTime() + delay, self.seq, callback, args)
+            heapq.heappush(self.heap, (timer.deadline, timer.seq, timer))
+            earliest = self.heap[0][2] is timer
+        if earliest == True:
+            self.wake()
+        return timer
+
+    # Cancel an armed timer - Return True when the timer are still pending, False if already fired or cancelled
+    def cancel(self, timer):
+        if timer is None:
+            return False
+        with self.lock:
+            if timer.pending == False:
+                return False
+            timer.pending = False
+            earliest = self.heap[0][2] is timer
+            self.heap.remove((timer.deadline, timer.seq, timer))
+            heapq.heapify(self.heap)
+        if earliest == True:
+            self.wake()
+        return True
+
+    # Fire all timer with the deadline reached
+    def expire(self):
+        expired = []
+        with self.lock:
+            now = monoTime()
+            while len(self.heap) > 0 and self.heap[0][0] <= now:
+                timer = heapq.heappop(self.heap)[2]
+                timer.pending = False
+                self.late.append(now - timer.deadline)
+                expired.append(timer)
+            self.fired += len(expired)
+
+        for timer in expired:
+            if timer.callback is not None:
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    logger.info("DEBUG_TIMER: Timer callback error: %s" % (e))
 
-# Retrieve intercom group location
-icomLoc = file.readline()
-lengthStr = len(icomLoc)
-icomLoc = mid(icomLoc, 9, lengthStr - 9)
+    # Loop - Sleep until the earliest deadline or a wake up, then fire the expired timer
+    def run(self):
+        while True:
+            with self.lock:
+                if len(self.heap) > 0:
+                    timeout = self.heap[0][0] - monoTime()
+                else:
+                    timeout = None
+            if timeout is None or timeout > 0:
+                readList, writeList, errList = select.select([self.wakePipe[0]], [], [], timeout)
+                self.wakeups += 1
+                if len(readList) > 0:
+                    os.read(self.wakePipe[0], 4096)
+            self.expire()
+
+    # Timer statistics - Armed timer, fired timer, thread wake up and fired time after deadline (ms)
+    def stats(self):
+        with self.lock:
+            late = sorted(self.late)
+            stat = {'armed' : len(self.heap), 'fired' : self.fired, 'wakeups' : self.wakeups,
+                    'latep50' : 0.0, 'latep99' : 0.0}
+        if len(late) > 0:
+            stat['latep50'] = round(late[len(late) // 2] * 1e3, 3)
+            stat['latep99'] = round(late[int(len(late) * 0.99)] * 1e3, 3)
+        return stat
+
+daemonTimer = timerScheduler()
+
+# VOX controller serial frame parser - Received data are parsed into <..> frame as it arrive, partial frame are kept
+# in a reusable buffer until the frame end received. Data outside a frame other than line end, frame start inside a
+# frame, oversize frame and invalid frame character are framing error
+# Frame kind:
+#   'ACK'     - <06>, command accepted
+#   'NAK'     - <15>, command rejected
+#   'STATUS'  - <03..>, VOX controller status
+#   'UNKNOWN' - Any other valid frame
+class voxFrameParser:
+    def __init__(self):
+        self.buf = bytearray()     # Partial frame payload
+        self.inFrame = False
+        self.stat = {'frames' : 0, 'ack' : 0, 'nak' : 0, 'status' : 0, 'unknown' : 0, 'errors' : 0}
+
+    # Parse received data - Return the completed frame, (frame kind, frame payload)
+    def feed(self, data):
+        frames = []
+        pos = 0
+        end = len(data)
+        while pos < end:
+            # Looking for frame start, only line end are allowed between frame
+            if self.inFrame == False:
+                start = data.find(b'<', pos)
+                if len(data[pos:(start if start >= 0 else end)].strip()) > 0:
+                    self.stat['errors'] += 1
+                if start < 0:
+                    break
+                self.inFrame = True
+                pos = start + 1
+                continue
+
+            # Frame payload up to the frame end
+            close = data.find(b'>', pos)
+            chunk = data[pos:(close if close >= 0 else end)]
+
+            # Frame start inside a frame, previous broken frame are dropped
+            restart = chunk.rfind(b'<')
+            if restart >= 0:
+                self.stat['errors'] += 1
+                del self.buf[:]
+                chunk = chunk[restart + 1:]
+            self.buf += chunk
+
+            # Oversize frame are dropped, the rest of the frame are skipped as noise
+            if len(self.buf) > voxFrameMax:
+                self.stat['errors'] += 1
+                del self.buf[:]
+                self.inFrame = False
+                pos = close + 1 if close >= 0 else end
+                continue
+            if close < 0:
+                break
 
-# Retrieve intercom extension ID
-icomExtId = file.readline()
-lengthStr = len(icomExtId)
-icomExtId = mid(icomExtId, 7, lengthStr - 7)
+            frame = self.classify(bytes(self.buf))
+            if frame is not None:
+                frames.append(frame)
+            del self.buf[:]
+            self.inFrame = False
+            pos = close + 1
+        return frames
+
+    # Classify a completed frame payload - Return None for a frame with invalid character
+    def classify(self, payload):
+        if len(payload) == 0 or len(payload.translate(None, b'0123456789ABCDEFabcdef.')) > 0:
+            self.stat['errors'] += 1
+            return None
+        payload = payload.decode('ascii')
+
+        if payload == '06':
+            kind = 'ACK'
+        elif payload == '15':
+            kind = 'NAK'
+        elif payload[:2] == '03':
+            kind = 'STATUS'
+        else:
+            kind = 'UNKNOWN'
+        self.stat['frames'] += 1
+        self.stat[kind.lower()] += 1
+        return kind, payload
+
+# Radio channel - One radio integrated to the RIC. Each channel have its own SIP account, sound card capture device,
+# PTT and PTT mode GPIO, VOX controller serial port, config file and daemon status data. Primary channel (000) use
+# the original config file name and also serve the intercom mode
+class radioChannel:
+    def __init__(self, chanId, pttPin, modePin, serPort, captureDev, sipPort):
+        self.chanId = chanId
+        self.primary = chanId == primChanDef[0]
+        self.pttPin = pttPin          # GPIO for PTT activation
+        self.modePin = modePin        # GPIO for PTT mode selection
+        self.serPort = serPort        # VOX controller serial port
+        self.captureDev = captureDev  # Sound card capture device
+        self.sipPort = sipPort        # SIP client local port
+        self.sipClient = None         # Channel SIP client
+        self.coreSched = coreScheduler(chanId)  # Channel SIP client core iterate scheduler
+
+        # Channel config file
+        if self.primary == True:
+            self.sipGroup = 'sip'
+            self.voxGroup = 'vox'
+            self.sipCnfgFile = sipCnfgFile
+            self.voxCnfgFile = voxCnfgFile
+        else:
+            self.sipGroup = 'sip.' + chanId
+            self.voxGroup = 'vox.' + chanId
+            self.sipCnfgFile = cnfgDir + '/sipradioCnfg.' + chanId + '.conf'
+            self.voxCnfgFile = cnfgDir + '/voxradioCnfg.' + chanId + '.conf'
+        cnfgGroups[self.sipGroup] = (self.sipCnfgFile, functools.partial(sipCnfgText, self))
+        cnfgGroups[self.voxGroup] = (self.voxCnfgFile, functools.partial(voxCnfgText, self))
+
+        self.pttTimer     = None   # PTT time out timer, armed while PTT ON
+        self.dtmfTimer    = None   # DTMF PTT debounce timer, armed after a PTT key
+        self.pttSrc       = ''     # Last PTT transition source - 'DTMF', 'SIP', 'WS', 'TOUT', 'CALL', 'ICOM' or 'CFG'
+        self.pttOnTime    = 0.0    # PTT control ON time, for PTT airtime
+        self.pttState     = 'OFF'  # PTT state machine state - 'OFF', 'ON' or 'ICOM'
+        self.pttLog       = collections.deque(maxlen=32)  # Recent PTT transition, (time, source, event, state, next state)
+        self.gpioLevel    = {}     # Last written GPIO level, GPIO -> level
+        self.callconn     = False
+        self.sipReRegist  = False  # SIP account updated, register again to Asterisk server
+        self.sipMicUpdt   = False  # MIC setting updated, apply to linphone core
+
+        self.voxStatus    = ''     # Current VOX controller status
+        self.pDelayaindiv = ''     # Previous value for VOX PTT delay analog input delay division factor
+        self.pDelayvaladd = ''     # Previous value for VOX PTT delay addition factor
+        self.pThreshmultp = ''     # Previous value for VOX threshold analog input multiplication factor
+        self.pThreshadd   = ''     # Previous value for VOX threshold analog input addition factor
+        self.pDelayvalue  = ''     # Previous value for VOX total delay
+        self.pThresvalue  = ''     # Previous value for VOX total threshold
+        self.pVoxMode     = ''     # Previous value for VOX controller current mode
+        self.sendCmdType  = 0      # VOX command type in progress, waiting for ACK
+        self.commBusy     = False  # Communication still active between RIC and VOX during configuring process
+        self.voxLock      = threading.Lock()  # Guard VOX config command queue
+        self.voxPending   = collections.OrderedDict()  # Queued VOX command type, value are read when the command sent
+        self.voxAcked     = {}     # Command acknowledged by VOX controller, command code -> command
+        self.voxParser    = voxFrameParser()  # VOX controller serial frame parser
+        self.voxTxQueue   = Queue.Queue()  # VOX serial writer work - Config command, received line, resend and ALIVE
+        self.voxRtt       = collections.deque(maxlen=256)  # Recent config command to ACK round trip time (s)
+        self.voxRttHist   = {}     # Round trip time histogram, command code -> count for each voxRttBuckets (+ above)
+        self.voxRttSum    = {}     # Round trip time sum, command code -> round trip time sum (s)
+        self.voxLastRx    = 0.0    # Last frame received from VOX controller time
+        self.voxStat      = {'commands' : 0, 'retries' : 0, 'coalesced' : 0, 'skipped' : 0,
+                             'transactions' : 0, 'rollbacks' : 0, 'timeouts' : 0, 'heartbeats' : 0,
+                             'missedalive' : 0, 'linkdown' : 0, 'strayreplies' : 0}  # VOX config command statistics
+
+        # Config data - load default data first
+        self.sipConfigData = dataStore('sipconfig', {
+            'id' : chanId,
+            'sipusername' : '1002',
+            'sippassword' : '1234',
+            'asteriskip' : '192.168.8.101',
+            'pttset' : 'TRUE',
+            'micset' : 'TRUE',
+            'audioset' : 'TRUE',
+            'audmultset' : 'TRUE',
+            'pttto' : '60',
+            'pttmode' : '1',
+            'dtmfptton' : '#',
+            'dtmfpttoff' : '#',
+            'dtmfdebounce' : '1000'
+        })
+
+        # VOX setting data - load default vox data first
+        self.voxParamData = dataStore('voxconfig', {
+            'id' : chanId,
+            'delayaindiv' : '5',
+            'delayvaladd' : '2',
+            'threshmultp' : '0.8',
+            'threshadd' : '70',
+            'delayvalue' : '95',
+            'thresholdvalue' : '267',
+            'mode' : 'Mode 2'
+        })
+
+        # Daemon status data
+        self.daemonStat = dataStore('ricinfo', {
+            'id' : chanId,
+            'callstatus' : 'LISTENING',
+            'pttstatus' : 'OFF',
+            'pttmode' : 'Mode 1',
+            'voxmode' : 'Mode 2',
+            'voxstatus' : 'OFFLINE',
+            'intercom' : 'DISABLE',
+            'intercomstatus' : 'OFFLINE',
+            'currcallid' : 'NO'
+        }, publishRicEvent)
+
+        # Setup channel GPIO for PTT activation and PTT mode selection
+        GPIO.setup(pttPin)
+        GPIO.setup(modePin)
+        self.gpioLevel = {pttPin : GPIO.LOW, modePin : GPIO.LOW}
+
+    # Intercom mode are only served by the primary channel
+    def intercom(self):
+        return icomEnaDis == True and self.primary == True
+
+    # Load channel SIP and VOX controller configuration file
+    def loadConfig(self):
+        sipCnfg = loadChannelConfig(self.sipCnfgFile, sipCnfgDef, self.sipGroup)
+
+        self.sipUserName  = sipCnfg.raw['sipusername']   # Retrieve SIP username
+        self.sipPswd      = sipCnfg.raw['sippassword']   # Retrieve SIP password
+        self.asteriskIP   = sipCnfg.raw['asteriskip']    # Retrieve Asterisk IP
+        self.pttSet       = sipCnfg.raw['pttset']        # Retrieve PTT setting
+        self.pttEnDis     = sipCnfg.typed['pttset']      # Set PTT setting flag
+        self.micSet       = sipCnfg.raw['micset']        # Retrieve MIC setting
+        self.micEnDis     = sipCnfg.typed['micset']      # Set MIC setting flag
+        self.audioSet     = sipCnfg.raw['audioset']      # Retrieve audio setting
+        self.audioEnDis   = sipCnfg.typed['audioset']    # Set audio setting flag
+        self.audMultSet   = sipCnfg.raw['audmultset']    # Retrieve multicast audio setting
+        self.audMultEnDis = sipCnfg.typed['audmultset']  # Set multicast audio setting flag
+        self.pttToVal     = sipCnfg.raw['pttto']         # Retrive PTT time out value
+        self.pttTimeOut   = sipCnfg.typed['pttto']       # PTT time out in integer value
+        self.pttMode      = sipCnfg.raw['pttmode']       # Retrieve PTT mode of operation
+        self.pttModeOper  = sipCnfg.typed['pttmode']     # PTT mode of operation in integer value
+        self.dtmfPttOn    = sipCnfg.raw['dtmfptton']     # Retrieve DTMF PTT ON key, same key as DTMF PTT OFF key toggle the PTT
+        self.dtmfPttOff   = sipCnfg.raw['dtmfpttoff']    # Retrieve DTMF PTT OFF key
+        self.dtmfDbncVal  = sipCnfg.raw['dtmfdebounce']  # Retrieve DTMF PTT debounce time (ms)
+        self.dtmfDebounce = sipCnfg.typed['dtmfdebounce'] / 1000.0  # DTMF PTT debounce time in second
+        self.pttToken     = sipCnfg.raw['ptttoken']      # WebSocket PTT control access token, empty disable WebSocket PTT
+
+        # Load VOX controller configuration file
+        voxCnfg = loadChannelConfig(self.voxCnfgFile, voxCnfgDef, self.voxGroup)
+
+        self.delayaindiv    = voxCnfg.raw['delayaindiv']     # Retrieve VOX PTT delay analog input delay division factor
+        self.delayvaladd    = voxCnfg.raw['delayvaladd']     # Retrieve VOX PTT delay addition factor
+        self.threshmultp    = voxCnfg.raw['threshmultp']     # Retrieve VOX threshold analog input multiplication factor
+        self.threshadd      = voxCnfg.raw['threshadd']       # Retrieve VOX threshold analog input addition factor
+        self.delayvalue     = voxCnfg.raw['delayvalue']      # Retrieve VOX total delay
+        self.thresholdvalue = voxCnfg.raw['thresholdvalue']  # Retrieve VOX total threshold
+        self.voxMode        = voxCnfg.raw['mode']            # Retrieve VOX mode
+
+        # Copy current VOX config file data to python config data format
+        # This config data will provide VOX info via REST API
+        # Client can edit this config data remotely
+        self.voxParamData.update({
+            'delayaindiv' : self.delayaindiv,
+            'delayvaladd' : self.delayvaladd,
+            'threshmultp' : self.threshmultp,
+            'threshadd' : self.threshadd,
+            'delayvalue' : self.delayvalue,
+            'thresholdvalue' : self.thresholdvalue,
+            'mode' : 'Mode 1' if self.voxMode == '1' else 'Mode 2'  # Current VOX controller mode
+        })
+
+        # Copy current SIP config file data to python config data format
+        # This config data will provide info via REST API
+        # Client can edit this config data remotely
+        self.sipConfigData.update({
+            'sipusername' : self.sipUserName,
+            'sippassword' : self.sipPswd,
+            'asteriskip' : self.asteriskIP,
+            'pttset' : self.pttSet,
+            'micset' : self.micSet,
+            'audioset' : self.audioSet,
+            'audmultset' : self.audMultSet,
+            'pttto' : self.pttToVal,
+            'pttmode' : self.pttMode,
+            'dtmfptton' : self.dtmfPttOn,
+            'dtmfpttoff' : self.dtmfPttOff,
+            'dtmfdebounce' : self.dtmfDbncVal
+        })
+
+    # Check for PTT mode - Initialize the mode
+    # Hybrid PTT mode:
+    # Mode 1:
+    # When there is no PTT signal, PTT are in VOX mode
+    # When there is a PTT signal, PTT are in MANUAL mode
+
+    # Mode 2:
+    # Always in VOX PTT activation
+
+    # Mode 3:
+    # Always in MANUAL PTT activation
+
+    # Intercom mode:
+    # Always in intercom mode, and all functionalities related to RoIP
+    # will be disable, the current setting status will remain as
+    # previous except the intercom features will enable
+    def initPttMode(self):
+        # Current VOX controller mode
+        if self.voxMode == '1':
+            voxModeStat = 'Mode 1'
+        else:
+            voxModeStat = 'Mode 2'
+
+        # Intercom mode
+        if self.intercom() == True:
+            # PTT mode relay and PTT control will always ON 
+            pttEvent(self, 'ICOM_ON', 'ICOM')
+
+            # Update RIC daemon status REST API data, intercom current status set to enable
+            # All the previous RoIP setting are not been changed in this daemon information status
+            # Only RoIP functionalities are disable
+            self.daemonStat.update({
+                'pttmode' : 'Mode 3',
+                'voxmode' : voxModeStat,
+                'intercom' : 'ENABLE'
+            })
+        else:
+            # Initialize PTT mode relay - OFF for Mode 1 and 2, always ON for Mode 3
+            pttEvent(self, 'MODE', 'CFG')
+
+            # Mode 1, 2 and 3 - Update RIC daemon status REST API data
+            if self.pttModeOper in (1, 2, 3):
+                self.daemonStat.update({
+                    'pttmode' : 'Mode %d' % (self.pttModeOper),
+                    'voxmode' : voxModeStat
+                })
+
+# Load channel config file, a new channel without config file start with the default config data
+# and its config file are created by config write-behind
+def loadChannelConfig(fileName, cnfgDef, group):
+    if not os.path.exists(fileName):
+        logger.info("DEBUG_CNFG: %s not exist, use default value" % (fileName))
+        markConfigDirty(group)
+        return parseConfigText('', cnfgDef)
+    return loadConfigFile(fileName, cnfgDef)
+
+# Load radio channel list file - One channel per line:
+#   channel ID,PTT GPIO,PTT mode GPIO,VOX controller serial port,sound card capture device
+#   001,17,27,/dev/ttyUSB0,audioinjector-octo-soundcard
+# Empty line and line start with '#' are ignored. Primary channel (000) are always available, a '000' line
+# only change the primary channel radio interface
+def loadChannelList(fileName):
+    chanDefs = collections.OrderedDict([ (primChanDef[0], primChanDef) ])
+    if os.path.exists(fileName):
+        file = open(fileName, "r")
+        for line in file:
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+            fields = [ field.strip() for field in line.split(',') ]
+            # Channel ID are used in config file name and REST API config data ID
+            if len(fields) != 5 or not fields[0].isalnum() or not fields[1].isdigit() or not fields[2].isdigit():
+                logger.info("DEBUG_CNFG: Invalid channel in %s: %s, ignored" % (fileName, line))
+                continue
+            chanDefs[fields[0]] = (fields[0], int(fields[1]), int(fields[2]), fields[3], fields[4])
+        file.close()
 
-# Construct intercom group full sip address
-sipIcomAddr = 'sip:' + icomExtId + '@' + asteriskIP
+    # Each channel SIP client use its own SIP port
+    channels = collections.OrderedDict()
+    for chanIndex, chanDef in enumerate(chanDefs.values()):
+        channels[chanDef[0]] = radioChannel(*(chanDef + (sipBasePort + chanIndex, )))
+    return channels
 
-# Close config gile
-file.close()
+# Load GPIO configuration file and open GPIO backend - GPIO config file are optional, default GPIO are used
+# when the file NOT exist. Channel list '000' line still override the primary channel GPIO
+if os.path.exists(gpioCnfgFile):
+    gpioCnfg = loadConfigFile(gpioCnfgFile, gpioCnfgDef)
+else:
+    gpioCnfg = parseConfigText('', gpioCnfgDef)
+primChanDef = (primChanDef[0], gpioCnfg.typed['pttpin'], gpioCnfg.typed['modepin']) + primChanDef[3:]
+aliveLedPin = gpioCnfg.typed['aliveled']
+if macSimulation == True:
+    GPIO = mockGpio()
+else:
+    GPIO = openGpio(gpioCnfg.typed['backend'].strip().upper(), gpioCnfg.typed['chip'].strip())
+GPIO.setup(aliveLedPin)
+logger.info("DEBUG_GPIO: GPIO backend %s, ALIVE LED GPIO%d" % (GPIO.name, aliveLedPin))
+
+# Load radio channel and its configuration file
+channels = loadChannelList(chanListFile)
+primChan = channels[primChanDef[0]]
+if macVoxSerial is not None:
+    primChan.serPort = macVoxSerial
+for chanId in channels:
+    channels[chanId].loadConfig()
+if len(channels) > 1:
+    logger.info("DEBUG_CNFG: %s radio channel loaded from %s" % (len(channels), chanListFile))
+
+# Load intercom configuration file
+icomCnfg = loadChannelConfig(icomCnfgFile, icomCnfgDef, 'icom')
+
+icomSet    = icomCnfg.raw['icomset']    # Retrieve intercom enable/disable flag
+icomEnaDis = icomCnfg.typed['icomset']  # Set intercom enable/disable flag
+icomLoc    = icomCnfg.raw['icomloc']    # Retrieve intercom group location
+icomExtId  = icomCnfg.raw['icomextid']  # Retrieve intercom extension ID
+
+# Construct intercom group full sip address - Intercom mode are served by the primary channel
+sipIcomAddr = 'sip:' + icomExtId + '@' + primChan.asteriskIP
 
 ### For debugging purposes
 ##logger.info("DEBUG: Intercom Set: %s" % (icomSet))
@@ -477,203 +1724,653 @@ file.close()
 ##logger.info("DEBUG: Intercom SIP Address: %s" % (sipIcomAddr))
 ##sys.exit()
 
-# Copy current VOX config file data to python config data format
-# This config data will provide VOX info via REST API
-# Client can edit this config data remotely
-vox = [ voxX for voxX in voxParamData if (voxX['id'] == '000') ]
-vox[0]['delayaindiv'] = delayaindiv
-vox[0]['delayvaladd'] = delayvaladd
-vox[0]['threshmultp'] = threshmultp
-vox[0]['threshadd']   = threshadd
-vox[0]['delayvalue']  = delayvalue
-vox[0]['thresholdvalue']  = thresholdvalue
-
 # Copy current intercom config file data to python config data format
 # This config data will provide info via REST API
 # Client can edit this config data remotely
-icomCnfgData = [ icomCnfg for icomCnfg in icomParamData if (icomCnfg['id'] == '000') ]
-icomCnfgData[0]['icomset'] = icomSet
-icomCnfgData[0]['icomloc'] = icomLoc
-icomCnfgData[0]['icomextid'] = icomExtId
-
-# Current VOX controller mode
-if voxMode == '1':
-    vox[0]['mode']  = 'Mode 1'
+icomParamData.update({
+    'icomset' : icomSet,
+    'icomloc' : icomLoc,
+    'icomextid' : icomExtId
+})
+
+# SIP contact whitelist for incoming call and message filtering
+# Contact entry format:
+#   sip:1001@192.168.8.101  - Exact SIP address, hash set lookup
+#   sip:1001                - Exact extension from any server
+#   sip:10*@192.168.8.101   - Extension prefix from a server, prefix trie lookup
+#   sip:10*                 - Extension prefix from any server
+#   sip:*@192.168.8.101     - Any extension from a server
+class sipWhitelist:
+    def __init__(self):
+        self.exact = set()             # Exact 'user@host' entry, host '*' for any server
+        self.trie = {}                 # Extension prefix trie, character -> child node
+        self.size = 0                  # Number of contact entry
+        self.lock = threading.Lock()   # Guard whitelist update, lookup are lock free
+
+    # Split SIP address into extension (user) and server (host) part
+    # 'sip:1001@192.168.8.101;transport=udp' -> ('1001', '192.168.8.101')
+    def splitUri(self, uri):
+        uri = uri.strip().strip('<>')
+        sep = uri.find(':')
+        if uri[:sep].lower() in ('sip', 'sips'):
+            uri = uri[sep + 1:]
+        sep = uri.find(';')
+        if sep >= 0:
+            uri = uri[:sep]
+        sep = uri.rfind('@')
+        if sep < 0:
+            return uri, '*'
+        return uri[:sep], uri[sep + 1:].lower()
+
+    # Add contact entry, return False if entry already exist
+    def add(self, entry):
+        user, host = self.splitUri(entry)
+        if user == '' and host == '*':
+            return False
+        with self.lock:
+            # Extension prefix entry
+            if '*' in user:
+                node = self.trie
+                for char in user[:user.index('*')]:
+                    node = node.setdefault(char, {})
+                hosts = node.setdefault(None, set())
+                if host in hosts:
+                    return False
+                hosts.add(host)
+            # Exact entry
+            else:
+                if user + '@' + host in self.exact:
+                    return False
+                self.exact.add(user + '@' + host)
+            self.size += 1
+        return True
+
+    # Remove contact entry, return False if entry not exist
+    def remove(self, entry):
+        user, host = self.splitUri(entry)
+        with self.lock:
+            # Extension prefix entry
+            if '*' in user:
+                path = [ (None, self.trie) ]
+                node = self.trie
+                for char in user[:user.index('*')]:
+                    if char not in node:
+                        return False
+                    node = node[char]
+                    path.append((char, node))
+                if host not in node.get(None, ()):
+                    return False
+                node[None].discard(host)
+                if len(node[None]) == 0:
+                    del node[None]
+                # Prune empty trie node
+                for i in range(len(path) - 1, 0, -1):
+                    if len(path[i][1]) > 0:
+                        break
+                    del path[i - 1][1][path[i][0]]
+            # Exact entry
+            else:
+                if user + '@' + host not in self.exact:
+                    return False
+                self.exact.discard(user + '@' + host)
+            self.size -= 1
+        return True
+
+    # Check SIP address against whitelist - O(1) for exact entry, O(k) for extension prefix entry
+    # where k are the extension length
+    def match(self, uri):
+        user, host = self.splitUri(uri)
+        if user + '@' + host in self.exact or user + '@*' in self.exact:
+            return True
+        node = self.trie
+        for char in user:
+            hosts = node.get(None)
+            if hosts is not None and (host in hosts or '*' in hosts):
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        # Prefix equal to the whole extension
+        hosts = node.get(None)
+        return hosts is not None and (host in hosts or '*' in hosts)
+
+    # All contact entry, in the same format as contact list file
+    def entries(self):
+        with self.lock:
+            entries = [ 'sip:' + entry.replace('@*', '') for entry in self.exact ]
+            stack = [ ('', self.trie) ]
+            while len(stack) > 0:
+                prefix, node = stack.pop()
+                for char in node:
+                    if char is None:
+                        for host in node[None]:
+                            if host == '*':
+                                entries.append('sip:' + prefix + '*')
+                            else:
+                                entries.append('sip:' + prefix + '*@' + host)
+                    else:
+                        stack.append((prefix + char, node[char]))
+        entries.sort()
+        return entries
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, uri):
+        return self.match(uri)
+
+# Load SIP contact whitelist from contact list file, one contact entry per line
+# Empty line and line start with '#' are ignored
+def loadContactList(fileName):
+    whitelist = sipWhitelist()
+    file = open(fileName, "r")
+    for line in file:
+        entry = line.strip()
+        if entry != '' and not entry.startswith('#'):
+            whitelist.add(entry)
+    file.close()
+    return whitelist
+
+# Append contact update to contact journal - '+' add contact, '-' remove contact
+# Journal are fsync once for each update batch, caller must hold contLock
+def appendContactJournal(updates):
+    global contJournal
+    global contJournalCnt
+
+    if len(updates) == 0:
+        return
+    if contJournal is None:
+        contJournal = open(contJournalFile, "a")
+    data = ''.join([ update + '\n' for update in updates ])
+    contJournal.write(data)
+    contJournal.flush()
+    os.fsync(contJournal.fileno())
+    contJournalCnt += len(updates)
+
+    with cnfgCond:
+        persistStat['journalappend'] += len(updates)
+        persistStat['byteswritten'] += len(data)
+        persistStat['fsync'] += 1
+
+    # Journal too long, compact it into contact list file
+    if contJournalCnt >= contCompactCnt:
+        markConfigDirty('contacts')
+
+# Replay contact journal into contact whitelist - After loading contact list file
+def replayContactJournal(whitelist):
+    global contJournalCnt
+
+    if not os.path.exists(contJournalFile):
+        return
+    file = open(contJournalFile, "r")
+    for line in file:
+        line = line.strip()
+        if line.startswith('+'):
+            whitelist.add(line[1:])
+        elif line.startswith('-'):
+            whitelist.remove(line[1:])
+        else:
+            continue
+        contJournalCnt += 1
+    file.close()
+
+# Compact contact journal - Write whole contact whitelist to contact list file, then empty the journal
+def compactContactList():
+    global contJournal
+    global contJournalCnt
+
+    with contLock:
+        atomicWriteFile(contListFile, ''.join([ entry + '\n' for entry in siplist.entries() ]))
+        if contJournal is not None:
+            contJournal.close()
+            contJournal = None
+        # Journal update already in contact list file
+        file = open(contJournalFile, "w")
+        file.close()
+        contJournalCnt = 0
+
+    with cnfgCond:
+        persistStat['compaction'] += 1
+
+# Contact are valid with SIP URI user part and without control character, newline inside a contact would add
+# another update to the line based contact journal
+def validContact(entry):
+    for c in entry:
+        if ord(c) < 32 or ord(c) == 127:
+            return False
+    user, host = siplist.splitUri(entry)
+    return user != ''
+
+# Add contact entries to contact whitelist, contact are available for call filtering immediately
+# Return number of contact added
+def addContacts(entries):
+    with contLock:
+        updates = [ '+' + entry for entry in entries if siplist.add(entry) ]
+        appendContactJournal(updates)
+    return len(updates)
+
+# Load SIP contact whitelist, contact list file and its journal
+if os.path.exists(contListFile):
+    siplist = loadContactList(contListFile)
 else:
-    vox[0]['mode']  = 'Mode 2'
-
-# Check for PTT mode - Initialize the mode
-# Hybrid PTT mode:
-# Mode 1:
-# When there is no PTT signal, PTT are in VOX mode
-# When there is a PTT signal, PTT are in MANUAL mode
-
-# Mode 2:
-# Always in VOX PTT activation
-
-# Mode 3:
-# Always in MANUAL PTT activation
-
-# Intercom mode:
-# Always in intercom mode, and all functionalities related to RoIP
-# will be disable, the current setting status will remain as
-# previous except the intercom features will enable
-
-# Intercom mode
-if icomEnaDis == True:
-    # PTT mode relay always ON
-    GPIO.output(12, GPIO.HIGH)
-    # PTT control will always ON 
-    GPIO.output(4, GPIO.HIGH)
-    
-    # Update RIC daemon status REST API data
-    # All the previous RoIP setting are not been changed in this daemon information status
-    # Only RoIP functionalities are disable
-    ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-    ric[0]['pttmode'] = 'Mode 3'
+    siplist = sipWhitelist()
+replayContactJournal(siplist)
+if contJournalCnt > 0:
+    markConfigDirty('contacts')
+
+# Optional macro if we want to filter incoming call
+if macCallFilt == True:
+    logger.info("DEBUG_CALL: %s contact loaded from %s" % (len(siplist), contListFile))
+
+# Initialize back daemon from intercom to RoIP mode - Daemon status field of the caller are updated at once with
+# the PTT and VOX mode
+def initRoIpMode(chan, daemonStat={}):
+    # Diasble back PTT control signal, PTT mode relay follow the PTT mode
+    pttEvent(chan, 'ICOM_OFF', 'ICOM')
+
     # Current VOX controller mode
-    if voxMode == '1':
-        ric[0]['voxmode'] = 'Mode 1'
+    if chan.voxMode == '1':
+        voxModeStat = 'Mode 1'
     else:
-        ric[0]['voxmode'] = 'Mode 2'
-
-    # Intercom current status set to enable
-    ric[0]['intercom'] = 'ENABLE'
-else:
-    # Mode 1
-    if pttModeOper == 1:
-        # Initialize PTT mode relay OFF
-        GPIO.output(12, GPIO.LOW)
-        
-        # Update RIC daemon status REST API data
-        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-        ric[0]['pttmode'] = 'Mode 1'
-        # Current VOX controller mode
-        if voxMode == '1':
-            ric[0]['voxmode'] = 'Mode 1'
+        voxModeStat = 'Mode 2'
+
+    # Mode 1, 2 and 3 - Update RIC daemon status REST API data
+    daemonStat = dict(daemonStat)
+    if chan.pttModeOper in (1, 2, 3):
+        daemonStat.update({
+            'pttmode' : 'Mode %d' % (chan.pttModeOper),
+            'voxmode' : voxModeStat
+        })
+    chan.daemonStat.update(daemonStat)
+
+# Manual PTT guard - Manual PTT only valid in none intercom mode, Mode 1 and 3, PTT enable and the call are connected
+def manualPttAllowed(chan):
+    return chan.intercom() == False and chan.pttModeOper in (1, 3) and chan.pttEnDis == True and chan.callconn == True
+
+# PTT time out guard - Only the PTT time out timer of the current PTT ON are valid, a late timer from a previous
+# PTT ON are ignored
+def pttTimerExpired(chan):
+    return chan.pttTimer is not None and chan.pttTimer.pending == False
+
+# PTT state machine - One PTT state for each radio channel, shared by all PTT source
+# PTT state:
+#   'OFF'  - PTT released, PTT mode relay follow the PTT mode (ON for Mode 3)
+#   'ON'   - Manual PTT active, PTT mode relay and PTT control ON
+#   'ICOM' - Intercom mode, PTT mode relay and PTT control always ON
+# PTT event:
+#   'PTT_ON', 'PTT_OFF' - Manual PTT from DTMF, SIP message ('SIP') and WebSocket ('WS') PTT control
+#   'TIMEOUT'           - PTT still ON after PTT time out ('TOUT')
+#   'CALL_END'          - Call END or ERROR ('CALL')
+#   'MODE'              - PTT mode of operation initialized or changed ('CFG')
+#   'ICOM_ON', 'ICOM_OFF' - Intercom group joined, revert back to RoIP mode ('ICOM')
+# (state, event) : (next state, result, guard) - Event not in the table are DENIED
+pttFsmTable = {
+    ('OFF',  'PTT_ON')   : ('ON',   'ACK',  manualPttAllowed),
+    ('OFF',  'PTT_OFF')  : ('OFF',  'IDLE', manualPttAllowed),
+    ('OFF',  'TIMEOUT')  : ('OFF',  'IDLE', None),
+    ('OFF',  'CALL_END') : ('OFF',  'IDLE', None),
+    ('OFF',  'MODE')     : ('OFF',  'ACK',  None),
+    ('OFF',  'ICOM_ON')  : ('ICOM', 'ACK',  None),
+    ('OFF',  'ICOM_OFF') : ('OFF',  'ACK',  None),
+    ('ON',   'PTT_ON')   : ('ON',   'BUSY', manualPttAllowed),
+    ('ON',   'PTT_OFF')  : ('OFF',  'ACK',  manualPttAllowed),
+    ('ON',   'TIMEOUT')  : ('OFF',  'ACK',  pttTimerExpired),
+    ('ON',   'CALL_END') : ('OFF',  'ACK',  None),
+    ('ON',   'MODE')     : ('OFF',  'ACK',  None),
+    ('ON',   'ICOM_ON')  : ('ICOM', 'ACK',  None),
+    ('ON',   'ICOM_OFF') : ('OFF',  'ACK',  None),
+    ('ICOM', 'ICOM_ON')  : ('ICOM', 'ACK',  None),
+    ('ICOM', 'ICOM_OFF') : ('OFF',  'ACK',  None)
+}
+
+# PTT GPIO level for a PTT state - (PTT control, PTT mode relay)
+def pttOutputs(chan, state):
+    if state == 'ON' or state == 'ICOM':
+        return GPIO.HIGH, GPIO.HIGH
+    return GPIO.LOW, (GPIO.HIGH if chan.pttModeOper == 3 else GPIO.LOW)
+
+# PTT state machine transition - Return 'ACK' when the transition are applied, 'BUSY' for PTT ON during a PTT
+# event, 'IDLE' for PTT OFF without a PTT event and 'DENIED' when the event are not valid in the current state
+# rxTime are the time the event received from its source, event to GPIO latency are kept for each source
+def pttEvent(chan, event, source, rxTime=None):
+    if rxTime is None:
+        rxTime = time.time()
+
+    with pttLock:
+        transition = pttFsmTable.get((chan.pttState, event))
+        if transition is None:
+            return 'DENIED'
+        nextState, result, guard = transition
+        if guard is not None and guard(chan) == False:
+            return 'DENIED'
+        if result != 'ACK':
+            return result
+
+        # PTT mode relay are set before PTT control ON and PTT control are released before PTT mode relay OFF
+        # Only GPIO with a new level are written
+        pttLevel, modeLevel = pttOutputs(chan, nextState)
+        pttWasOn = chan.gpioLevel.get(chan.pttPin) == GPIO.HIGH
+        if pttLevel == GPIO.HIGH:
+            outputs = ((chan.modePin, modeLevel), (chan.pttPin, pttLevel))
         else:
-            ric[0]['voxmode'] = 'Mode 2'
-    # Mode 2
-    elif pttModeOper == 2:
-        # PTT mode relay always OFF
-        GPIO.output(12, GPIO.LOW)
+            outputs = ((chan.pttPin, pttLevel), (chan.modePin, modeLevel))
+        for pin, level in outputs:
+            if chan.gpioLevel.get(pin) != level:
+                GPIO.output(pin, level)
+                chan.gpioLevel[pin] = level
+        outTime = time.time()
+
+        chan.pttLog.append((outTime, source, event, chan.pttState, nextState))
+        chan.pttState = nextState
+        chan.pttSrc = source
+
+        # PTT time out are armed when PTT ON and cancelled when PTT released
+        daemonTimer.cancel(chan.pttTimer)
+        chan.pttTimer = None
+        if nextState == 'ON' and chan.pttTimeOut > 0:
+            chan.pttTimer = daemonTimer.arm(chan.pttTimeOut, pttTimeout, chan)
+        pttTransCnt[source] = pttTransCnt.get(source, 0) + 1
+        pttLatency.setdefault(source, collections.deque(maxlen=256)).append(outTime - rxTime)
+
+        # PTT activation and airtime metric
+        if pttLevel == GPIO.HIGH and pttWasOn == False:
+            chan.pttOnTime = outTime
+            metPttOn.inc((chan.chanId, source))
+        elif pttLevel != GPIO.HIGH and pttWasOn == True:
+            metPttAirtime.inc((chan.chanId, ), outTime - chan.pttOnTime)
+        metPttLatency.observe((source, ), outTime - rxTime)
 
         # Update RIC daemon status REST API data
-        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-        ric[0]['pttmode'] = 'Mode 2'
-        # Current VOX controller mode
-        if voxMode == '1':
-            ric[0]['voxmode'] = 'Mode 1'
+        chan.daemonStat['pttstatus'] = 'ON' if nextState == 'ON' else 'OFF'
+    return 'ACK'
+
+# Create time out for PTT signal, if caller are NOT deactivate it
+# PTT still ON after PTT time out setting, then OFF it
+# Previous PTT source - DTMF '#' from IP phone, SIP message from Tactical SIP application or WebSocket PTT control
+def pttTimeout(chan):
+    pttSrc = chan.pttSrc
+    if pttEvent(chan, 'TIMEOUT', 'TOUT') == 'ACK':
+        logger.info("DEBUG_%s_PTT: Time OUT! PTT still ON, OFF PTT, channel %s" % (pttSrc, chan.chanId))
+
+# Manual PTT activation - Used by DTMF, SIP message and WebSocket PTT control ('DTMF', 'SIP', 'WS' source)
+def manualPtt(chan, pttOn, source, rxTime=None):
+    return pttEvent(chan, 'PTT_ON' if pttOn == True else 'PTT_OFF', source, rxTime)
+
+# PTT state machine statistics - Transition count and event to GPIO latency (ms) for each PTT source
+def pttStats():
+    stats = {}
+    with pttLock:
+        for source in pttLatency:
+            latency = sorted(pttLatency[source])
+            stats[source] = {
+                'transitions' : pttTransCnt[source],
+                'latencyp50' : round(latency[len(latency) // 2] * 1e3, 3),
+                'latencyp99' : round(latency[int(len(latency) * 0.99)] * 1e3, 3)
+            }
+    return stats
+
+# Initialize each channel PTT mode - After the PTT state machine are available
+for chanId in channels:
+    channels[chanId].initPttMode()
+
+# DTMF PTT engine - DTMF key received from the call
+# The first PTT key act immediately, the same key repeated within the debounce time are ignored (a DTMF
+# key can be received several time for one key press). The same PTT ON and PTT OFF key toggle the PTT.
+# Debounce time are a daemon timer, restarted by each repeated key
+def dtmfPtt(chan, dtmf, rxTime):
+    if dtmf != chan.dtmfPttOn and dtmf != chan.dtmfPttOff:
+        return None
+    dtmfStat['received'] += 1
+
+    # DTMF PTT only valid in none intercom mode, Mode 2 always in VOX PTT activation
+    if chan.intercom() == False and chan.pttModeOper == 2:
+        logger.info("DEBUG_DTMF_PTT: PTT are in VOX mode (Mode 2)")
+        return 'DENIED'
+
+    # Key repeated within the debounce time
+    debounced = daemonTimer.cancel(chan.dtmfTimer)
+    chan.dtmfTimer = daemonTimer.arm(chan.dtmfDebounce, None)
+    if debounced == True:
+        dtmfStat['debounced'] += 1
+        return None
+
+    # Toggle PTT
+    if chan.dtmfPttOn == chan.dtmfPttOff:
+        pttOn = chan.pttState != 'ON'
+    else:
+        pttOn = dtmf == chan.dtmfPttOn
+
+    pttResult = manualPtt(chan, pttOn, 'DTMF', rxTime)
+    if pttResult == 'ACK':
+        dtmfStat['ptt'] += 1
+        logger.info("DEBUG_DTMF_PTT: Receive PTT signal, %s PTT" % ('ON' if pttOn == True else 'OFF'))
+    return pttResult
+
+# Apply updated SIP config data to the running daemon
+# Used by REST API config update and config file hot reload
+def applySipConfig(chan, changed):
+    # WebSocket PTT control access token are only kept in SIP config file, not in REST API data
+    if 'ptttoken' in changed:
+        chan.pttToken = changed.pop('ptttoken')
+        logger.info("DEBUG_CNFG: WebSocket PTT access token updated")
+
+    chan.sipConfigData.update(changed)
+    cnfg = chan.sipConfigData.snapshot()
+
+    chan.sipUserName = cnfg['sipusername']
+    chan.sipPswd = cnfg['sippassword']
+    chan.asteriskIP = cnfg['asteriskip']
+    chan.pttSet = cnfg['pttset']
+    chan.micSet = cnfg['micset']
+    chan.audioSet = cnfg['audioset']
+    chan.audMultSet = cnfg['audmultset']
+    chan.pttToVal = cnfg['pttto']
+    chan.pttMode = cnfg['pttmode']
+    chan.dtmfPttOn = cnfg['dtmfptton']
+    chan.dtmfPttOff = cnfg['dtmfpttoff']
+    chan.dtmfDbncVal = cnfg['dtmfdebounce']
+
+    chan.pttEnDis = cnfgBool(chan.pttSet)
+    chan.audioEnDis = cnfgBool(chan.audioSet)
+    chan.audMultEnDis = cnfgBool(chan.audMultSet)
+
+    # MIC setting are applied to linphone core at SIP client thread
+    if 'micset' in changed:
+        chan.micEnDis = cnfgBool(chan.micSet)
+        chan.sipMicUpdt = True
+        chan.coreSched.post()
+
+    # SIP account updated, SIP client thread will register again to Asterisk server
+    if 'sipusername' in changed or 'sippassword' in changed or 'asteriskip' in changed:
+        chan.sipReRegist = True
+        chan.coreSched.post()
+
+    # Update PTT time out value
+    if 'pttto' in changed:
+        try:
+            chan.pttTimeOut = int(chan.pttToVal)
+        except ValueError:
+            logger.info("DEBUG_CNFG: Invalid PTT time out value: %s" % (chan.pttToVal))
+
+    # Update DTMF PTT debounce time
+    if 'dtmfdebounce' in changed:
+        try:
+            chan.dtmfDebounce = int(chan.dtmfDbncVal) / 1000.0
+        except ValueError:
+            logger.info("DEBUG_CNFG: Invalid DTMF debounce value: %s" % (chan.dtmfDbncVal))
+
+    # Update PTT mode of operation
+    if 'pttmode' in changed:
+        try:
+            chan.pttModeOper = int(chan.pttMode) # Update PTT mode to be use in PTT logic of operation
+        except ValueError:
+            logger.info("DEBUG_CNFG: Invalid PTT mode value: %s" % (chan.pttMode))
+
+        # PTT mode relay only follow RoIP mode, intercom mode always in PTT mode relay ON
+        if chan.intercom() == False:
+            # PTT mode relay OFF for Mode 1 and 2, always ON for Mode 3. Manual PTT are released
+            pttEvent(chan, 'MODE', 'CFG')
+
+            # Mode 1, 2 and 3 - Update RIC daemon status REST API data
+            if chan.pttModeOper in (1, 2, 3):
+                chan.daemonStat.update({
+                    'pttmode' : 'Mode %d' % (chan.pttModeOper)
+                })
+
+# Apply updated VOX controller config data to the running daemon - Config file hot reload
+def applyVoxConfig(chan, changed):
+    # Copy previous value as a backup if configuring VOX controller failed
+    if 'delayaindiv' in changed:
+        voxBackup(chan, 1)
+        chan.delayaindiv = changed['delayaindiv']
+    if 'delayvaladd' in changed:
+        voxBackup(chan, 2)
+        chan.delayvaladd = changed['delayvaladd']
+    if 'threshmultp' in changed:
+        voxBackup(chan, 3)
+        chan.threshmultp = changed['threshmultp']
+    if 'threshadd' in changed:
+        voxBackup(chan, 4)
+        chan.threshadd = changed['threshadd']
+    if 'delayvalue' in changed:
+        voxBackup(chan, 5)
+        chan.delayvalue = changed['delayvalue']
+    if 'thresholdvalue' in changed:
+        voxBackup(chan, 6)
+        chan.thresholdvalue = changed['thresholdvalue']
+
+    voxUpdate = dict(changed)
+    if 'mode' in changed:
+        voxBackup(chan, 7)
+        chan.voxMode = changed['mode']
+        if chan.voxMode == '1':
+            voxUpdate['mode'] = 'Mode 1'
         else:
-            ric[0]['voxmode'] = 'Mode 2'
-    # Mode 3
-    elif pttModeOper == 3:
-        # PTT mode relay always ON
-        GPIO.output(12, GPIO.HIGH)
+            voxUpdate['mode'] = 'Mode 2'
 
         # Update RIC daemon status REST API data
-        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-        ric[0]['pttmode'] = 'Mode 3'
-        # Current VOX controller mode
-        if voxMode == '1':
-            ric[0]['voxmode'] = 'Mode 1'
-        else:
-            ric[0]['voxmode'] = 'Mode 2'
-        
-# Copy current SIP config file data to python config data format
-# This config data will provide info via REST API
-# Client can edit this config data remotely
-cnfgData = [ config for config in sipConfigData if (config['id'] == '000') ]
-cnfgData[0]['sipusername'] = sipUserName
-cnfgData[0]['sippassword'] = sipPswd
-cnfgData[0]['asteriskip'] = asteriskIP
-cnfgData[0]['pttset'] = pttSet
-cnfgData[0]['micset'] = micSet
-cnfgData[0]['audioset'] = audioSet
-cnfgData[0]['audmultset'] = audMultSet
-cnfgData[0]['pttto'] = pttToVal
-cnfgData[0]['pttmode'] = pttMode
+        chan.daemonStat['voxmode'] = voxUpdate['mode']
+    chan.voxParamData.update(voxUpdate)
+
+    # Queue the updated parameter to VOX controller - VOX mode first since it also send the mode main parameter,
+    # then each updated parameter of the current VOX mode
+    if 'mode' in changed:
+        voxSend(chan, 7)
+    for cmdType in sorted(voxCmdTable):
+        if voxCnfgKeys[cmdType - 1] in changed and voxCmdTable[cmdType][0] == chan.voxMode:
+            voxSend(chan, cmdType)
+
+# Intercom group delay reconnection by 10s
+# Initiate intercom reconnection process after the delay, at primary channel SIP client thread
+def joinIcomTimeout():
+    global strtJoinIcom
 
-# Optional macro if we want to filter incoming call
-# Load the contact list from text file list
-if macCallFilt == True:
-    # Open contact list, stored contact list in python list
-    #file = open("/etc/conf.d/sipHFradio/sipHFradioCont.list", "r")
-    file = open("/etc/conf.d/sipradio/sipradioCont.list", "r")
-    # Retrieve SIP contact list from stored list
-    for i in range(100):
-        tempdata = file.readline()
-        tempdata = tempdata.strip('\n') # Get rid of new line character
-        # Initial state the list are emptied, add first data
-        if siplist == '':
-            # Data exist inside stored list
-            if tempdata != '':
-                siplist = [tempdata]
-                tempdata = ''
-            # NO data remain inside stored list
-            else:
-                break
-        # Python list are not emptied, append the data
-        else:
-            # Data exist inside stored list
-            if tempdata != '':
-                siplist.append(tempdata)
-                tempdata = ''
-            # NO data remain inside stored list
-            else:
-                break
-    # Close the file
-    file.close()
+    if icomEnaDis == True:
+        strtJoinIcom = True
+        primChan.coreSched.post()
 
-# Initialize back daemon from intercom to RoIP mode
-def initRoIpMode():
-    global pttModeOper
-    global voxMode
-    global daemonStat
+        logger.info("DEBUG_INTERCOM: Prepare to joining intercom group....")
 
-    # Diasble back PTT control signal
-    GPIO.output(4, GPIO.LOW)
-    
-    # Mode 1
-    if pttModeOper == 1:
-        # Initialize PTT mode relay OFF
-        GPIO.output(12, GPIO.LOW)
-        
-        # Update RIC daemon status REST API data
-        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-        ric[0]['pttmode'] = 'Mode 1'
-        # Current VOX controller mode
-        if voxMode == '1':
-            ric[0]['voxmode'] = 'Mode 1'
-        else:
-            ric[0]['voxmode'] = 'Mode 2'
-    # Mode 2
-    elif pttModeOper == 2:
-        # PTT mode relay always OFF
-        GPIO.output(12, GPIO.LOW)
+# Start a delay before intercom reconnection process are initiated
+def startJoinTimer():
+    global icomJoinTimer
 
-        # Update RIC daemon status REST API data
-        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-        ric[0]['pttmode'] = 'Mode 2'
-        # Current VOX controller mode
-        if voxMode == '1':
-            ric[0]['voxmode'] = 'Mode 1'
-        else:
-            ric[0]['voxmode'] = 'Mode 2'
-    # Mode 3
-    elif pttModeOper == 3:
-        # PTT mode relay always ON
-        GPIO.output(12, GPIO.HIGH)
+    daemonTimer.cancel(icomJoinTimer)
+    icomJoinTimer = daemonTimer.arm(icomJoinDly, joinIcomTimeout)
 
-        # Update RIC daemon status REST API data
-        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-        ric[0]['pttmode'] = 'Mode 3'
-        # Current VOX controller mode
-        if voxMode == '1':
-            ric[0]['voxmode'] = 'Mode 1'
+# Cancel intercom reconnection delay
+def stopJoinTimer():
+    global icomJoinTimer
+
+    daemonTimer.cancel(icomJoinTimer)
+    icomJoinTimer = None
+
+# Apply updated intercom config data to the running daemon
+# Used by REST API config update and config file hot reload
+def applyIcomConfig(changed):
+    global icomSet
+    global icomLoc
+    global icomExtId
+    global icomEnaDis
+    global icomToRoIP
+
+    icomParamData.update(changed)
+    iCnfg = icomParamData.snapshot()
+
+    icomSet = iCnfg['icomset']
+    icomLoc = iCnfg['icomloc']
+    icomExtId = iCnfg['icomextid']
+
+    # Update global intercom enable/disable flag
+    if 'icomset' in changed:
+        # Enable intercom mode
+        if icomSet == 'TRUE':
+            icomEnaDis = True
+            if icomToRoIP == False:
+                startJoinTimer()
+        # Disable intercom mode
         else:
-            ric[0]['voxmode'] = 'Mode 2'
+            icomEnaDis = False
+
+        # Mode are changed at primary channel SIP client thread
+        primChan.coreSched.post()
 
+# Config group hot reload - Config group: (config definition, apply config data function)
+cnfgReload = {
+    'icom' : (icomCnfgDef, applyIcomConfig)
+}
+for chanId in channels:
+    cnfgReload[channels[chanId].sipGroup] = (sipCnfgDef, functools.partial(applySipConfig, channels[chanId]))
+    cnfgReload[channels[chanId].voxGroup] = (voxCnfgDef, functools.partial(applyVoxConfig, channels[chanId]))
+
+# Reload config group file edited outside the daemon, only changed config data are applied
+def reloadConfigGroup(group):
+    cnfgFile, cnfgText = cnfgGroups[group]
+    cnfgDef, applyConfig = cnfgReload[group]
+
+    # Config file written by this daemon, nothing new to apply
+    stamp = fileStamp(cnfgFile)
+    if stamp is None or stamp == cnfgOwnStamp.get(cnfgFile):
+        return
+
+    try:
+        cnfg = loadConfigFile(cnfgFile, cnfgDef)
+    except (IOError, OSError):
+        logger.info("DEBUG_CNFG: ERROR during reading config file: %s" % (cnfgFile))
+        return
+
+    # Compare against current config data in memory
+    current = parseConfigText(cnfgText(), cnfgDef)
+    changed = {}
+    for field in cnfg.raw:
+        if cnfg.raw[field] != current.raw[field]:
+            changed[field] = cnfg.raw[field]
+
+    if len(changed) > 0:
+        logger.info("DEBUG_CNFG: Reload %s, updated: %s" % (cnfgFile, ', '.join(sorted(changed.keys()))))
+        applyConfig(changed)
+
+# Start inotify watch on config directory - Config file closed after write or renamed into the directory
+def inotifyWatch(dirName):
+    libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    fd = libc.inotify_init()
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), 'inotify_init failed')
+    if libc.inotify_add_watch(fd, dirName.encode(), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        os.close(fd)
+        raise OSError(ctypes.get_errno(), 'inotify_add_watch failed')
+    return fd
+
+# Retrieve file names from a buffer of inotify events
+def inotifyNames(buf):
+    names = []
+    offset = 0
+    while offset + 16 <= len(buf):
+        wd, mask, cookie, nameLen = struct.unpack_from('iIII', buf, offset)
+        name = buf[offset + 16:offset + 16 + nameLen].rstrip(b'\0')
+        names.append(name.decode())
+        offset += 16 + nameLen
+    return names
 
 ### Serial communication port for VOX controller configuration
 ##serPort = "/dev/ttyUSB0"    # VOX controller detected serial port
@@ -683,33 +2380,266 @@ def initRoIpMode():
 ##voxSerComm = serial.Serial(serPort, serPortBRate)
 ##voxSerComm.flushInput()
 
+# Simulated SIP address
+class simAddress:
+    def __init__(self, uri):
+        self.uri = uri
+
+    @staticmethod
+    def new(uri):
+        return simAddress(uri)
+
+    def as_string_uri_only(self):
+        return self.uri
+
+# Simulated SIP call
+class simCall:
+    def __init__(self, remoteAddress, params=None):
+        self.remote_address = remoteAddress
+        self.params = params
+
+# Simulated SIP call parameter, SIP proxy config, SIP transport and audio codec - Keep the daemon setting only
+class simSetting:
+    def __init__(self, **setting):
+        self.__dict__.update(setting)
+
+# Simulated SIP chat room - Sent SIP message are recorded at the simulated SIP core
+class simChatRoom:
+    def __init__(self, core, uri):
+        self.core = core
+        self.uri = uri
+
+    def create_message(self, text):
+        return simSetting(from_address=simAddress(self.uri), text=text)
+
+    def send_chat_message(self, message):
+        self.core.sent.append((time.time(), self.uri, message.text))
+
+# Simulated SIP core - Injected SIP event are dispatched to the SIP client callback at the next core iterate,
+# the same as linphone core callback are called from the SIP client thread
+class simCore:
+    def __init__(self, callbacks):
+        self.callbacks = callbacks
+        self.lock = threading.Lock()     # Guard SIP call list
+        self.events = collections.deque()  # Injected SIP event waiting for core iterate
+        self.calls = []                  # SIP call in progress
+        self.proxyConfigs = []
+        self.authInfo = []
+        self.sent = collections.deque(maxlen=1024)  # Sent SIP message, (time, SIP address, message text)
+        self.iterations = 0
+        self.wake = None                 # Called after a SIP event injected - SIP client core scheduler post
+        self.max_calls = 1
+        self.echo_cancellation_enabled = False
+        self.video_capture_enabled = False
+        self.video_display_enabled = False
+        self.mic_enabled = True
+        self.firewall_policy = None
+        self.capture_device = ''
+        self.sip_transports = simSetting(udp_port=5060)
+        self.audio_codecs = [ simSetting(mime_type=mime) for mime in ('PCMU', 'PCMA', 'opus') ]
+        self.payloadTypes = {}
+
+    @staticmethod
+    def new(callbacks, configPath, factoryPath):
+        return simCore(callbacks)
+
+    @property
+    def calls_nb(self):
+        return len(self.calls)
+
+    @property
+    def default_proxy_config(self):
+        return self.proxyConfigs[0] if len(self.proxyConfigs) > 0 else None
+
+    def enable_payload_type(self, codec, enabled):
+        self.payloadTypes[codec.mime_type] = enabled
+
+    def create_address(self, uri):
+        return simAddress(uri)
+
+    def create_proxy_config(self):
+        return simSetting(identity_address=None, server_addr='', register_enabled=False,
+                          state=simLinphone.RegistrationState.Progress)
+
+    def add_proxy_config(self, proxyCnfg):
+        self.proxyConfigs.append(proxyCnfg)
+
+    def clear_proxy_config(self):
+        del self.proxyConfigs[:]
+
+    def create_auth_info(self, username, userId, password, ha1, realm, domain):
+        return simSetting(username=username, password=password, domain=domain)
+
+    def add_auth_info(self, authInfo):
+        self.authInfo.append(authInfo)
+
+    def clear_all_auth_info(self):
+        del self.authInfo[:]
+
+    def create_call_params(self, call):
+        return simSetting(audio_enabled=True, audio_multicast_enabled=False, video_multicast_enabled=False)
+
+    def accept_call_with_params(self, call, params):
+        call.params = params
+        self.inject('CALL', call, simLinphone.CallState.Connected)
+
+    def decline_call(self, call, reason):
+        self.inject('CALL', call, simLinphone.CallState.End)
+
+    def invite_address_with_params(self, address, params):
+        call = simCall(address, params)
+        with self.lock:
+            self.calls.append(call)
+        self.inject('CALL', call, simLinphone.CallState.Connected)
+        return call
+
+    def terminate_all_calls(self):
+        with self.lock:
+            calls = list(self.calls)
+        for call in calls:
+            self.inject('CALL', call, simLinphone.CallState.End)
+
+    def get_chat_room_from_uri(self, uri):
+        return simChatRoom(self, uri)
+
+    # Dispatch injected SIP event to SIP client callback
+    def iterate(self):
+        self.iterations += 1
+        while len(self.events) > 0:
+            event = self.events.popleft()
+            if event[0] == 'CALL':
+                call, state = event[1:]
+                if state == simLinphone.CallState.End or state == simLinphone.CallState.Error:
+                    with self.lock:
+                        if call in self.calls:
+                            self.calls.remove(call)
+                self.callbacks['call_state_changed'](self, call, state, '')
+            elif event[0] == 'DTMF':
+                self.callbacks['dtmf_received'](self, event[1], event[2])
+            elif event[0] == 'MESSAGE':
+                room = simChatRoom(self, event[1])
+                self.callbacks['message_received'](self, room, room.create_message(event[2]))
+            elif event[0] == 'REGISTER':
+                for proxyCnfg in self.proxyConfigs:
+                    proxyCnfg.state = event[1]
+                if event[1] == simLinphone.RegistrationState.Ok and simLinphone.logHandler is not None:
+                    simLinphone.logHandler('info', 'REGISTER %s 200 OK' % (self.proxyConfigs[0].server_addr
+                                                                           if len(self.proxyConfigs) > 0 else ''))
+
+    # Inject SIP event, called from other thread - ('CALL', call, state), ('DTMF', call, key),
+    # ('MESSAGE', sender SIP address, message text) or ('REGISTER', registration state)
+    def inject(self, *event):
+        self.events.append(event)
+        if self.wake is not None:
+            self.wake()
+
+    # Inject incoming call from a SIP address - Return the simulated call
+    def incomingCall(self, uri):
+        call = simCall(simAddress(uri))
+        with self.lock:
+            self.calls.append(call)
+        self.inject('CALL', call, simLinphone.CallState.IncomingReceived)
+        return call
+
+    # Inject remote call end, current call when call are NOT set
+    def endCall(self, call=None):
+        with self.lock:
+            if call is None and len(self.calls) > 0:
+                call = self.calls[0]
+        if call is not None:
+            self.inject('CALL', call, simLinphone.CallState.End)
+
+    # Inject DTMF key on the current call
+    def dtmf(self, key):
+        with self.lock:
+            call = self.calls[0] if len(self.calls) > 0 else None
+        self.inject('DTMF', call, ord(key))
+
+    # Inject SIP message from a SIP address
+    def message(self, uri, text):
+        self.inject('MESSAGE', uri, text)
+
+    # Inject SIP registration state change
+    def registration(self, state):
+        self.inject('REGISTER', state)
+
+# Simulated linphone library - Used instead of linphone in simulation mode (SIMULATION macro)
+class simLinphone:
+    class CallState:
+        IncomingReceived = 1
+        Connected = 6
+        Error = 12
+        End = 13
+
+    class Reason:
+        Declined = 3
+
+    class FirewallPolicy:
+        PolicyUseIce = 3
+
+    class RegistrationState:
+        Progress = 1
+        Ok = 2
+        Cleared = 3
+        Failed = 4
+
+    Core = simCore
+    Address = simAddress
+    logHandler = None
+
+    @staticmethod
+    def set_log_handler(handler):
+        simLinphone.logHandler = handler
+
+if macSimulation == True:
+    linphone = simLinphone
+
+# Write linphone log to the log file - linphone log below SIPLOG macro level are dropped
+def sipLog(level, msg):
+    levelNo = logLevels.get(level, logging.INFO)
+    if levelNo < sipLogLevel:
+        logStat['sipfiltered'] += 1
+        return
+    logger.log(levelNo, msg, extra={'subsystem' : 'SIP'})
+
+# SIP client - One SIP client for each radio channel
 class radioSIPclient:
-    def __init__(self, username='', password='', snd_capture=''):
+    def __init__(self, chan):
+        self.chan = chan
         self.quit = False
+        self.coreActive = False  # SIP event dispatched during the last core iterate
         callbacks = {
             'call_state_changed': self.call_state_changed,
             'message_received': self.message_received,
+            'dtmf_received': self.dtmf_received,
         }
         
         # Configure the linphone core
         #logging.basicConfig(level=logging.INFO) # Logging setting without log files, for testing
-        signal.signal(signal.SIGINT, self.signal_handler)
-        linphone.set_log_handler(self.log_handler)
+        # Daemon termination signal and linphone log are handled by primary channel SIP client
+        if chan.primary == True:
+            signal.signal(signal.SIGINT, self.signal_handler)
+            linphone.set_log_handler(self.log_handler)
         self.core = linphone.Core.new(callbacks, None, None)
         self.core.max_calls = 1
         self.core.echo_cancellation_enabled = False
         self.core.video_capture_enabled = False
         self.core.video_display_enabled = False
 
+        # Secondary channel SIP client listen on its own SIP port
+        if chan.primary == False:
+            transports = self.core.sip_transports
+            transports.udp_port = chan.sipPort
+            self.core.sip_transports = transports
+
         # Enable MIC/Audio IN
-        global micEnDis
-        self.core.mic_enabled = micEnDis
+        self.core.mic_enabled = chan.micEnDis
 
         self.core.firewall_policy = linphone.FirewallPolicy.PolicyUseIce
 
         # Initialize audio capture card
-        if len(snd_capture):
-            self.core.capture_device = snd_capture
+        if len(chan.captureDev):
+            self.core.capture_device = chan.captureDev
 
         # Only enable PCMU (Ulaw) and PCMA (Alaw) audio codecs
         for codec in self.core.audio_codecs:
@@ -719,181 +2649,92 @@ class radioSIPclient:
                 self.core.enable_payload_type(codec, False)
 
         # Register to VDG+ Asterisk server
-        global asteriskIP
-        self.configure_sip_account(username, password, asteriskIP)
+        self.configure_sip_account(chan.sipUserName, chan.sipPswd, chan.asteriskIP)
 
-    # Daemon termination signal handler
+    # Daemon termination signal handler - Stop all channel SIP client
     def signal_handler(self, signal, frame):
-        self.core.terminate_all_calls()
-        self.quit = True
+        for chanId in channels:
+            if channels[chanId].sipClient is not None:
+                channels[chanId].sipClient.quit = True
+                channels[chanId].coreSched.post()
 
-    # Print daemon log events, also retrieve DTMF character
+    # Print daemon log events
     def log_handler(self, level, msg):
-        global pttCnt
-        global pttEnDis
-        global pttRx
-        global pttTOcnt
-        global callconn
-        global pttModeOper
-        global dtmfRx
-        global dtmfSmplCnt
-        global DTMFMETHOD
         global icomEnaDis
         global registStat
-        global strtTmrJoin
                 
-        method = getattr(logging, level)
-        method(msg)
-
-        # Check for PTT mode
-        # Hybrid PTT mode:
-        # Mode 1:
-        # When there is no PTT signal, PTT are in VOX mode
-        # When there is a PTT signal, PTT are in MANUAL mode
-
-        # Mode 2:
-        # Always in VOX PTT activation
-        
-        # Mode 3:
-        # Always in MANUAL PTT activation
-
-        # Intercom mode:
-        # Always in intercom mode, and all functionalities related to RoIP
-        # will be disable, the current setting status will remain as
-        # previous except the intercom features will enable
+        sipLog(level, msg)
 
         # RIC in the intercom mode
         if icomEnaDis == True:
             # Check for registration with asterisk server, start joining intercom process 
             if 'REGISTER' in msg and registStat == False:
                 registStat = True
-                strtTmrJoin = True
+                startJoinTimer()
 
                 logger.info("DEBUG_INTERCOM: Registered")
-            
-        # Received DTMF PTT signal only valid in none intercom mode
-        else:
-            # Manual PTT are available only in Mode 1 and 3
-            if pttModeOper == 1 or pttModeOper == 3: 
-                # Receive PTT command from remote IP phone
-                # PTT command are initiate by '#' character
-                if pttEnDis == True and callconn == True:
-                    # New DTMF method
-                    if DTMFMETHOD == True:
-                        # Implement new receive dtmf signal logic
-                        # sip daemon receive dtmf signal - Process a PTT at daemon monitor thread
-                        # Process is done at daemon monitor thread
-                        if msg == 'Receiving dtmf #.' and dtmfRx == False:
-                            dtmfSmplCnt = 0
-                            dtmfRx = True
-                    # Existing DTMF method
-                    else:
-                        # sip daemon receive dtmf signal
-                        if msg == 'Receiving dtmf #.':
-                            pttCnt += 1
-                            # Sample the signal
-                            # ON PTT
-                            if pttCnt == 2 and pttRx == False:
-                                logger.info("DEBUG_DTMF_PTT: Receive PTT signal, ON PTT")
-                                                
-                                # Mode 1
-                                if pttModeOper == 1:
-                                    # Activate GPIO for PTT mode MANUAL
-                                    GPIO.output(12, GPIO.HIGH)
-                                    # Activate GPIO for PTT control
-                                    GPIO.output(4, GPIO.HIGH)
-                                # Mode 3
-                                elif pttModeOper == 3:
-                                    # Activate GPIO for PTT control
-                                    GPIO.output(4, GPIO.HIGH)
-                                pttRx = True
-                                pttCnt = 0
-                                pttTOcnt = 0
-
-                                # Update RIC daemon status REST API data
-                                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                                ric[0]['pttstatus'] = 'ON'
-                            # OFF PTT - Must be based on requestor (SIP client)
-                            elif pttCnt == 2 and pttRx == True:
-                                logger.info("DEBUG_DTMF_PTT: Receive PTT signal, OFF PTT")
-
-                                # Mode 1
-                                if pttModeOper == 1:
-                                    # Deactivate GPIO for PTT control
-                                    GPIO.output(4, GPIO.LOW)
-                                    # Deactivate GPIO for PTT mode MANUAL
-                                    GPIO.output(12, GPIO.LOW)
-                                # Mode 3
-                                elif pttModeOper == 3:
-                                    # Deactivate GPIO for PTT control
-                                    GPIO.output(4, GPIO.LOW)
-                                pttRx = False
-                                pttCnt = 0
-                                pttTOcnt = 0
-
-                                # Update RIC daemon status REST API data
-                                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                                ric[0]['pttstatus'] = 'OFF'
-            # PTT in Mode 2 
-            else:
-                # sip daemon receive dtmf signal
-                if msg == 'Receiving dtmf #.':
-                    logger.info("DEBUG_DTMF_PTT: PTT are in VOX mode (Mode 2)")
+
+    # Receive DTMF from the call, DTMF PTT key are processed immediately
+    def dtmf_received(self, core, call, dtmf):
+        self.coreActive = True
+        if isinstance(dtmf, int):
+            dtmf = chr(dtmf)
+        dtmfPtt(self.chan, dtmf, time.time())
+
     # Receive call
     def call_state_changed(self, core, call, state, message):
-        global callconn
-        global pttRx
-        global pttCnt
-        global audioEnDis
-        global audMultEnDis
         global siplist
-        global pttIsON
         global icomEnaDis
         global icomExtId
         global icomStatus
-        global strtTmrJoin
         global icomToRoIP
+
+        chan = self.chan
+        self.coreActive = True
         
         # RIC running in the intercom mode
-        if icomEnaDis == True:
+        if chan.intercom() == True:
             # Intercom END in a normal way
             if state == linphone.CallState.End:
                 logger.info("DEBUG_INTERCOM: Intercom DISCONNECTED")
                 
                 # Update RIC daemon status REST API data
-                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                ric[0]['callstatus'] = 'LISTENING'
-                ric[0]['intercomstatus'] = 'OFFLINE'
-                ric[0]['currcallid'] = 'NO'
+                chan.daemonStat.update({
+                    'callstatus' : 'LISTENING',
+                    'intercomstatus' : 'OFFLINE',
+                    'currcallid' : 'NO'
+                })
 
                 # Set intercom reconnect flag
-                strtTmrJoin = True
+                startJoinTimer()
                 
             # Intercom END because of ERROR
             elif state == linphone.CallState.Error:
                 logger.info("DEBUG_INTERCOM: Intercom DISCONNECTED")
                 
                 # Update RIC daemon status REST API data
-                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                ric[0]['callstatus'] = 'LISTENING'
-                ric[0]['intercomstatus'] = 'OFFLINE'
-                ric[0]['currcallid'] = 'NO'
+                chan.daemonStat.update({
+                    'callstatus' : 'LISTENING',
+                    'intercomstatus' : 'OFFLINE',
+                    'currcallid' : 'NO'
+                })
 
                 # Set intercom reconnect flag
-                strtTmrJoin = True
+                startJoinTimer()
 
             # Intercom CONNECTED
             elif state == linphone.CallState.Connected:
                 logger.info("DEBUG_INTERCOM: Intercom CONNECTED")
                 
                 # Update RIC daemon status REST API data
-                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                ric[0]['callstatus'] = 'CONNECTED'
-                ric[0]['intercomstatus'] = 'ONLINE'
-                ric[0]['currcallid'] = icomExtId
+                chan.daemonStat.update({
+                    'callstatus' : 'CONNECTED',
+                    'intercomstatus' : 'ONLINE',
+                    'currcallid' : icomExtId
+                })
 
                 # Clear intercom reconnect flag
-                strtTmrJoin = False
+                stopJoinTimer()
 
                 # Set revert to RoIP mode flag if there is a web client request to change the
                 # current intercom mode
@@ -913,53 +2754,57 @@ class radioSIPclient:
                 if macCallFilt == True:
                     # Only accept a call within a contact list buffer
                     # Valid call
-                    if calleradr in siplist:
+                    if siplist.match(calleradr):
                         logger.info("DEBUG_CALL: Its a VALID call")
+                        metWhitelist.inc(('call', 'hit'))
+                        metCalls.inc((chan.chanId, 'accepted'))
 
                         params = core.create_call_params(call)
 
                         # Enable audio for SIP payload
-                        params.audio_enabled = audioEnDis
+                        params.audio_enabled = chan.audioEnDis
                         
                         # Enable audio multicast for SIP payload
-                        params.audio_multicast_enabled = audMultEnDis
+                        params.audio_multicast_enabled = chan.audMultEnDis
                         
                         core.accept_call_with_params(call, params)
 
                         # Update RIC daemon status REST API data
-                        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                        ric[0]['currcallid'] = calleradr 
+                        chan.daemonStat['currcallid'] = calleradr 
                         
                         #call.microphone_volume_gain = 0.98
 
                         self.current_call = call
                     # Invalid call
                     else:
-                        logger.info("DEBUG_CALL: Its an INVALID call")
+                        logEvent('CALL', 'DECLINED', {'channel' : chan.chanId, 'caller' : calleradr})
+                        metWhitelist.inc(('call', 'miss'))
+                        metCalls.inc((chan.chanId, 'declined'))
                         # Decline received call
                         core.decline_call(call, linphone.Reason.Declined)
 
                         # Update RIC daemon status REST API data
-                        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                        ric[0]['callstatus'] = 'LISTENING'
-                        ric[0]['currcallid'] = 'NO'
+                        chan.daemonStat.update({
+                            'callstatus' : 'LISTENING',
+                            'currcallid' : 'NO'
+                        })
                 # Accept all incoming call, macro are not set
                 else:
                     logger.info("DEBUG_CALL: Call ID is NOT filtered")
+                    metCalls.inc((chan.chanId, 'accepted'))
 
                     params = core.create_call_params(call)
 
                     # Enable audio for SIP payload
-                    params.audio_enabled = audioEnDis
+                    params.audio_enabled = chan.audioEnDis
                         
                     # Enable audio multicast for SIP payload
-                    params.audio_multicast_enabled = audMultEnDis
+                    params.audio_multicast_enabled = chan.audMultEnDis
                         
                     core.accept_call_with_params(call, params)
 
                     # Update RIC daemon status REST API data
-                    ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                    ric[0]['currcallid'] = calleradr 
+                    chan.daemonStat['currcallid'] = calleradr 
                         
                     #call.microphone_volume_gain = 0.98
 
@@ -967,77 +2812,47 @@ class radioSIPclient:
             # Call END in a normal way
             elif state == linphone.CallState.End:
                 logger.info("DEBUG_CALL: Call END in normal way")
-                callconn = False
+                chan.callconn = False
                 # Deactivate GPIO for PTT control, if previously ON
-                if pttRx == True:
-                    # Mode 1
-                    if pttModeOper == 1:
-                        # Deactivate GPIO for PTT control
-                        GPIO.output(4, GPIO.LOW)
-                        # Deactivate GPIO for PTT mode MANUAL
-                        GPIO.output(12, GPIO.LOW)
-                    # Mode 3
-                    elif pttModeOper == 3:
-                        # Deactivate GPIO for PTT control
-                        GPIO.output(4, GPIO.LOW)
-                    pttCnt = 0
-                    pttRx = False
-                    pttIsON = False
-                    
+                if pttEvent(chan, 'CALL_END', 'CALL') == 'ACK':
                     logger.info("DEBUG_CALL: OFF PTT")
                 # Update RIC daemon status REST API data
-                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                ric[0]['callstatus'] = 'LISTENING'
-                ric[0]['currcallid'] = 'NO'
-                ric[0]['pttstatus'] = 'OFF'
+                chan.daemonStat.update({
+                    'callstatus' : 'LISTENING',
+                    'currcallid' : 'NO'
+                })
 
                 self.current_call = None
             # Call END because of ERROR
             elif state == linphone.CallState.Error:
                 logger.info("DEBUG_CALL: Call END because of ERROR")
-                callconn = False
+                chan.callconn = False
                 # Deactivate GPIO for PTT control, if previously ON
-                if pttRx == True:
-                    # Mode 1
-                    if pttModeOper == 1:
-                        # Deactivate GPIO for PTT control
-                        GPIO.output(4, GPIO.LOW)
-                        # Deactivate GPIO for PTT mode MANUAL
-                        GPIO.output(12, GPIO.LOW)
-                    # Mode 3
-                    elif pttModeOper == 3:
-                        # Deactivate GPIO for PTT control
-                        GPIO.output(4, GPIO.LOW)
-                    pttCnt = 0
-                    pttRx = False
-                    pttIsON = False
-                    
+                if pttEvent(chan, 'CALL_END', 'CALL') == 'ACK':
                     logger.info("DEBUG_CALL: OFF PTT")
                 # Update RIC daemon status REST API data
-                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                ric[0]['callstatus'] = 'LISTENING'
-                ric[0]['currcallid'] = 'NO'
-                ric[0]['pttstatus'] = 'OFF'
+                chan.daemonStat.update({
+                    'callstatus' : 'LISTENING',
+                    'currcallid' : 'NO'
+                })
 
                 self.current_call = None
             # Call CONNECTED
             elif state == linphone.CallState.Connected:
                 logger.info("DEBUG_CALL: Call CONNECTED")
-                callconn = True
+                chan.callconn = True
 
                 # Update RIC daemon status REST API data
-                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                ric[0]['callstatus'] = 'CONNECTED'
+                chan.daemonStat['callstatus'] = 'CONNECTED'
             
     # Receive SIP message for PTT signal - Optional for tactical SIP client application
     def message_received(self, core, room, message):
         global siplist
-        global pttIsON
-        global callconn
-        global pttEnDis
-        global pttTOcnt
-        global pttModeOper
         global icomEnaDis
+
+        chan = self.chan
+        rxTime = time.time()
+        self.coreActive = True
         
         # Get the message sender SIP address
         msgfrom = message.from_address
@@ -1068,145 +2883,34 @@ class radioSIPclient:
         # previous except the intercom features will enable
 
         # Received PTT signal SIP message only valid in none intercom mode
-        if icomEnaDis == False:
+        if chan.intercom() == False:
             # Manual PTT are available only in Mode 1 and 3
-            if pttModeOper == 1 or pttModeOper == 3:
+            if chan.pttModeOper == 1 or chan.pttModeOper == 3:
                 # PTT is enable and previously the call are connected
-                if pttEnDis == True and callconn == True:
+                if chan.pttEnDis == True and chan.callconn == True:
                     # Optional macro if we want to filter incoming msg
-                    # Start filter the incoming call
+                    # Check whether the msg sender are in the list or not
                     if macCallFilt == True:
-                        # Check whether the msg sender are in the list or not
-                        # Valid contact and SIP call are connected
-                        if msgfrom in siplist:
-                            logger.info("DEBUG_SIP_PTT: VALID CONTACT: %s" % (msgfrom))
-
-                            # Check for PTT signal through SIP message
-                            # ON PTT
-                            if msgtext == "PTT_ON":
-                                # Currently no PTT events occur 
-                                if pttIsON == False:
-                                    logger.info("DEBUG_SIP_PTT: Receive PTT signal, ON PTT")
-                                    logger.info("DEBUG_SIP_PTT: Send ON PTT command ACK")
-                                    
-                                    # Send ACK to sender
-                                    chat_room = core.get_chat_room_from_uri(msgfrom)
-                                    pttAckMsg = chat_room.create_message('PTT_ON_ACK')
-                                    chat_room.send_chat_message(pttAckMsg)
-
-                                    pttTOcnt = 0 # Reset back PTT GPIO checking counter
-
-                                    # Mode 1
-                                    if pttModeOper == 1:
-                                        # Activate GPIO for PTT mode MANUAL
-                                        GPIO.output(12, GPIO.HIGH)
-                                        # Activate GPIO for PTT control
-                                        GPIO.output(4, GPIO.HIGH)
-                                    # Mode 3
-                                    elif (pttModeOper == 3):
-                                        # Activate GPIO for PTT control
-                                        GPIO.output(4, GPIO.HIGH)
-                                    pttIsON = True
-
-                                    # Update RIC daemon status REST API data
-                                    ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                                    ric[0]['pttstatus'] = 'ON'
-                                # PTT is BUSY
-                                else:
-                                    logger.info("DEBUG_SIP_PTT: PTT is BUSY!")
-                            # OFF PTT
-                            elif msgtext == "PTT_OFF":    
-                                # Previously has PTT events
-                                if pttIsON == True:
-                                    logger.info("DEBUG_SIP_PTT: Receive PTT signal, OFF PTT")
-                                    logger.info("DEBUG_SIP_PTT: Send OFF PTT command ACK")
-
-                                    pttTOcnt = 0 # Reset back PTT GPIO checking counter
-                                    
-                                    # Send ACK to sender
-                                    chat_room = core.get_chat_room_from_uri(msgfrom)
-                                    pttAckMsg = chat_room.create_message('PTT_OFF_ACK')
-                                    chat_room.send_chat_message(pttAckMsg);
-
-                                    # Mode 1
-                                    if pttModeOper == 1:
-                                        # Deactivate GPIO for PTT control
-                                        GPIO.output(4, GPIO.LOW)
-                                        # Deactivate GPIO for PTT mode MANUAL
-                                        GPIO.output(12, GPIO.LOW)
-                                    # Mode 3
-                                    elif pttModeOper == 3:
-                                        # Deactivate GPIO for PTT control
-                                        GPIO.output(4, GPIO.LOW)
-                                    pttIsON = False
-
-                                    # Update RIC daemon status REST API data
-                                    ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                                    ric[0]['pttstatus'] = 'OFF'
-                    # No need to filter incoming msg
-                    else:
-                        # Check for PTT signal through SIP message
-                        # ON PTT
-                        if msgtext == "PTT_ON":
-                            # Currently no PTT events occur 
-                            if pttIsON == False:
-                                logger.info("DEBUG_SIP_PTT: Receive PTT signal, ON PTT")
-                                logger.info("DEBUG_SIP_PTT: Send ON PTT command ACK")
-                                
-                                # Send ACK to sender
-                                chat_room = core.get_chat_room_from_uri(msgfrom)
-                                pttAckMsg = chat_room.create_message('PTT_ON_ACK')
-                                chat_room.send_chat_message(pttAckMsg)
-
-                                pttTOcnt = 0 # Reset back PTT GPIO checking counter
-
-                                # Mode 1
-                                if pttModeOper == 1:
-                                    # Activate GPIO for PTT mode MANUAL
-                                    GPIO.output(12, GPIO.HIGH)
-                                    # Activate GPIO for PTT control
-                                    GPIO.output(4, GPIO.HIGH)
-                                # Mode 3
-                                elif (pttModeOper == 3):
-                                    # Activate GPIO for PTT control
-                                    GPIO.output(4, GPIO.HIGH)
-                                pttIsON = True
-
-                                # Update RIC daemon status REST API data
-                                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                                ric[0]['pttstatus'] = 'ON'
-                            # PTT is BUSY
-                            else:
-                                logger.info("DEBUG_SIP_PTT: PTT is BUSY!")
-                        # OFF PTT
-                        elif msgtext == "PTT_OFF":    
-                            # Previously has PTT events
-                            if pttIsON == True:
-                                logger.info("DEBUG_SIP_PTT: Receive PTT signal, OFF PTT")
-                                logger.info("DEBUG_SIP_PTT: Send OFF PTT command ACK")
-
-                                pttTOcnt = 0 # Reset back PTT GPIO checking counter
-                                
-                                # Send ACK to sender
-                                chat_room = core.get_chat_room_from_uri(msgfrom)
-                                pttAckMsg = chat_room.create_message('PTT_OFF_ACK')
-                                chat_room.send_chat_message(pttAckMsg);
-
-                                # Mode 1
-                                if pttModeOper == 1:
-                                    # Deactivate GPIO for PTT control
-                                    GPIO.output(4, GPIO.LOW)
-                                    # Deactivate GPIO for PTT mode MANUAL
-                                    GPIO.output(12, GPIO.LOW)
-                                # Mode 3
-                                elif pttModeOper == 3:
-                                    # Deactivate GPIO for PTT control
-                                    GPIO.output(4, GPIO.LOW)
-                                pttIsON = False
-
-                                # Update RIC daemon status REST API data
-                                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                                ric[0]['pttstatus'] = 'OFF'
+                        if not siplist.match(msgfrom):
+                            metWhitelist.inc(('message', 'miss'))
+                            return
+                        metWhitelist.inc(('message', 'hit'))
+                        logger.info("DEBUG_SIP_PTT: VALID CONTACT: %s" % (msgfrom))
+
+                    # Check for PTT signal through SIP message
+                    if msgtext == "PTT_ON" or msgtext == "PTT_OFF":
+                        pttResult = manualPtt(chan, msgtext == "PTT_ON", 'SIP', rxTime)
+                        if pttResult == 'ACK':
+                            logger.info("DEBUG_SIP_PTT: Receive PTT signal, %s PTT" % (msgtext[4:]))
+                            logger.info("DEBUG_SIP_PTT: Send %s PTT command ACK" % (msgtext[4:]))
+
+                            # Send ACK to sender
+                            chat_room = core.get_chat_room_from_uri(msgfrom)
+                            pttAckMsg = chat_room.create_message(msgtext + '_ACK')
+                            chat_room.send_chat_message(pttAckMsg)
+                        # PTT is BUSY
+                        elif pttResult == 'BUSY':
+                            logger.info("DEBUG_SIP_PTT: PTT is BUSY!")
                         
             # PTT in Mode 2
             else:
@@ -1233,21 +2937,33 @@ class radioSIPclient:
         global icomLoc
         global strtJoinIcom
         global retryJoinIcom
-        global daemonStat
-        global strtTmrJoin
         global icomToRoIP
         global sipIcomAddr
-        global asteriskIP
 
+        chan = self.chan
         while not self.quit:
+            # SIP account updated, register again to Asterisk server once there is no call in progress
+            if chan.sipReRegist == True and self.core.calls_nb == 0:
+                logger.info("DEBUG_CNFG: SIP account updated, register again to %s" % (chan.asteriskIP))
+
+                self.core.clear_proxy_config()
+                self.core.clear_all_auth_info()
+                self.configure_sip_account(chan.sipUserName, chan.sipPswd, chan.asteriskIP)
+                chan.sipReRegist = False
+
+            # MIC setting updated
+            if chan.sipMicUpdt == True:
+                self.core.mic_enabled = chan.micEnDis
+                chan.sipMicUpdt = False
+
             # Enter the intercom room as a guest - Start call attempt to intercom room
-            if icomEnaDis == True:
+            if chan.intercom() == True:
                 if strtJoinIcom == True and retryJoinIcom <= 5:
                     try:
                         logger.info("DEBUG_INTERCOM: Try to joining intercom group....")
 
                         # Construct intercom group full sip address
-                        sipIcomAddr = 'sip:' + icomExtId + '@' + asteriskIP
+                        sipIcomAddr = 'sip:' + icomExtId + '@' + chan.asteriskIP
 
                         # Initialize call out parameter
                         params = self.core.create_call_params(None)
@@ -1262,31 +2978,33 @@ class radioSIPclient:
                         # Error during initiate outgoing call to the intercom group
                         if None is self.current_call:
                             # Update RIC daemon status REST API data
-                            ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                            ric[0]['callstatus'] = 'LISTENING'
-                            ric[0]['intercomstatus'] = 'OFFLINE'
-                            ric[0]['currcallid'] = 'NO'
-                            ric[0]['intercom'] = 'DISABLE'
-
-                            strtTmrJoin = True
+                            chan.daemonStat.update({
+                                'callstatus' : 'LISTENING',
+                                'intercomstatus' : 'OFFLINE',
+                                'currcallid' : 'NO',
+                                'intercom' : 'DISABLE'
+                            })
+
+                            startJoinTimer()
                             retryJoinIcom += 1
+                            metIcomJoin.inc(('failed', ))
 
                             logger.info("DEBUG_INTERCOM: Error joining intercom group!")
                             logger.info("DEBUG_INTERCOM: Retry....")
                         else:
-                            # PTT mode relay always ON
-                            GPIO.output(12, GPIO.HIGH)
-                            # PTT control will always ON 
-                            GPIO.output(4, GPIO.HIGH)
+                            # PTT mode relay and PTT control will always ON 
+                            pttEvent(chan, 'ICOM_ON', 'ICOM')
                             
                             # Update RIC daemon status REST API data
-                            ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                            ric[0]['callstatus'] = 'CONNECTED'
-                            ric[0]['intercomstatus'] = 'ONLINE'
-                            ric[0]['currcallid'] = icomExtId
-                            ric[0]['intercom'] = 'ENABLE'
+                            chan.daemonStat.update({
+                                'callstatus' : 'CONNECTED',
+                                'intercomstatus' : 'ONLINE',
+                                'currcallid' : icomExtId,
+                                'intercom' : 'ENABLE'
+                            })
 
                             retryJoinIcom = 0
+                            metIcomJoin.inc(('joined', ))
 
                             logger.info("DEBUG_INTERCOM: Joining intercom group [%s - %s] successful" % (icomExtId, icomLoc))
 
@@ -1298,14 +3016,16 @@ class radioSIPclient:
                         strtJoinIcom = False
                     except:
                         # Update RIC daemon status REST API data
-                        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                        ric[0]['callstatus'] = 'LISTENING'
-                        ric[0]['intercomstatus'] = 'OFFLINE'
-                        ric[0]['currcallid'] = 'NO'
-                        ric[0]['intercom'] = 'DISABLE'
-
-                        strtTmrJoin = True
+                        chan.daemonStat.update({
+                            'callstatus' : 'LISTENING',
+                            'intercomstatus' : 'OFFLINE',
+                            'currcallid' : 'NO',
+                            'intercom' : 'DISABLE'
+                        })
+
+                        startJoinTimer()
                         retryJoinIcom += 1
+                        metIcomJoin.inc(('failed', ))
 
                         logger.info("DEBUG_INTERCOM: Error joining intercom group!")
                         logger.info("DEBUG_INTERCOM: Retry....")
@@ -1319,7 +3039,7 @@ class radioSIPclient:
                     # Start reboot RIC daemon
 
             # Change mode to the normal RoIP mode
-            else:
+            elif chan.primary == True:
                 # Terminate all intercom connection and revert to default RoIP mode
                 if icomToRoIP == True:
                     logger.info("DEBUG_INTERCOM: Change mode to default RoIP mode")
@@ -1328,187 +3048,259 @@ class radioSIPclient:
                     self.core.terminate_all_calls()
                     # Initialize back all necessary variables
                     strtJoinIcom = False
-                    strtTmrJoin = False
+                    stopJoinTimer()
                     retryJoinIcom = 0
 
-                    # Update RIC daemon status REST API data
-                    ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                    ric[0]['callstatus'] = 'LISTENING'
-                    ric[0]['intercomstatus'] = 'OFFLINE'
-                    ric[0]['currcallid'] = 'NO'
-                    ric[0]['intercom'] = 'DISABLE'
-
-                    # Initialize back the daemon to the RoIP mode
-                    initRoIpMode()
+                    # Initialize back the daemon to the RoIP mode, update RIC daemon status REST API data
+                    initRoIpMode(chan, {
+                        'callstatus' : 'LISTENING',
+                        'intercomstatus' : 'OFFLINE',
+                        'currcallid' : 'NO',
+                        'intercom' : 'DISABLE'
+                    })
                     
                     icomToRoIP = False
                     
             self.core.iterate()
-            time.sleep(0.03)
+
+            # Iterate tightly during a call, registration or after a SIP event, otherwise back off
+            busy = self.coreActive == True or self.core.calls_nb > 0 or self.registInProgress()
+            self.coreActive = False
+            chan.coreSched.wait(busy)
+
+        # Daemon terminated
+        self.core.terminate_all_calls()
+
+    # SIP registration to Asterisk server still in progress
+    def registInProgress(self):
+        proxyCnfg = self.core.default_proxy_config
+        return proxyCnfg is not None and proxyCnfg.state == linphone.RegistrationState.Progress
+
+# Create JSON response of a data set, one record for each data set store (radio channel)
+# JSON body are cached until the data set changed, return 304 (not modified) if client already have the current version
+def dataSetResponse(jsonKey, stores):
+    version = '.'.join([ str(data.version) for data in stores ])
+    etag = '%s-%s' % (bootId, version)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    with dataLock:
+        cached = dataCache.get(stores[0].dataName)
+    if cached is None or cached[0] != version:
+        # Serialize a consistent copy of each record, cached with its version
+        versions = []
+        records = []
+        for data in stores:
+            with data.lock:
+                versions.append(str(data.version))
+                records.append(data.snapshot())
+        cached = ('.'.join(versions), jsonify({jsonKey: records}).get_data())
+        with dataLock:
+            dataCache[stores[0].dataName] = cached
+
+    response = app.response_class(cached[1], mimetype='application/json')
+    response.set_etag('%s-%s' % (bootId, cached[0]))
+    return response
 
 # Get current RIC status
 # Example command to send:
 # http://192.168.101.1:5000/ricinfo
 @app.route('/ricinfo', methods=['GET'])
 def getRicInfoDb():
-    return jsonify({'RICInfo' : daemonStat})
+    return dataSetResponse('RICInfo', [ channels[chanId].daemonStat for chanId in channels ])
+
+# Get daemon internal statistics
+# Example command to send:
+# http://192.168.101.1:5000/ricstats
+@app.route('/ricstats', methods=['GET'])
+def getRicStats():
+    with cnfgCond:
+        persistData = dict(persistStat)
+    sipCoreStat = dict([ (chanId, dict(channels[chanId].coreSched.stat)) for chanId in channels ])
+    gpioStat = {'backend': GPIO.name, 'writes': GPIO.writes}
+    logData = dict(logStat)
+    logData['pending'] = logQueue.qsize()
+    return jsonify({'ricstats': {'persistence': persistData, 'stream': dict(streamStat), 'sipcore': sipCoreStat, 'ptt': pttStats(),
+                                 'timer': daemonTimer.stats(), 'vox': voxStats(), 'gpio': gpioStat, 'log': logData}})
+
+# Get daemon metric - Prometheus text format
+# Example command to send:
+# http://192.168.101.1:5000/metrics
+@app.route('/metrics', methods=['GET'])
+def getMetrics():
+    return app.response_class(''.join([ metricText(metric) for metric in metrics ]),
+                              mimetype='text/plain; version=0.0.4')
+
+# Get recent log event from the log ring buffer, oldest first - Log event after the since sequence number, with
+# at least the level and from the subsystem. Next request use the returned last sequence number as since
+# Up to logPageSize log event are returned, limit request more log event up to the log ring buffer size
+# Example command to send:
+# http://192.168.101.1:5000/logs?since=1200&level=warning&subsystem=VOX
+@app.route('/logs', methods=['GET'])
+def getLogs():
+    try:
+        since = int(request.args.get('since', '0'))
+        limit = min(int(request.args.get('limit', str(logPageSize))), logRingSize)
+    except ValueError:
+        return jsonify({'logs': [], 'status': 'INVALID'}), 400
+    if limit < 1:
+        return jsonify({'logs': [], 'status': 'INVALID'}), 400
+    level = logLevels.get(request.args.get('level', 'debug').lower())
+    if level is None:
+        return jsonify({'logs': [], 'status': 'INVALID'}), 400
+    subsystem = request.args.get('subsystem', '').upper()
+
+    # Log event sequence number are continuous, log event after since are found without a search
+    with logRingLock:
+        first = logRing[0][0] if len(logRing) > 0 else logRingSeq + 1
+        logEntries = list(itertools.islice(logRing, max(since + 1 - first, 0), None))
+    last = logEntries[-1][0] if len(logEntries) > 0 else max(since, first - 1)
+
+    logs = []
+    for logEntry in logEntries:
+        if logEntry[2] >= level and (subsystem == '' or logEntry[3] == subsystem):
+            logs.append(logEntryData(logEntry))
+            if len(logs) == limit:
+                last = logEntry[0]
+                break
+    return jsonify({'logs': logs, 'first': first, 'last': last})
+
+# Get current SIP contact whitelist
+# Example command to send:
+# http://192.168.101.1:5000/contacts
+@app.route('/contacts', methods=['GET'])
+def getContacts():
+    return jsonify({'contacts': siplist.entries()})
+
+# Add a contact to SIP contact whitelist
+# Example command to send:
+# curl -i -H "Content-type: application/json" -X POST -d "{\"contact\":\"sip:1003@192.168.8.101\"}" http://192.168.101.1:5000/contacts
+@app.route('/contacts', methods=['POST'])
+def addContact():
+    if request.json is None or 'contact' not in request.json:
+        return jsonify({'contact': '', 'status': 'INVALID'}), 400
+
+    entry = request.json['contact'].strip()
+    if validContact(entry) == False:
+        return jsonify({'contact': entry, 'status': 'INVALID'}), 400
+
+    if addContacts([entry]) > 0:
+        return jsonify({'contact': entry, 'status': 'ADDED'}), 201
+    return jsonify({'contact': entry, 'status': 'EXIST'})
+
+# Remove a contact from SIP contact whitelist
+# Example command to send:
+# curl -i -X DELETE http://192.168.101.1:5000/contacts/sip:1003@192.168.8.101
+@app.route('/contacts/<path:contact>', methods=['DELETE'])
+def removeContact(contact):
+    with contLock:
+        if siplist.remove(contact):
+            appendContactJournal([ '-' + contact ])
+            return jsonify({'contact': contact, 'status': 'REMOVED'})
+    return jsonify({'contact': contact, 'status': 'NOT FOUND'}), 404
+
+# Bulk import contact to SIP contact whitelist
+# Request body are read line by line, one contact per line or CSV with the contact at the first column
+# Example command to send:
+# curl -i -H "Content-type: text/csv" -X POST --data-binary @contacts.csv http://192.168.101.1:5000/contacts/import
+@app.route('/contacts/import', methods=['POST'])
+def importContacts():
+    received = 0
+    added = 0
+    invalid = 0
+    batch = []
+    longLine = False
+
+    while True:
+        line = request.stream.readline(contLineMax)
+        if not line:
+            break
+        # Line longer than a valid contact, skip until end of line
+        if not line.endswith(b'\n') and len(line) == contLineMax:
+            longLine = True
+            continue
+        if longLine == True:
+            longLine = False
+            invalid += 1
+            continue
+
+        entry = line.decode('utf-8', 'replace').split(',')[0].strip().strip('"')
+        # Empty line, comment or CSV header
+        if entry == '' or entry.startswith('#') or entry.lower() in ('contact', 'uri', 'address'):
+            continue
+        received += 1
+        if validContact(entry) == False:
+            invalid += 1
+            continue
+
+        batch.append(entry)
+        # Add contact in batch, calls arrived during import can use the imported contact
+        if len(batch) == contBatchSize:
+            added += addContacts(batch)
+            batch = []
+    added += addContacts(batch)
+
+    logger.info("DEBUG_CALL: Contact import, received: %s, added: %s, invalid: %s" % (received, added, invalid))
+    return jsonify({'contactimport': {'received': received, 'added': added, 'invalid': invalid, 'total': len(siplist)}})
+
+# Daemon status stream are served by stream web server, redirect the client
+# Example command to send:
+# curl -N -L http://192.168.101.1:5000/ricinfo/stream
+@app.route('/ricinfo/stream', methods=['GET'])
+def getRicInfoStream():
+    scheme = 'https' if macSecInSec == True else 'http'
+    streamUrl = '%s://%s:%s/ricinfo/stream' % (scheme, request.host.rsplit(':', 1)[0], streamPort)
+    if request.query_string:
+        streamUrl += '?' + request.query_string.decode()
+    return redirect(streamUrl, code=307)
 
 # Get current VOX controller setting
 # Example command to send:
 # http://192.168.101.1:5000/voxconfig
 @app.route('/voxconfig', methods=['GET'])
 def getVoxConfigData():
-    return jsonify({'voxconfig': voxParamData})
+    return dataSetResponse('voxconfig', [ channels[chanId].voxParamData for chanId in channels ])
 
 # Get current intercom setting
 # Example command to send:
 # http://192.168.101.1:5000/voxconfig
 @app.route('/icomconfig', methods=['GET'])
 def getIcomConfigData():
-    return jsonify({'intercomconfig': icomParamData})
+    return dataSetResponse('intercomconfig', [ icomParamData ])
 
 # Update setting for intercom group
 # Example command to send:
 # curl -i -H "Content-type: application/json" -X PUT -d "{\"icomset\":\"true\"}" http://192.168.101.1:5000/icomconfig/000
 @app.route('/icomconfig/<cnfgid>', methods=['PUT'])
 def updateIcomConfig(cnfgid):
-    global icomSet
-    global icomLoc
-    global icomExtId
-    global icomEnaDis
-    global strtTmrJoin
-    global icomToRoIP
-    
-    tempIcomEn = ''
-    tempIcomLoc = ''
-    tempIcomExtId = ''
-    
-    iCnfg = [ iCnfgG for iCnfgG in icomParamData if (iCnfgG['id'] == cnfgid) ]
-    # Update intercom config - Intercom enable/disable
-    if 'icomset' in request.json:
-        tempIcomEn = request.json['icomset']
-
-        # Update intercom enable/disable parameter
-        if tempIcomEn != 'RETRIEVE':
-            # Open intercom config file
-            file = open("/etc/conf.d/sipradio/icomradioCnfg.conf", "w")
-
-            # Update config data
-            iCnfg[0]['icomset'] = request.json['icomset']
-            icomSet = iCnfg[0]['icomset']
-            
-            # Create new text file for a new data
-            tmpIcomSet = 'ICOMSET:'
-            tmpIcomSet = tmpIcomSet + icomSet + '\n'
-            file.write(tmpIcomSet)
-
-            # Copy the rest (no update) data
-            tmpIcomLoc = 'ICOMLOC:'
-            tmpIcomLoc = tmpIcomLoc + icomLoc + '\n'
-            file.write(tmpIcomLoc)
-
-            tmpIcomExtId = 'EXTID:'
-            tmpIcomExtId = tmpIcomExtId + icomExtId + '\n'
-            file.write(tmpIcomExtId)
-
-            # Update global intercom enable/disable flag
-            # Enable intercom mode
-            if icomSet == 'TRUE':
-                icomEnaDis = True
-                if icomToRoIP == False:
-                    strtTmrJoin = True
-            # Disable intercom mode
-            else:
-                icomEnaDis = False
-
-            # Close the file
-            file.close()
-
-    # Update intercom config - Intercom group/name
-    elif 'icomloc' in request.json:
-        tempIcomLoc = request.json['icomloc']
-
-        # Update intercom group location/name
-        if tempIcomLoc != 'RETRIEVE':
-            # Open intercom config file
-            file = open("/etc/conf.d/sipradio/icomradioCnfg.conf", "w")
-
-            # Update config data
-            iCnfg[0]['icomloc'] = request.json['icomloc']
-            icomLoc = iCnfg[0]['icomloc']
-            
-            # Copy the rest (no update) data
-            tmpIcomSet = 'ICOMSET:'
-            tmpIcomSet = tmpIcomSet + icomSet + '\n'
-            file.write(tmpIcomSet)
-
-            # Create new text file for a new data
-            tmpIcomLoc = 'ICOMLOC:'
-            tmpIcomLoc = tmpIcomLoc + icomLoc + '\n'
-            file.write(tmpIcomSet)
-
-            tmpIcomExtId = 'EXTID:'
-            tmpIcomExtId = tmpIcomExtId + icomExtId + '\n'
-            file.write(tmpIcomExtId)
+    changed = {}
 
-            # Close the file
-            file.close()
+    # Only one config data record (ID 000)
+    if cnfgid != icomParamData['id']:
+        abort(404)
 
-    # Update intercom config - Intercom group extensions id
-    elif 'icomextid' in request.json:
-        tempIcomExtId = request.json['icomextid']
-
-        # Update intercom group extension id
-        if tempIcomExtId != 'RETRIEVE':
-            # Open intercom config file
-            file = open("/etc/conf.d/sipradio/icomradioCnfg.conf", "w")
-
-            # Update config data
-            iCnfg[0]['icomextid'] = request.json['icomextid']
-            icomExtId = iCnfg[0]['icomextid']
-            
-            # Copy the rest (no update) data
-            tmpIcomSet = 'ICOMSET:'
-            tmpIcomSet = tmpIcomSet + icomSet + '\n'
-            file.write(tmpIcomSet)
-
-            # Copy the rest (no update) data
-            tmpIcomLoc = 'ICOMLOC:'
-            tmpIcomLoc = tmpIcomLoc + icomLoc + '\n'
-            file.write(tmpIcomLoc)
+    
+    # Update all intercom config data carried by the request in memory first
+    # 'RETRIEVE' value are only to retrieve current setting
+    for cnfgKey in icomCnfgKeys:
+        if cnfgKey in request.json and request.json[cnfgKey] != 'RETRIEVE':
+            changed[cnfgKey] = request.json[cnfgKey]
 
-            # Create new text file for a new data
-            tmpIcomExtId = 'EXTID:'
-            tmpIcomExtId = tmpIcomExtId + icomExtId + '\n'
-            file.write(tmpIcomExtId)
+    if len(changed) > 0:
+        applyIcomConfig(changed)
 
-            # Close the file
-            file.close()
+        # Write intercom config file once for all updated data
+        markConfigDirty('icom')
 
-    return jsonify({'intercomconfig': iCnfg})
+    return jsonify({'intercomconfig': [ icomParamData.snapshot() ]})
 
 # Update setting for VOX controller configuration
 # Example command to send:
 # curl -i -H "Content-type: application/json" -X PUT -d "{\"delayaindiv\":\"1002\"}" http://192.168.101.1:5000/voxconfig/000
 @app.route('/voxconfig/<cnfgid>', methods=['PUT'])
 def updateVoxConfigData(cnfgid):
-    global delayaindiv
-    global pDelayaindiv
-    global delayvaladd
-    global pDelayvaladd
-    global threshmultp
-    global pThreshmultp
-    global threshadd
-    global pThreshadd
-    global delayvalue
-    global pDelayvalue
-    global thresholdvalue
-    global pThresvalue
-    global voxMode
-    global pVoxMode
-    global sendCmdType
-    global commBusy
-
     tempDlyInpDiv = ''
     tempDlyInpAdd = ''
     tempThresMultp = ''
@@ -1516,379 +3308,185 @@ def updateVoxConfigData(cnfgid):
     tempDlyVal = ''
     tempThresVal = ''
     tempMode = ''
-    
-    # Communication between RIC and VOX controller are still in configuring mode
-    if commBusy == False:
-        vCnfg = [ vCnfgG for vCnfgG in voxParamData if (vCnfgG['id'] == cnfgid) ]
-        # Update VOX config - PTT delay analog input delay division factor
-        if 'delayaindiv' in request.json:
-            tempDlyInpDiv = request.json['delayaindiv']
-            
-            if tempDlyInpDiv != 'RETRIEVE':
-                # Open VOX config file
-                #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-                file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-                # Update config data
-                vCnfg[0]['delayaindiv'] = request.json['delayaindiv']
-
-                pDelayaindiv = delayaindiv # Copy previous value as a backup if configuring VOX controller failed
-                delayaindiv = vCnfg[0]['delayaindiv']
-                            
-                # Create new text file for a new data
-                dlyAinDiv = 'DELAYAINDIV:'
-                dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-                file.write(dlyAinDiv)
-
-                # Copy the rest (no update) data
-                dlyValAdd = 'DELAYVALADD:'
-                dlyValAdd = dlyValAdd + delayvaladd + '\n'
-                file.write(dlyValAdd)
-
-                thrMultp = 'THRESHMULTP:'
-                thrMultp = thrMultp + threshmultp + '\n'
-                file.write(thrMultp)
-
-                thrAdd = 'THRESHADD:'
-                thrAdd = thrAdd + threshadd + '\n'
-                file.write(thrAdd)
 
-                dlyVal = 'DELAYVALUE:'
-                dlyVal = dlyVal + delayvalue + '\n'
-                file.write(dlyVal)
+    # Config data record ID are the radio channel ID
+    chan = channels.get(cnfgid)
+    if chan is None:
+        abort(404)
 
-                thrVal = 'THRESHOLDVALUE:'
-                thrVal = thrVal + thresholdvalue + '\n'
-                file.write(thrVal)
+    # VOX parameter are queued to VOX controller, a parameter updated while VOX controller busy are sent
+    # after the current command ACK received. Only one VOX parameter are updated for each request
 
-                voXmode = 'MODE:'
-                voXmode = voXmode + voxMode + '\n'
-                file.write(voXmode)
+    # Update VOX config - PTT delay analog input delay division factor
+    if 'delayaindiv' in request.json:
+        tempDlyInpDiv = request.json['delayaindiv']
+        
+        if tempDlyInpDiv != 'RETRIEVE':
+            # Update config data
+            chan.voxParamData['delayaindiv'] = request.json['delayaindiv']
 
-                # Close the file
-                file.close()
+            voxBackup(chan, 1) # Copy previous value as a backup if configuring VOX controller failed
+            chan.delayaindiv = chan.voxParamData['delayaindiv']
 
-                # Send command to VOX controller
-                sendCmdType = 1
-        # Update VOX config - VOX PTT delay addition factor
-        elif 'delayvaladd' in request.json:
-            tempDlyInpAdd = request.json['delayvaladd']
-
-            if tempDlyInpAdd != 'RETRIEVE':
-                # Open VOX config file
-                #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-                file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-                
-                # Copy the rest (no update) data
-                dlyAinDiv = 'DELAYAINDIV:'
-                dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-                file.write(dlyAinDiv)
+            # Write VOX config file
+            markConfigDirty(chan.voxGroup)
 
-                # Update config data
-                vCnfg[0]['delayvaladd'] = request.json['delayvaladd']
+            # Send command to VOX controller
+            voxSend(chan, 1)
+    # Update VOX config - VOX PTT delay addition factor
+    elif 'delayvaladd' in request.json:
+        tempDlyInpAdd = request.json['delayvaladd']
 
-                pDelayvaladd = delayvaladd # Copy previous value as a backup if configuring VOX controller failed
-                delayvaladd = vCnfg[0]['delayvaladd']
-                            
-                # Create new text file for a new data
-                dlyValAdd = 'DELAYVALADD:'
-                dlyValAdd = dlyValAdd + delayvaladd + '\n'
-                file.write(dlyValAdd)
+        if tempDlyInpAdd != 'RETRIEVE':
+            # Update config data
+            chan.voxParamData['delayvaladd'] = request.json['delayvaladd']
 
-                # Copy the rest (no update) data....continues
-                thrMultp = 'THRESHMULTP:'
-                thrMultp = thrMultp + threshmultp + '\n'
-                file.write(thrMultp)
+            voxBackup(chan, 2) # Copy previous value as a backup if configuring VOX controller failed
+            chan.delayvaladd = chan.voxParamData['delayvaladd']
 
-                thrAdd = 'THRESHADD:'
-                thrAdd = thrAdd + threshadd + '\n'
-                file.write(thrAdd)
+            # Write VOX config file
+            markConfigDirty(chan.voxGroup)
 
-                dlyVal = 'DELAYVALUE:'
-                dlyVal = dlyVal + delayvalue + '\n'
-                file.write(dlyVal)
+            # Send command to VOX controller
+            voxSend(chan, 2)
+    # Update VOX config - VOX threshold analog input multiplication factor
+    elif 'threshmultp' in request.json:
+        tempThresMultp = request.json['threshmultp']
 
-                thrVal = 'THRESHOLDVALUE:'
-                thrVal = thrVal + thresholdvalue + '\n'
-                file.write(thrVal)
+        if tempThresMultp != 'RETRIEVE':
+            # Update config data
+            chan.voxParamData['threshmultp'] = request.json['threshmultp']
 
-                voXmode = 'MODE:'
-                voXmode = voXmode + voxMode + '\n'
-                file.write(voXmode)
+            voxBackup(chan, 3) # Copy previous value as a backup if configuring VOX controller failed
+            chan.threshmultp = chan.voxParamData['threshmultp']
 
-                # Close the file
-                file.close()
+            # Write VOX config file
+            markConfigDirty(chan.voxGroup)
 
-                # Send command to VOX controller
-                sendCmdType = 2
-        # Update VOX config - VOX threshold analog input multiplication factor
-        elif 'threshmultp' in request.json:
-            tempThresMultp = request.json['threshmultp']
-
-            if tempThresMultp != 'RETRIEVE':
-                # Open VOX config file
-                #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-                file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-                # Copy the rest (no update) data
-                dlyAinDiv = 'DELAYAINDIV:'
-                dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-                file.write(dlyAinDiv)
-
-                dlyValAdd = 'DELAYVALADD:'
-                dlyValAdd = dlyValAdd + delayvaladd + '\n'
-                file.write(dlyValAdd)
-
-                # Update config data
-                vCnfg[0]['threshmultp'] = request.json['threshmultp']
-
-                pThreshmultp = threshmultp # Copy previous value as a backup if configuring VOX controller failed
-                threshmultp = vCnfg[0]['threshmultp']
-                            
-                # Create new text file for a new data
-                thrMultp = 'THRESHMULTP:'
-                thrMultp = thrMultp + threshmultp + '\n'
-                file.write(thrMultp)
-
-                # Copy the rest (no update) data....continues
-                thrAdd = 'THRESHADD:'
-                thrAdd = thrAdd + threshadd + '\n'
-                file.write(thrAdd)
+            # Send command to VOX controller
+            voxSend(chan, 3)
+    # Update VOX config - VOX threshold analog input addition factor
+    elif 'threshadd' in request.json:
+        tempThresAdd = request.json['threshadd']
 
-                dlyVal = 'DELAYVALUE:'
-                dlyVal = dlyVal + delayvalue + '\n'
-                file.write(dlyVal)
+        if tempThresAdd != 'RETRIEVE':
+            # Update config data
+            chan.voxParamData['threshadd'] = request.json['threshadd']
 
-                thrVal = 'THRESHOLDVALUE:'
-                thrVal = thrVal + thresholdvalue + '\n'
-                file.write(thrVal)
+            voxBackup(chan, 4) # Copy previous value as a backup if configuring VOX controller failed
+            chan.threshadd = chan.voxParamData['threshadd']
 
-                voXmode = 'MODE:'
-                voXmode = voXmode + voxMode + '\n'
-                file.write(voXmode)
+            # Write VOX config file
+            markConfigDirty(chan.voxGroup)
 
-                # Close the file
-                file.close()
+            # Send command to VOX controller
+            voxSend(chan, 4)
+    # Update VOX config - VOX total delay
+    elif 'delayvalue' in request.json:
+        tempDlyVal = request.json['delayvalue']
 
-                # Send command to VOX controller
-                sendCmdType = 3
-        # Update VOX config - VOX threshold analog input addition factor
-        elif 'threshadd' in request.json:
-            tempThresAdd = request.json['threshadd']
-
-            if tempThresAdd != 'RETRIEVE':
-                # Open VOX config file
-                #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-                file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-                # Copy the rest (no update) data
-                dlyAinDiv = 'DELAYAINDIV:'
-                dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-                file.write(dlyAinDiv)
-
-                dlyValAdd = 'DELAYVALADD:'
-                dlyValAdd = dlyValAdd + delayvaladd + '\n'
-                file.write(dlyValAdd)
-
-                thrMultp = 'THRESHMULTP:'
-                thrMultp = thrMultp + threshmultp + '\n'
-                file.write(thrMultp)
-
-                # Update config data
-                vCnfg[0]['threshadd'] = request.json['threshadd']
-
-                pThreshadd = threshadd # Copy previous value as a backup if configuring VOX controller failed
-                threshadd = vCnfg[0]['threshadd']
-                            
-                # Create new text file for a new data
-                thrAdd = 'THRESHADD:'
-                thrAdd = thrAdd + threshadd + '\n'
-                file.write(thrAdd)
+        if tempDlyVal != 'RETRIEVE':
+            # Update config data
+            chan.voxParamData['delayvalue'] = request.json['delayvalue']
 
-                # Copy the rest (no update) data....continues
-                dlyVal = 'DELAYVALUE:'
-                dlyVal = dlyVal + delayvalue + '\n'
-                file.write(dlyVal)
+            voxBackup(chan, 5) # Copy previous value as a backup if configuring VOX controller failed
+            chan.delayvalue = chan.voxParamData['delayvalue']
 
-                thrVal = 'THRESHOLDVALUE:'
-                thrVal = thrVal + thresholdvalue + '\n'
-                file.write(thrVal)
+            # Write VOX config file
+            markConfigDirty(chan.voxGroup)
 
-                voXmode = 'MODE:'
-                voXmode = voXmode + voxMode + '\n'
-                file.write(voXmode)
+            # Send command to VOX controller
+            voxSend(chan, 5)
+    # Update VOX config - VOX total threshold
+    elif 'thresholdvalue' in request.json:
+        tempThresVal = request.json['thresholdvalue']
 
-                # Close the file
-                file.close()
+        if tempThresVal != 'RETRIEVE':
+            # Update config data
+            chan.voxParamData['thresholdvalue'] = request.json['thresholdvalue']
 
-                # Send command to VOX controller
-                sendCmdType = 4
-        # Update VOX config - VOX total delay
-        elif 'delayvalue' in request.json:
-            tempDlyVal = request.json['delayvalue']
-
-            if tempDlyVal != 'RETRIEVE':
-                # Open VOX config file
-                #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-                file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-                # Copy the rest (no update) data
-                dlyAinDiv = 'DELAYAINDIV:'
-                dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-                file.write(dlyAinDiv)
-
-                dlyValAdd = 'DELAYVALADD:'
-                dlyValAdd = dlyValAdd + delayvaladd + '\n'
-                file.write(dlyValAdd)
-
-                thrMultp = 'THRESHMULTP:'
-                thrMultp = thrMultp + threshmultp + '\n'
-                file.write(thrMultp)
-
-                thrAdd = 'THRESHADD:'
-                thrAdd = thrAdd + threshadd + '\n'
-                file.write(thrAdd)
-
-                # Update config data
-                vCnfg[0]['delayvalue'] = request.json['delayvalue']
-
-                pDelayvalue = delayvalue # Copy previous value as a backup if configuring VOX controller failed
-                delayvalue = vCnfg[0]['delayvalue']
-                            
-                # Create new text file for a new data
-                dlyVal = 'DELAYVALUE:'
-                dlyVal = dlyVal + delayvalue + '\n'
-                file.write(dlyVal)
+            voxBackup(chan, 6) # Copy previous value as a backup if configuring VOX controller failed
+            chan.thresholdvalue = chan.voxParamData['thresholdvalue']
 
-                # Copy the rest (no update) data....continues
-                thrVal = 'THRESHOLDVALUE:'
-                thrVal = thrVal + thresholdvalue + '\n'
-                file.write(thrVal)
+            # Write VOX config file
+            markConfigDirty(chan.voxGroup)
 
-                voXmode = 'MODE:'
-                voXmode = voXmode + voxMode + '\n'
-                file.write(voXmode)
+            # Send command to VOX controller
+            voxSend(chan, 6)
+    # Update VOX config - VOX controller current mode
+    elif 'mode' in request.json:
+        tempMode = request.json['mode']
 
-                # Close the file
-                file.close()
+        if tempMode != 'RETRIEVE':
+            # Update config data
+            voxBackup(chan, 7) # Copy previous value as a backup if configuring VOX controller failed
+            chan.voxMode = request.json['mode']
+            if chan.voxMode == '1':
+                chan.voxParamData['mode'] = 'Mode 1'
+            else:
+                chan.voxParamData['mode'] = 'Mode 2'
 
-                # Send command to VOX controller
-                sendCmdType = 5
-        # Update VOX config - VOX total threshold
-        elif 'thresholdvalue' in request.json:
-            tempThresVal = request.json['thresholdvalue']
-
-            if tempThresVal != 'RETRIEVE':
-                # Open VOX config file
-                #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-                file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-                # Copy the rest (no update) data
-                dlyAinDiv = 'DELAYAINDIV:'
-                dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-                file.write(dlyAinDiv)
-
-                dlyValAdd = 'DELAYVALADD:'
-                dlyValAdd = dlyValAdd + delayvaladd + '\n'
-                file.write(dlyValAdd)
-
-                thrMultp = 'THRESHMULTP:'
-                thrMultp = thrMultp + threshmultp + '\n'
-                file.write(thrMultp)
-
-                thrAdd = 'THRESHADD:'
-                thrAdd = thrAdd + threshadd + '\n'
-                file.write(thrAdd)
-
-                dlyVal = 'DELAYVALUE:'
-                dlyVal = dlyVal + delayvalue + '\n'
-                file.write(dlyVal)
-
-                # Update config data
-                vCnfg[0]['thresholdvalue'] = request.json['thresholdvalue']
-
-                pThresvalue = thresholdvalue # Copy previous value as a backup if configuring VOX controller failed
-                thresholdvalue = vCnfg[0]['thresholdvalue']
-                            
-                # Create new text file for a new data
-                thrVal = 'THRESHOLDVALUE:'
-                thrVal = thrVal + thresholdvalue + '\n'
-                file.write(thrVal)
-                
-                # Copy the rest (no update) data....continues
-                voXmode = 'MODE:'
-                voXmode = voXmode + voxMode + '\n'
-                file.write(voXmode)
+            # Update RIC daemon status REST API data
+            chan.daemonStat['voxmode'] = chan.voxParamData['mode']
 
-                # Close the file
-                file.close()
+            # Write VOX config file
+            markConfigDirty(chan.voxGroup)
 
-                # Send command to VOX controller
-                sendCmdType = 6
-        # Update VOX config - VOX controller current mode
-        elif 'mode' in request.json:
-            tempMode = request.json['mode']
-
-            if tempMode != 'RETRIEVE':
-                # Open VOX config file
-                #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-                file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-                # Copy the rest (no update) data
-                dlyAinDiv = 'DELAYAINDIV:'
-                dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-                file.write(dlyAinDiv)
-
-                dlyValAdd = 'DELAYVALADD:'
-                dlyValAdd = dlyValAdd + delayvaladd + '\n'
-                file.write(dlyValAdd)
-
-                thrMultp = 'THRESHMULTP:'
-                thrMultp = thrMultp + threshmultp + '\n'
-                file.write(thrMultp)
-
-                thrAdd = 'THRESHADD:'
-                thrAdd = thrAdd + threshadd + '\n'
-                file.write(thrAdd)
-
-                dlyVal = 'DELAYVALUE:'
-                dlyVal = dlyVal + delayvalue + '\n'
-                file.write(dlyVal)
-
-                thrVal = 'THRESHOLDVALUE:'
-                thrVal = thrVal + thresholdvalue + '\n'
-                file.write(thrVal)
-
-                # Update config data
-                pVoxMode = voxMode # Copy previous value as a backup if configuring VOX controller failed
-                voxMode = request.json['mode']
-                if voxMode == '1':
-                    vCnfg[0]['mode'] = 'Mode 1'
-                else:
-                    vCnfg[0]['mode'] = 'Mode 2'
+            # Send command to VOX controller
+            voxSend(chan, 7)
+    return jsonify({'voxconfig': [ chan.voxParamData.snapshot() ], 'voxcommand': voxCmdState(chan)})
 
-                # Update RIC daemon status REST API data
-                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                ric[0]['voxmode'] = vCnfg[0]['mode']
-        
-                # Create new text file for a new data
-                voXmode = 'MODE:'
-                voXmode = voXmode + voxMode + '\n'
-                file.write(voXmode)
+# Apply a whole VOX controller profile - Mode 1 or Mode 2 parameter set are sent as one transaction
+# Parameter not carried by the request keep the current value, VOX config file are written once all ACK received
+# Example command to send:
+# curl -i -H "Content-type: application/json" -X PUT -d "{\"mode\":\"2\",\"delayvalue\":\"95\",\"thresholdvalue\":\"267\"}" http://192.168.101.1:5000/voxprofile/000
+@app.route('/voxprofile/<cnfgid>', methods=['PUT'])
+def updateVoxProfile(cnfgid):
+    # Config data record ID are the radio channel ID
+    chan = channels.get(cnfgid)
+    if chan is None:
+        abort(404)
+
+    mode = str(request.json.get('mode', chan.voxMode))
+    if mode not in voxProfileTypes:
+        return jsonify({'voxprofile': {'status': 'INVALID', 'param': 'mode'}}), 400
+
+    params = {}
+    for cmdType in voxProfileTypes[mode]:
+        field = voxCnfgKeys[cmdType - 1]
+        value = str(request.json.get(field, 'RETRIEVE'))
+        if value == 'RETRIEVE':
+            value = getattr(chan, field)
+        if voxFrame(cmdType, value) is None:
+            return jsonify({'voxprofile': {'status': 'INVALID', 'param': field}}), 400
+        params[field] = value
+
+    txn = voxApplyProfile(chan, mode, params)
+    if txn.status == 'APPLIED':
+        status = 200
+    elif txn.status == 'ROLLBACK':
+        status = 502
+    else:
+        status = 504
+    return jsonify({'voxconfig': [ chan.voxParamData.snapshot() ],
+                    'voxprofile': {'status': txn.status, 'rtt': round(txn.rtt * 1e3, 3)}}), status
 
-                # Close the file
-                file.close()
-
-                # Send command to VOX controller
-                sendCmdType = 7
-    return jsonify({'voxconfig': vCnfg})
+# Keep REST API request start time for REST API request time metric
+@app.before_request
+def requestStart():
+    request.environ['sipradio.start'] = time.time()
 
 # Handle Cross-Origin (CORS) problem upon client request
 @app.after_request
 def add_headers(response):
+    # REST API request time metric
+    if 'sipradio.start' in request.environ:
+        route = request.url_rule.rule if request.url_rule is not None else 'NOT FOUND'
+        metRest.observe((route, request.method), time.time() - request.environ['sipradio.start'])
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,If-None-Match')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE')
+    response.headers.add('Access-Control-Expose-Headers', 'ETag')
 
     return response
 
@@ -1897,7 +3495,7 @@ def add_headers(response):
 # http://192.168.101.1:5000/sipconfig
 @app.route('/sipconfig', methods=['GET'])
 def getSipConfigData():
-    return jsonify({'sipConfig': sipConfigData}) 
+    return dataSetResponse('sipConfig', [ channels[chanId].sipConfigData for chanId in channels ])
 
 # Update setting for local SIP configuration
 # Example command to send:
@@ -1905,1273 +3503,819 @@ def getSipConfigData():
 # 'RETRIEVE' value are only to retrieve current setting
 @app.route('/sipconfig/<cnfgid>', methods=['PUT'])
 def updateSipConfigData(cnfgid):
-    global sipUserName
-    global sipPswd
-    global asteriskIP
-    global pttSet
-    global micSet
-    global audioSet
-    global audMultSet
-    global pttToVal
-    global pttMode
-    global pttModeOper
-
-    tempSipUName = ''
-    tempSipPswd = ''
-    tempAstIp = ''
-    tempPttSet = ''
-    tempMicSet = ''
-    tempAudSet = ''
-    tempAudMSet = ''
-    tempPttTo = ''
-    tempPttMod = ''
-    
-    cnfg = [ cnfgG for cnfgG in sipConfigData if (cnfgG['id'] == cnfgid) ]
-    # Update SIP user name
-    if 'sipusername' in request.json:
-        tempSipUName = request.json['sipusername']
-                    
-        # It is to update SIP user name
-        if tempSipUName != 'RETRIEVE':
-            # Open SIP config file
-            #file = open("/etc/conf.d/sipHFradio/sipHFradioCnfg.conf", "w")
-            file = open("/etc/conf.d/sipradio/sipradioCnfg.conf", "w")
-
-            # Update config data
-            cnfg[0]['sipusername'] = request.json['sipusername']
-            sipUserName = cnfg[0]['sipusername']
-            
-            # Create new text file for a new data
-            sipuname = 'SIPUSERNAME:'
-            sipuname = sipuname + sipUserName + '\n'
-            file.write(sipuname)
-                    
-            # Copy the rest (no update) data
-            sippswd = 'SIPPSWD:'
-            sippswd = sippswd + sipPswd + '\n'
-            file.write(sippswd)
-            
-            astip = 'ASTERISKIP:'
-            astip = astip + asteriskIP + '\n'
-            file.write(astip)
-
-            pttset = 'PTTSET:'
-            pttset = pttset + pttSet + '\n'
-            file.write(pttset)
-
-            micset = 'MICSET:'
-            micset = micset + micSet + '\n'
-            file.write(micset)
-
-            audioset = 'AUDIOSET:'
-            audioset = audioset + audioSet + '\n'
-            file.write(audioset)
-
-            audmultset = 'AUDMULTSET:'
-            audmultset = audmultset + audMultSet + '\n'
-            file.write(audmultset)
-            
-            ptttoval = 'PTTTO:'
-            ptttoval = ptttoval + pttToVal + '\n'
-            file.write(ptttoval)
-            
-            pttmode = 'PTTMODE:'
-            pttmode = pttmode + pttMode + '\n'
-            file.write(pttmode)
-
-            # Close the file
-            file.close()
-    # Update SIP password
-    elif 'sippassword' in request.json:
-        tempSipPswd = request.json['sippassword']
-        
-        # It is to update SIP password
-        if tempSipPswd != 'RETRIEVE': 
-            # Open SIP config file
-            #file = open("/etc/conf.d/sipHFradio/sipHFradioCnfg.conf", "w")
-            file = open("/etc/conf.d/sipradio/sipradioCnfg.conf", "w")
-
-            # Update config data
-            cnfg[0]['sippassword'] = request.json['sippassword']
-            sipPswd = cnfg[0]['sippassword']
-            
-            # Copy the rest (no update) data
-            sipuname = 'SIPUSERNAME:'
-            sipuname = sipuname + sipUserName + '\n'
-            file.write(sipuname)
-
-            # Create new text file for a new data
-            sippswd = 'SIPPSWD:'
-            sippswd = sippswd + sipPswd + '\n'
-            file.write(sippswd)
-
-            # Copy the rest (no update) data....continues
-            astip = 'ASTERISKIP:'
-            astip = astip + asteriskIP + '\n'
-            file.write(astip)
-
-            pttset = 'PTTSET:'
-            pttset = pttset + pttSet + '\n'
-            file.write(pttset)
-
-            micset = 'MICSET:'
-            micset = micset + micSet + '\n'
-            file.write(micset)
-
-            audioset = 'AUDIOSET:'
-            audioset = audioset + audioSet + '\n'
-            file.write(audioset)
-
-            audmultset = 'AUDMULTSET:'
-            audmultset = audmultset + audMultSet + '\n'
-            file.write(audmultset)
-            
-            ptttoval = 'PTTTO:'
-            ptttoval = ptttoval + pttToVal + '\n'
-            file.write(ptttoval)
-            
-            pttmode = 'PTTMODE:'
-            pttmode = pttmode + pttMode + '\n'
-            file.write(pttmode)
-
-            # Close the file
-            file.close()
-    # Update ASTERISK IP address
-    elif 'asteriskip' in request.json:
-        tempAstIp = request.json['asteriskip']
-                    
-        # It is to update SIP registrar IP address
-        if tempAstIp != 'RETRIEVE':
-            # Open SIP config file
-            #file = open("/etc/conf.d/sipHFradio/sipHFradioCnfg.conf", "w")
-            file = open("/etc/conf.d/sipradio/sipradioCnfg.conf", "w")
-
-            # Update config data
-            cnfg[0]['asteriskip'] = request.json['asteriskip']
-            asteriskIP = cnfg[0]['asteriskip']
-            
-            # Copy the rest (no update) data
-            sipuname = 'SIPUSERNAME:'
-            sipuname = sipuname + sipUserName + '\n'
-            file.write(sipuname)
-
-            sippswd = 'SIPPSWD:'
-            sippswd = sippswd + sipPswd + '\n'
-            file.write(sippswd)
-
-            # Create new text file for a new data
-            astip = 'ASTERISKIP:'
-            astip = astip + asteriskIP + '\n'
-            file.write(astip)
-
-            # Copy the rest (no update) data....continues
-            pttset = 'PTTSET:'
-            pttset = pttset + pttSet + '\n'
-            file.write(pttset)
-
-            micset = 'MICSET:'
-            micset = micset + micSet + '\n'
-            file.write(micset)
-
-            audioset = 'AUDIOSET:'
-            audioset = audioset + audioSet + '\n'
-            file.write(audioset)
-
-            audmultset = 'AUDMULTSET:'
-            audmultset = audmultset + audMultSet + '\n'
-            file.write(audmultset)
-            
-            ptttoval = 'PTTTO:'
-            ptttoval = ptttoval + pttToVal + '\n'
-            file.write(ptttoval)
-            
-            pttmode = 'PTTMODE:'
-            pttmode = pttmode + pttMode + '\n'
-            file.write(pttmode)
-
-            # Close the file
-            file.close()
-    # Update PTT setting - enable of disable
-    elif 'pttset' in request.json:
-        tempPttSet = request.json['pttset']
-                    
-        # It is to update PTT functionality
-        if tempPttSet != 'RETRIEVE':
-            # Open SIP config file
-            #file = open("/etc/conf.d/sipHFradio/sipHFradioCnfg.conf", "w")
-            file = open("/etc/conf.d/sipradio/sipradioCnfg.conf", "w")
-
-            # Update config data
-            cnfg[0]['pttset'] = request.json['pttset']
-            pttSet = cnfg[0]['pttset']
-            
-            # Copy the rest (no update) data
-            sipuname = 'SIPUSERNAME:'
-            sipuname = sipuname + sipUserName + '\n'
-            file.write(sipuname)
-
-            sippswd = 'SIPPSWD:'
-            sippswd = sippswd + sipPswd + '\n'
-            file.write(sippswd)
-
-            astip = 'ASTERISKIP:'
-            astip = astip + asteriskIP + '\n'
-            file.write(astip)
-
-            # Create new text file for a new data
-            pttset = 'PTTSET:'
-            pttset = pttset + pttSet + '\n'
-            file.write(pttset)
-
-            # Copy the rest (no update) data....continues
-            micset = 'MICSET:'
-            micset = micset + micSet + '\n'
-            file.write(micset)
-
-            audioset = 'AUDIOSET:'
-            audioset = audioset + audioSet + '\n'
-            file.write(audioset)
-
-            audmultset = 'AUDMULTSET:'
-            audmultset = audmultset + audMultSet + '\n'
-            file.write(audmultset)
-            
-            ptttoval = 'PTTTO:'
-            ptttoval = ptttoval + pttToVal + '\n'
-            file.write(ptttoval)
-            
-            pttmode = 'PTTMODE:'
-            pttmode = pttmode + pttMode + '\n'
-            file.write(pttmode)
-
-            # Close the file
-            file.close()
-    # Update MIC setting - enable of disable
-    elif 'micset' in request.json:
-        tempMicSet = request.json['micset']
-                    
-        # It is to update MIC functionality
-        if tempMicSet != 'RETRIEVE':
-            # Open SIP config file
-            #file = open("/etc/conf.d/sipHFradio/sipHFradioCnfg.conf", "w")
-            file = open("/etc/conf.d/sipradio/sipradioCnfg.conf", "w")
-
-            # Update config data
-            cnfg[0]['micset'] = request.json['micset']
-            micSet = cnfg[0]['micset']
-            
-            # Copy the rest (no update) data
-            sipuname = 'SIPUSERNAME:'
-            sipuname = sipuname + sipUserName + '\n'
-            file.write(sipuname)
-
-            sippswd = 'SIPPSWD:'
-            sippswd = sippswd + sipPswd + '\n'
-            file.write(sippswd)
-
-            astip = 'ASTERISKIP:'
-            astip = astip + asteriskIP + '\n'
-            file.write(astip)
-
-            pttset = 'PTTSET:'
-            pttset = pttset + pttSet + '\n'
-            file.write(pttset)
-
-            # Create new text file for a new data
-            micset = 'MICSET:'
-            micset = micset + micSet + '\n'
-            file.write(micset)
-
-            # Copy the rest (no update) data....continues
-            audioset = 'AUDIOSET:'
-            audioset = audioset + audioSet + '\n'
-            file.write(audioset)
-
-            audmultset = 'AUDMULTSET:'
-            audmultset = audmultset + audMultSet + '\n'
-            file.write(audmultset)
-            
-            ptttoval = 'PTTTO:'
-            ptttoval = ptttoval + pttToVal + '\n'
-            file.write(ptttoval)
-            
-            pttmode = 'PTTMODE:'
-            pttmode = pttmode + pttMode + '\n'
-            file.write(pttmode)
-
-            # Close the file
-            file.close()
-    # Update AUDIO setting - enable of disable
-    elif 'audioset' in request.json:
-        tempAudSet = request.json['audioset']
-                    
-        # It is to update AUDIO functionality
-        if tempAudSet != 'RETRIEVE':
-            # Open SIP config file
-            #file = open("/etc/conf.d/sipHFradio/sipHFradioCnfg.conf", "w")
-            file = open("/etc/conf.d/sipradio/sipradioCnfg.conf", "w")
-
-            # Update config data
-            cnfg[0]['audioset'] = request.json['audioset']
-            audioSet = cnfg[0]['audioset']
-            
-            # Copy the rest (no update) data
-            sipuname = 'SIPUSERNAME:'
-            sipuname = sipuname + sipUserName + '\n'
-            file.write(sipuname)
-
-            sippswd = 'SIPPSWD:'
-            sippswd = sippswd + sipPswd + '\n'
-            file.write(sippswd)
-
-            astip = 'ASTERISKIP:'
-            astip = astip + asteriskIP + '\n'
-            file.write(astip)
-
-            pttset = 'PTTSET:'
-            pttset = pttset + pttSet + '\n'
-            file.write(pttset)
-
-            micset = 'MICSET:'
-            micset = micset + micSet + '\n'
-            file.write(micset)
-
-            # Create new text file for a new data
-            audioset = 'AUDIOSET:'
-            audioset = audioset + audioSet + '\n'
-            file.write(audioset)
-
-            # Copy the rest (no update) data....continues
-            audmultset = 'AUDMULTSET:'
-            audmultset = audmultset + audMultSet + '\n'
-            file.write(audmultset)
-            
-            ptttoval = 'PTTTO:'
-            ptttoval = ptttoval + pttToVal + '\n'
-            file.write(ptttoval)
-            
-            pttmode = 'PTTMODE:'
-            pttmode = pttmode + pttMode + '\n'
-            file.write(pttmode)
-
-            # Close the file
-            file.close()
-    # Update AUDIO MULTICAST setting - enable of disable
-    elif 'audmultset' in request.json:
-        tempAudMSet = request.json['audmultset']
-                    
-        # It is to update AUDIO MULTICAST functionality
-        if tempAudMSet != 'RETRIEVE':
-            # Open SIP config file
-            #file = open("/etc/conf.d/sipHFradio/sipHFradioCnfg.conf", "w")
-            file = open("/etc/conf.d/sipradio/sipradioCnfg.conf", "w")
-
-            # Update config data
-            cnfg[0]['audmultset'] = request.json['audmultset']
-            audMultSet = cnfg[0]['audmultset']
-            
-            # Copy the rest (no update) data
-            sipuname = 'SIPUSERNAME:'
-            sipuname = sipuname + sipUserName + '\n'
-            file.write(sipuname)
-
-            sippswd = 'SIPPSWD:'
-            sippswd = sippswd + sipPswd + '\n'
-            file.write(sippswd)
-
-            astip = 'ASTERISKIP:'
-            astip = astip + asteriskIP + '\n'
-            file.write(astip)
-
-            pttset = 'PTTSET:'
-            pttset = pttset + pttSet + '\n'
-            file.write(pttset)
-
-            micset = 'MICSET:'
-            micset = micset + micSet + '\n'
-            file.write(micset)
-
-            audioset = 'AUDIOSET:'
-            audioset = audioset + audioSet + '\n'
-            file.write(audioset)
-
-            # Create new text file for a new data
-            audmultset = 'AUDMULTSET:'
-            audmultset = audmultset + audMultSet + '\n'
-            file.write(audmultset)
-
-            # Copy the rest (no update) data....continues
-            ptttoval = 'PTTTO:'
-            ptttoval = ptttoval + pttToVal + '\n'
-            file.write(ptttoval)
-            
-            pttmode = 'PTTMODE:'
-            pttmode = pttmode + pttMode + '\n'
-            file.write(pttmode)
-
-            # Close the file
-            file.close()
-    # Update PTT time out value
-    elif 'pttto' in request.json:
-        tempPttTo = request.json['pttto']
-                    
-        # It is to update PTT time out value
-        if tempPttTo != 'RETRIEVE':
-            # Open SIP config file
-            #file = open("/etc/conf.d/sipHFradio/sipHFradioCnfg.conf", "w")
-            file = open("/etc/conf.d/sipradio/sipradioCnfg.conf", "w")
-
-            # Update config data
-            cnfg[0]['pttto'] = request.json['pttto']
-            pttToVal = cnfg[0]['pttto']
-            
-            # Copy the rest (no update) data
-            sipuname = 'SIPUSERNAME:'
-            sipuname = sipuname + sipUserName + '\n'
-            file.write(sipuname)
-
-            sippswd = 'SIPPSWD:'
-            sippswd = sippswd + sipPswd + '\n'
-            file.write(sippswd)
-
-            astip = 'ASTERISKIP:'
-            astip = astip + asteriskIP + '\n'
-            file.write(astip)
-
-            pttset = 'PTTSET:'
-            pttset = pttset + pttSet + '\n'
-            file.write(pttset)
-
-            micset = 'MICSET:'
-            micset = micset + micSet + '\n'
-            file.write(micset)
-
-            audioset = 'AUDIOSET:'
-            audioset = audioset + audioSet + '\n'
-            file.write(audioset)
-
-            audmultset = 'AUDMULTSET:'
-            audmultset = audmultset + audMultSet + '\n'
-            file.write(audmultset)
-
-            # Create new text file for a new data
-            ptttoval = 'PTTTO:'
-            ptttoval = ptttoval + pttToVal + '\n'
-            file.write(ptttoval)
-
-            # Copy the rest (no update) data....continues
-            pttmode = 'PTTMODE:'
-            pttmode = pttmode + pttMode + '\n'
-            file.write(pttmode)
-
-            # Close the file
-            file.close()
-    # Update PTT mode of operation
-    elif 'pttmode' in request.json:
-        tempPttMod = request.json['pttmode']
-                    
-        # It is to update PTT mode of operation
-        if tempPttMod != 'RETRIEVE':
-            # Open SIP config file
-            #file = open("/etc/conf.d/sipHFradio/sipHFradioCnfg.conf", "w")
-            file = open("/etc/conf.d/sipradio/sipradioCnfg.conf", "w")
-
-            # Update config data
-            cnfg[0]['pttmode'] = request.json['pttmode']
-            pttMode = cnfg[0]['pttmode']
-            
-            # Copy the rest (no update) data
-            sipuname = 'SIPUSERNAME:'
-            sipuname = sipuname + sipUserName + '\n'
-            file.write(sipuname)
-
-            sippswd = 'SIPPSWD:'
-            sippswd = sippswd + sipPswd + '\n'
-            file.write(sippswd)
-
-            astip = 'ASTERISKIP:'
-            astip = astip + asteriskIP + '\n'
-            file.write(astip)
+    changed = {}
 
-            pttset = 'PTTSET:'
-            pttset = pttset + pttSet + '\n'
-            file.write(pttset)
+    # Config data record ID are the radio channel ID
+    chan = channels.get(cnfgid)
+    if chan is None:
+        abort(404)
 
-            micset = 'MICSET:'
-            micset = micset + micSet + '\n'
-            file.write(micset)
-
-            audioset = 'AUDIOSET:'
-            audioset = audioset + audioSet + '\n'
-            file.write(audioset)
-
-            audmultset = 'AUDMULTSET:'
-            audmultset = audmultset + audMultSet + '\n'
-            file.write(audmultset)
-
-            ptttoval = 'PTTTO:'
-            ptttoval = ptttoval + pttToVal + '\n'
-            file.write(ptttoval)
+    
+    # Update all SIP config data carried by the request in memory first
+    # 'RETRIEVE' value are only to retrieve current setting
+    for cnfgKey in sipCnfgKeys:
+        if cnfgKey in request.json and request.json[cnfgKey] != 'RETRIEVE':
+            changed[cnfgKey] = request.json[cnfgKey]
 
-            pttModeOper = int(pttMode) # Update PTT mode to be use in PTT logic of operation
-            
-            # Create new text file for a new data
-            pttmode = 'PTTMODE:'
-            pttmode = pttmode + pttMode + '\n'
-            file.write(pttmode)
+    if len(changed) > 0:
+        applySipConfig(chan, changed)
 
-            # Mode 1
-            if pttModeOper == 1:
-                # Initialize PTT mode relay OFF
-                GPIO.output(12, GPIO.LOW)
+        # Write SIP config file once for all updated data
+        markConfigDirty(chan.sipGroup)
 
-                # Update RIC daemon status REST API data
-                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                ric[0]['pttmode'] = 'Mode 1'
-            # Mode 2
-            elif pttModeOper == 2:
-                # Initialize PTT mode relay OFF
-                GPIO.output(12, GPIO.LOW)
-        
-                # Update RIC daemon status REST API data
-                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                ric[0]['pttmode'] = 'Mode 2'
-            # Mode 3
-            elif pttModeOper == 3:
-                # Initialize PTT mode relay OFF
-                GPIO.output(12, GPIO.HIGH)
-        
-                # Update RIC daemon status REST API data
-                ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                ric[0]['pttmode'] = 'Mode 3'
-        
-    return jsonify({'sipConfig': cnfg}) 
+    return jsonify({'sipConfig': [ chan.sipConfigData.snapshot() ]})
 
 # Revert back VOX configuration data to previous value
-def revertVOXdata (cmdType):
-    global delayaindiv
-    global pDelayaindiv
-    global delayvaladd
-    global pDelayvaladd
-    global threshmultp
-    global pThreshmultp
-    global threshadd
-    global pThreshadd
-    global delayvalue
-    global pDelayvalue
-    global thresholdvalue
-    global pThresvalue
-    global voxMode
-    global pVoxMode
-
-    vCnfg = [ vCnfgG for vCnfgG in voxParamData if (vCnfgG['id'] == '000') ]
-
+def revertVOXdata (chan, cmdType):
     # Restore VOX config - PTT delay analog input delay division factor
     if cmdType == 1:
-        # Open VOX config file
-        #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-        file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
         # Restore config data
-        vCnfg[0]['delayaindiv'] = pDelayaindiv
-        delayaindiv = pDelayaindiv # Restore back current value
-        
-        # Restore new text file with a previous data
-        dlyAinDiv = 'DELAYAINDIV:'
-        dlyAinDiv = dlyAinDiv + pDelayaindiv + '\n'
-        pDelayaindiv = ''
-        file.write(dlyAinDiv)
-
-        # Copy the rest (no restore) data
-        dlyValAdd = 'DELAYVALADD:'
-        dlyValAdd = dlyValAdd + delayvaladd + '\n'
-        file.write(dlyValAdd)
-
-        thrMultp = 'THRESHMULTP:'
-        thrMultp = thrMultp + threshmultp + '\n'
-        file.write(thrMultp)
-
-        thrAdd = 'THRESHADD:'
-        thrAdd = thrAdd + threshadd + '\n'
-        file.write(thrAdd)
-
-        dlyVal = 'DELAYVALUE:'
-        dlyVal = dlyVal + delayvalue + '\n'
-        file.write(dlyVal)
-
-        thrVal = 'THRESHOLDVALUE:'
-        thrVal = thrVal + thresholdvalue + '\n'
-        file.write(thrVal)
-
-        voXmode = 'MODE:'
-        voXmode = voXmode + voxMode + '\n'
-        file.write(voXmode)
-
-        # Close the file
-        file.close()
+        chan.voxParamData['delayaindiv'] = chan.pDelayaindiv
+        chan.delayaindiv = chan.pDelayaindiv # Restore back current value
+        chan.pDelayaindiv = ''
     # Restore VOX config - VOX PTT delay addition factor
     elif cmdType == 2:
-        # Open VOX config file
-        #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-        file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-        # Copy the rest (no restore) data
-        dlyAinDiv = 'DELAYAINDIV:'
-        dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-        file.write(dlyAinDiv)
-
         # Restore config data
-        vCnfg[0]['delayvaladd'] = pDelayvaladd
-        delayvaladd = pDelayvaladd # Restore back current value
-        
-        # Restore new text file with a previous data
-        dlyValAdd = 'DELAYVALADD:'
-        dlyValAdd = dlyValAdd + pDelayvaladd + '\n'
-        pDelayvaladd = ''
-        file.write(dlyValAdd)
-
-        # Copy the rest (no restore) data
-        thrMultp = 'THRESHMULTP:'
-        thrMultp = thrMultp + threshmultp + '\n'
-        file.write(thrMultp)
-
-        thrAdd = 'THRESHADD:'
-        thrAdd = thrAdd + threshadd + '\n'
-        file.write(thrAdd)
-
-        dlyVal = 'DELAYVALUE:'
-        dlyVal = dlyVal + delayvalue + '\n'
-        file.write(dlyVal)
-
-        thrVal = 'THRESHOLDVALUE:'
-        thrVal = thrVal + thresholdvalue + '\n'
-        file.write(thrVal)
-
-        voXmode = 'MODE:'
-        voXmode = voXmode + voxMode + '\n'
-        file.write(voXmode)
-
-        # Close the file
-        file.close()
+        chan.voxParamData['delayvaladd'] = chan.pDelayvaladd
+        chan.delayvaladd = chan.pDelayvaladd # Restore back current value
+        chan.pDelayvaladd = ''
     # Restore VOX config - VOX threshold analog input multiplication factor
     elif cmdType == 3:
-        # Open VOX config file
-        #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-        file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-        # Copy the rest (no restore) data
-        dlyAinDiv = 'DELAYAINDIV:'
-        dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-        file.write(dlyAinDiv)
-
-        dlyValAdd = 'DELAYVALADD:'
-        dlyValAdd = dlyValAdd + delayvaladd + '\n'
-        file.write(dlyValAdd)
-
         # Restore config data
-        vCnfg[0]['threshmultp'] = pThreshmultp
-        threshmultp = pThreshmultp # Restore back current value
-        
-        # Restore new text file with a previous data
-        thrMultp = 'THRESHMULTP:'
-        thrMultp = thrMultp + pThreshmultp + '\n'
-        pThreshmultp = ''
-        file.write(thrMultp)
-
-        # Copy the rest (no restore) data....continues
-        thrAdd = 'THRESHADD:'
-        thrAdd = thrAdd + threshadd + '\n'
-        file.write(thrAdd)
-
-        dlyVal = 'DELAYVALUE:'
-        dlyVal = dlyVal + delayvalue + '\n'
-        file.write(dlyVal)
-
-        thrVal = 'THRESHOLDVALUE:'
-        thrVal = thrVal + thresholdvalue + '\n'
-        file.write(thrVal)
-
-        voXmode = 'MODE:'
-        voXmode = voXmode + voxMode + '\n'
-        file.write(voXmode)
-
-        # Close the file
-        file.close()
+        chan.voxParamData['threshmultp'] = chan.pThreshmultp
+        chan.threshmultp = chan.pThreshmultp # Restore back current value
+        chan.pThreshmultp = ''
     # Restore VOX config - VOX threshold analog input addition factor
     elif cmdType == 4:
-        # Open VOX config file
-        #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-        file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-        # Copy the rest (no restore) data
-        dlyAinDiv = 'DELAYAINDIV:'
-        dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-        file.write(dlyAinDiv)
-
-        dlyValAdd = 'DELAYVALADD:'
-        dlyValAdd = dlyValAdd + delayvaladd + '\n'
-        file.write(dlyValAdd)
-
-        thrMultp = 'THRESHMULTP:'
-        thrMultp = thrMultp + threshmultp + '\n'
-        file.write(thrMultp)
-
         # Restore config data
-        vCnfg[0]['threshadd'] = pThreshadd
-        threshadd = pThreshadd # Restore back current value
-        
-        # Restore new text file with a previous data
-        thrAdd = 'THRESHADD:'
-        thrAdd = thrAdd + pThreshadd + '\n'
-        pThreshadd = ''
-        file.write(thrAdd)
-
-        # Copy the rest (no update) data....continues
-        dlyVal = 'DELAYVALUE:'
-        dlyVal = dlyVal + delayvalue + '\n'
-        file.write(dlyVal)
-
-        thrVal = 'THRESHOLDVALUE:'
-        thrVal = thrVal + thresholdvalue + '\n'
-        file.write(thrVal)
-
-        voXmode = 'MODE:'
-        voXmode = voXmode + voxMode + '\n'
-        file.write(voXmode)
-
-        # Close the file
-        file.close()
-    # Update VOX config - VOX total delay
+        chan.voxParamData['threshadd'] = chan.pThreshadd
+        chan.threshadd = chan.pThreshadd # Restore back current value
+        chan.pThreshadd = ''
+    # Restore VOX config - VOX total delay
     elif cmdType == 5:
-        # Open VOX config file
-        #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-        file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-        # Copy the rest (no restore) data
-        dlyAinDiv = 'DELAYAINDIV:'
-        dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-        file.write(dlyAinDiv)
-
-        dlyValAdd = 'DELAYVALADD:'
-        dlyValAdd = dlyValAdd + delayvaladd + '\n'
-        file.write(dlyValAdd)
-
-        thrMultp = 'THRESHMULTP:'
-        thrMultp = thrMultp + threshmultp + '\n'
-        file.write(thrMultp)
-
-        thrAdd = 'THRESHADD:'
-        thrAdd = thrAdd + threshadd + '\n'
-        file.write(thrAdd)
-
-        # Update config data
-        vCnfg[0]['delayvalue'] = pDelayvalue
-        delayvalue = pDelayvalue # Restore back current value
-        
-        # Restore new text file with a previous data
-        dlyVal = 'DELAYVALUE:'
-        dlyVal = dlyVal + pDelayvalue + '\n'
-        file.write(dlyVal)
-
-        # Copy the rest (no restore) data....continues
-        thrVal = 'THRESHOLDVALUE:'
-        thrVal = thrVal + thresholdvalue + '\n'
-        file.write(thrVal)
-
-        voXmode = 'MODE:'
-        voXmode = voXmode + voxMode + '\n'
-        file.write(voXmode)
-
-        # Close the file
-        file.close()
+        # Restore config data
+        chan.voxParamData['delayvalue'] = chan.pDelayvalue
+        chan.delayvalue = chan.pDelayvalue # Restore back current value
     # Restore VOX config - VOX total threshold
     elif cmdType == 6:
-        # Open VOX config file
-        #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-        file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-        # Copy the rest (no restore) data
-        dlyAinDiv = 'DELAYAINDIV:'
-        dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-        file.write(dlyAinDiv)
-
-        dlyValAdd = 'DELAYVALADD:'
-        dlyValAdd = dlyValAdd + delayvaladd + '\n'
-        file.write(dlyValAdd)
-
-        thrMultp = 'THRESHMULTP:'
-        thrMultp = thrMultp + threshmultp + '\n'
-        file.write(thrMultp)
-
-        thrAdd = 'THRESHADD:'
-        thrAdd = thrAdd + threshadd + '\n'
-        file.write(thrAdd)
-
-        dlyVal = 'DELAYVALUE:'
-        dlyVal = dlyVal + delayvalue + '\n'
-        file.write(dlyVal)
-
         # Restore config data
-        vCnfg[0]['thresholdvalue'] = pThresvalue
-        thresholdvalue = pThresvalue # Restore back current value
-
-        # Restore new text file with a previous data
-        thrVal = 'THRESHOLDVALUE:'
-        thrVal = thrVal + pThresvalue + '\n'
-        file.write(thrVal)
-        
-        # Copy the rest (no update) data....continues
-        voXmode = 'MODE:'
-        voXmode = voXmode + voxMode + '\n'
-        file.write(voXmode)
-
-        # Close the file
-        file.close()
+        chan.voxParamData['thresholdvalue'] = chan.pThresvalue
+        chan.thresholdvalue = chan.pThresvalue # Restore back current value
     # Restore VOX config - VOX controller current mode
     elif cmdType == 7:
-        # Open VOX config file
-        #file = open("/etc/conf.d/sipHFradio/voxHFradioCnfg.conf", "w")
-        file = open("/etc/conf.d/sipradio/voxradioCnfg.conf", "w")
-
-        # Copy the rest (no restore) data
-        dlyAinDiv = 'DELAYAINDIV:'
-        dlyAinDiv = dlyAinDiv + delayaindiv + '\n'
-        file.write(dlyAinDiv)
-
-        dlyValAdd = 'DELAYVALADD:'
-        dlyValAdd = dlyValAdd + delayvaladd + '\n'
-        file.write(dlyValAdd)
-
-        thrMultp = 'THRESHMULTP:'
-        thrMultp = thrMultp + threshmultp + '\n'
-        file.write(thrMultp)
-
-        thrAdd = 'THRESHADD:'
-        thrAdd = thrAdd + threshadd + '\n'
-        file.write(thrAdd)
-
-        dlyVal = 'DELAYVALUE:'
-        dlyVal = dlyVal + delayvalue + '\n'
-        file.write(dlyVal)
-
-        thrVal = 'THRESHOLDVALUE:'
-        thrVal = thrVal + thresholdvalue + '\n'
-        file.write(thrVal)
-
         # Restore config data
-        voxMode = pVoxMode # Restore back current value
-        if pVoxMode == '1':
-            vCnfg[0]['mode'] = 'Mode 1'
+        chan.voxMode = chan.pVoxMode # Restore back current value
+        if chan.pVoxMode == '1':
+            chan.voxParamData['mode'] = 'Mode 1'
         else:
-            vCnfg[0]['mode'] = 'Mode 2'
+            chan.voxParamData['mode'] = 'Mode 2'
             
         # Update RIC daemon status REST API data
-        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-        ric[0]['voxmode'] = vCnfg[0]['mode']
-            
-        # Create new text file for a new data
-        voXmode = 'MODE:'
-        voXmode = voXmode + pVoxMode + '\n'
-        file.write(voXmode)
+        chan.daemonStat['voxmode'] = chan.voxParamData['mode']
 
-        # Close the file
-        file.close()        
+    # Write back VOX config file with the restored data
+    markConfigDirty(chan.voxGroup)
             
-# Thread for serial communication with VOX controller
-def serial_vox_comm (threadname, delay):
-    global delayaindiv
-    global delayvaladd
-    global threshmultp
-    global threshadd
-    global delayvalue
-    global thresholdvalue
-    global voxMode
-    global sendCmdType 
-    global commBusy
-    
-    retryDatToSend = ''
-    sendAtmptCnt = 0
-    sendAliveCnt = 0
-    txOneSec = 0
-    cmdSent = False
-    
-    # Serial communication port for VOX controller configuration
-    serPort = "/dev/serial0"    # VOX controller detected serial port
-    serPortBRate = 9600         # Serial communication baudrate
+# VOX config command - Command type : (VOX mode, command, parameter, valid parameter length, parameter width)
+# Parameter are padded with '0' up to the parameter width. Command type 7 (VOX controller current mode) are sent
+# as the mode main parameter, Mode 1 - type 1 and Mode 2 - type 5
+voxCmdTable = {
+    1 : ('1', '0101', 'delayaindiv', (1,), 2),        # PTT delay analog input delay division factor - Default 5, range 1 to 5
+    2 : ('1', '0102', 'delayvaladd', (1, 2), 2),      # VOX PTT delay addition factor - Default 2, range 2 to 99
+    3 : ('1', '0103', 'threshmultp', (3,), 3),        # VOX threshold analog input multiplication factor - Default 0.8
+    4 : ('1', '0104', 'threshadd', (1, 2), 2),        # VOX threshold analog input addition factor - Default 70, range 1 to 99
+    5 : ('2', '0201', 'delayvalue', (1, 2, 3), 3),    # VOX total delay - Default 95, range 2 to 999
+    6 : ('2', '0202', 'thresholdvalue', (1, 2, 3), 3) # VOX total threshold - Default 267, range 70 to 999
+}
+
+# Build VOX config command for a command type - Return None when the parameter are not valid for the current
+# VOX controller mode or the parameter length are invalid
+def voxCommand(chan, cmdType):
+    # VOX controller current mode
+    if cmdType == 7:
+        if chan.voxMode == '1':
+            cmdType = 1
+        elif chan.voxMode == '2':
+            cmdType = 5
+        else:
+            logger.info("DEBUG_VOX: Invalid data length for VOX Mode!")
+            return None
+    # Setting parameter with a wrong mode, update VOX configuration data to previous value
+    elif chan.voxMode != voxCmdTable[cmdType][0]:
+        revertVOXdata(chan, cmdType)
+        logger.info("DEBUG_VOX: Setting parameter with a wrong MODE")
+        return None
+
+    voxMode, cmdCode, field, validLen, width = voxCmdTable[cmdType]
+    command = voxFrame(cmdType, getattr(chan, field))
+    if command is None:
+        logger.info("DEBUG_VOX: Invalid data length for Mode %s and data type [%s]!" % (voxMode, cmdCode[2:]))
+    return command
+
+# Build VOX config command frame for a parameter value - Return None when the parameter length are invalid
+def voxFrame(cmdType, value):
+    voxMode, cmdCode, field, validLen, width = voxCmdTable[cmdType]
+    if len(value) not in validLen:
+        return None
+    return '<' + cmdCode + value.zfill(width) + '>'
+
+# VOX profile - Command type for the whole parameter set of each VOX mode, the first command also set the mode
+voxProfileTypes = {
+    '1' : (1, 2, 3, 4),
+    '2' : (5, 6)
+}
+
+# VOX profile transaction - Whole parameter set of a VOX mode, applied by the serial writer
+# Restore transaction - Pre-transaction value sent back after a rollback, the command are given by the rollback
+class voxTransaction:
+    def __init__(self, mode, params, commands=None):
+        self.mode = mode
+        self.params = params       # VOX parameter -> value
+        if commands is None:
+            commands = [ (cmdType, voxFrame(cmdType, params[voxCnfgKeys[cmdType - 1]])) for cmdType in voxProfileTypes[mode] ]
+        self.commands = commands
+        self.restore = False       # Restore transaction of a rolled back transaction
+        self.ackedSnapshot = {}    # Command acknowledged by VOX controller when the transaction started
+        self.acked = 0             # Command acknowledged, ACK are received in the command order
+        self.sendTime = 0.0
+        self.rtt = 0.0
+        self.status = ''           # 'APPLIED', 'ROLLBACK' or 'TIMEOUT'
+        self.abandoned = False     # Caller stop waiting, transaction are dropped or rolled back instead of applied
+        self.done = threading.Event()
+
+# Apply a VOX profile - Transaction are queued to the serial writer, wait until applied or rolled back
+# Caller stop waiting after the round trip budget (+1 s), the serial writer then never apply the transaction.
+# Transaction status are decided under the VOX lock, so the caller never get TIMEOUT for an applied profile
+def voxApplyProfile(chan, mode, params):
+    txn = voxTransaction(mode, params)
+    chan.voxTxQueue.put(('TXN', txn))
+    if txn.done.wait(voxTxnBudget + 1.0) == False:
+        with chan.voxLock:
+            if txn.status == '':
+                txn.abandoned = True
+                txn.status = 'TIMEOUT'
+        # Serial writer already applying or rolling back the transaction
+        if txn.abandoned == False:
+            txn.done.wait()
+    return txn
+
+# VOX profile transaction final status - Return False when the caller already stop waiting (TIMEOUT)
+def voxTxnFinish(chan, txn, status):
+    with chan.voxLock:
+        if txn.abandoned == True:
+            return False
+        txn.status = status
+        return True
+
+# VOX profile transaction all ACK received - Commit the parameter and write VOX config file once
+# Transaction abandoned by the caller are rolled back instead, return the restore transaction of the rollback
+def voxTxnCommit(chan, txn):
+    if voxTxnFinish(chan, txn, 'APPLIED') == False:
+        return voxTxnRollback(chan, txn, 'ABANDONED')
+
+    # Pre-transaction value restored, nothing to commit
+    if txn.restore == True:
+        txn.done.set()
+        logEvent('VOX', 'PROFILE RESTORED', {'channel' : chan.chanId, 'commands' : len(txn.commands)})
+        return None
+
+    for field in txn.params:
+        setattr(chan, field, txn.params[field])
+    chan.voxMode = txn.mode
+
+    voxUpdate = dict(txn.params)
+    voxUpdate['mode'] = 'Mode ' + txn.mode
+    chan.voxParamData.update(voxUpdate)
 
-    # Open serial communication port with VOX controller
-    voxSerComm = serial.Serial(serPort, serPortBRate)
-    voxSerComm.flushInput()
+    # Update RIC daemon status REST API data
+    chan.daemonStat['voxmode'] = voxUpdate['mode']
+
+    # Write VOX config file
+    markConfigDirty(chan.voxGroup)
+
+    txn.done.set()
+    logEvent('VOX', 'PROFILE APPLIED', {'channel' : chan.chanId, 'mode' : txn.mode, 'commands' : len(txn.commands)})
+    return None
+
+# VOX profile transaction failed - Parameter are not changed. Command without ACK may still be applied by VOX
+# controller (late ACK), so every changed parameter of the transaction are sent back with its pre-transaction value
+# in reverse order, then the current VOX mode main parameter if the VOX mode were changed. Acknowledged command are
+# restored from the transaction start, return the restore transaction sent before any other command
+def voxTxnRollback(chan, txn, reason):
+    chan.voxStat['rollbacks'] += 1
+    voxTxnFinish(chan, txn, 'ROLLBACK')
+    txn.done.set()
+    logEvent('VOX', 'PROFILE ROLLBACK', {'channel' : chan.chanId, 'mode' : txn.mode, 'reason' : reason, 'acked' : txn.acked},
+             logging.WARNING)
+
+    # Restore transaction failed - VOX controller parameter are unknown, sent again by the next config command
+    if txn.restore == True:
+        for cmdType, command in txn.commands:
+            chan.voxAcked.pop(command[1:5], None)
+        return None
+
+    commands = []
+    for cmdType, command in reversed(txn.commands):
+        restoreCmd = voxFrame(cmdType, getattr(chan, voxCnfgKeys[cmdType - 1]))
+        if restoreCmd is not None and restoreCmd != command:
+            commands.append((cmdType, restoreCmd))
+    if txn.mode != chan.voxMode:
+        restoreCmd = voxCommand(chan, 7)
+        if restoreCmd is not None:
+            commands.append((7, restoreCmd))
+
+    # Restored command are known again once ACK received
+    chan.voxAcked.clear()
+    chan.voxAcked.update(txn.ackedSnapshot)
+    for cmdType, command in commands:
+        chan.voxAcked.pop(command[1:5], None)
+
+    if len(commands) == 0:
+        return None
+    restore = voxTransaction(chan.voxMode, {}, commands)
+    restore.restore = True
+    return restore
+
+# Command acknowledged by VOX controller - Parameter of the other mode are not valid anymore
+def voxAckedUpdate(chan, command):
+    cmdCode = command[1:5]
+    for ackCode in list(chan.voxAcked):
+        if ackCode[:2] != cmdCode[:2]:
+            del chan.voxAcked[ackCode]
+    chan.voxAcked[cmdCode] = command
+
+# VOX parameter and its backup value for each command type - Backup are restored if configuring VOX controller failed
+voxBackupAttr = {
+    1 : ('delayaindiv', 'pDelayaindiv'),
+    2 : ('delayvaladd', 'pDelayvaladd'),
+    3 : ('threshmultp', 'pThreshmultp'),
+    4 : ('threshadd', 'pThreshadd'),
+    5 : ('delayvalue', 'pDelayvalue'),
+    6 : ('thresholdvalue', 'pThresvalue'),
+    7 : ('voxMode', 'pVoxMode')
+}
+
+# Copy previous value as a backup if configuring VOX controller failed - Called before the parameter updated
+# A queued or in progress parameter keep its backup, backup are moved to the acknowledged value once ACK received
+def voxBackup(chan, cmdType):
+    field, backup = voxBackupAttr[cmdType]
+    with chan.voxLock:
+        if cmdType not in chan.voxPending and chan.sendCmdType != cmdType:
+            setattr(chan, backup, getattr(chan, field))
+
+# Send a VOX config command - Command are queued to the VOX controller serial writer
+# VOX controller only accept one configuration command at a time, communication stay busy until the queue empty.
+# A parameter already queued are not queued again, the latest value are read when the command sent
+def voxSend(chan, cmdType):
+    with chan.voxLock:
+        queued = cmdType in chan.voxPending
+        chan.voxPending[cmdType] = True
+        chan.commBusy = True
+
+    if queued == True:
+        chan.voxStat['coalesced'] += 1
+    else:
+        chan.voxTxQueue.put(('CMD', cmdType))
+
+# VOX config command state - Queued and in progress VOX parameter
+def voxCmdState(chan):
+    with chan.voxLock:
+        return {
+            'pending' : [ voxCnfgKeys[cmdType - 1] for cmdType in chan.voxPending ],
+            'inflight' : voxCnfgKeys[chan.sendCmdType - 1] if chan.sendCmdType > 0 else ''
+        }
 
-    # ACK command data from VOX controller
-    ackCommand = '<06>\n'
+# VOX config command statistics for each channel - Command count, resend count and round trip time (ms)
+def voxStats():
+    stats = {}
+    for chanId in channels:
+        chan = channels[chanId]
+        rtt = sorted(chan.voxRtt)
+        stats[chanId] = dict(chan.voxStat)
+        stats[chanId].update(voxCmdState(chan))
+        stats[chanId]['rx'] = dict(chan.voxParser.stat)
+        stats[chanId]['rttp50'] = round(rtt[len(rtt) // 2] * 1e3, 3) if len(rtt) > 0 else 0.0
+        stats[chanId]['rttp99'] = round(rtt[int(len(rtt) * 0.99)] * 1e3, 3) if len(rtt) > 0 else 0.0
+        with chan.voxLock:
+            stats[chanId]['rtthist'] = dict((cmdCode, list(hist)) for cmdCode, hist in chan.voxRttHist.items())
+        stats[chanId]['rttbuckets'] = list(voxRttBuckets)
+        stats[chanId]['voxstatus'] = chan.daemonStat['voxstatus']
+        stats[chanId]['lastrx'] = round(time.time() - chan.voxLastRx, 1) if chan.voxLastRx > 0 else -1
+    return stats
+
+# VOX controller metric - Read from each channel VOX controller statistics
+def voxMetric(statKey):
+    return dict(((chanId, ), channels[chanId].voxStat[statKey]) for chanId in channels)
+
+# VOX command round trip time histogram - Bucket are in s, command code are '0101' - '0202', '03' or 'profile'
+def voxRttMetric():
+    values = {}
+    for chanId in channels:
+        chan = channels[chanId]
+        with chan.voxLock:
+            for cmdCode in chan.voxRttHist:
+                values[(chanId, cmdCode)] = chan.voxRttHist[cmdCode] + [chan.voxRttSum.get(cmdCode, 0.0)]
+    return values
+
+metricCallback('sipradio_vox_commands_total', 'VOX config command sent', 'counter',
+               functools.partial(voxMetric, 'commands'), ('channel', ))
+metricCallback('sipradio_vox_retries_total', 'VOX config command resent', 'counter',
+               functools.partial(voxMetric, 'retries'), ('channel', ))
+metricCallback('sipradio_vox_timeouts_total', 'VOX config command NOT acknowledged after the last resend', 'counter',
+               functools.partial(voxMetric, 'timeouts'), ('channel', ))
+metricCallback('sipradio_vox_rtt_seconds', 'VOX command round trip time', 'histogram', voxRttMetric,
+               ('channel', 'command'), tuple([ bucket / 1000.0 for bucket in voxRttBuckets ]))
+
+# Record VOX command round trip time - Command code are '0101' - '0202', '03' (ALIVE) or 'profile'
+# The last histogram count are round trip time above the last bucket
+def voxRttRecord(chan, cmdCode, rtt):
+    chan.voxRtt.append(rtt)
+    with chan.voxLock:
+        hist = chan.voxRttHist.setdefault(cmdCode, [0] * (len(voxRttBuckets) + 1))
+        hist[bisect.bisect_left(voxRttBuckets, rtt * 1e3)] += 1
+        chan.voxRttSum[cmdCode] = chan.voxRttSum.get(cmdCode, 0.0) + rtt
+
+# Thread for serial data receive from VOX controller
+# Block on the serial port until data arrive or read time out, each received frame are passed to the serial writer
+# Serial link lost (USB serial unplugged or VOX controller restarted) or serial port NOT available at start, serial
+# port are reopened until available. Serial port are shared with the serial writer, written only when open
+def serial_vox_reader (threadname, chan, voxSerComm):
     while True:
-        time.sleep(delay)
-        # 0.5s elapsed
-        if (txOneSec == 0):
-            txOneSec = 1
-        # 1s elapsed
-        else:
-            # NOT received any ACK command from VOX controller, resend the command
-            if cmdSent == True:
+        if voxSerComm.isOpen() == False:
+            while voxSerComm.isOpen() == False:
+                time.sleep(voxReopenIntv)
                 try:
-                    # Send command to VOX controller
-                    voxSerComm.write(retryDatToSend.encode())
-                    
-                    logger.info("DEBUG_VOX: RETRY SEND CMD: %s" % (retryDatToSend))
-                except:
-                    sendAtmptCnt += 1 # Increment send command attempt counter
-                    # Reach 5 attempt, no need to send the command, update VOX configuration data to previous value
-                    # Reset necessary variable
-                    if sendAtmptCnt == 5:
-                        retryDatToSend = ''
-                        sendAtmptCnt = 0
-                        cmdSent = False
-
-                        # Update VOX configuration data to previous value
-                        revertVOXdata(sendCmdType)
-
-                        sendCmdType = 0
-                        commBusy = False
-                        
-                    logger.info("DEBUG_VOX: ERROR during sending command!")
-            else: 
-                sendAliveCnt += 1 # Increment counter before request current VOX controller status 
-                # Every 1 minute send VOX controller status request command
-                if sendAliveCnt == 60:
-                    try:
-                        command = '<03>'
-                        # Send command to VOX controller
-                        voxSerComm.write(command.encode())
+                    voxSerComm.open()
+                    voxSerComm.flushInput()
+                except Exception:
+                    voxSerComm.close()
+            logEvent('VOX', 'SERIAL REOPENED', {'channel' : chan.chanId, 'port' : chan.serPort})
+
+        try:
+            rxData = voxSerComm.read(1)
+            if len(rxData) == 0:
+                continue
+            rxWaiting = voxSerComm.inWaiting()
+            if rxWaiting > 0:
+                rxData += voxSerComm.read(rxWaiting)
+        except Exception as error:
+            logEvent('VOX', 'SERIAL LOST', {'channel' : chan.chanId, 'port' : chan.serPort, 'error' : str(error)},
+                     logging.WARNING)
+            chan.voxStat['linkdown'] += 1
+            voxSerComm.close()
+            continue
+        rxTime = time.time()
+
+        for kind, payload in chan.voxParser.feed(rxData):
+            chan.voxTxQueue.put(('RX', kind, payload, rxTime))
+
+# Thread for serial communication with VOX controller - Serial writer
+# Config command are sent from the queue one at a time, next command are sent once the ACK received
+def serial_vox_comm (threadname, chan):
+    retryDatToSend = ''     # Config command waiting for ACK
+    sentValue = ''          # Parameter value of the config command waiting for ACK
+    sendAtmptCnt = 0
+    sendTime = 0.0
+    cmdSeq = 0
+    retryTimer = None
+    txn = None              # VOX profile transaction in progress
+    txnSeq = 0
+    txnTimer = None
+    txnWaiting = collections.deque()
+    aliveWait = False       # ALIVE request sent, waiting for any frame from VOX controller
+    aliveMiss = 0           # ALIVE request NOT answered in a row
+    aliveTime = 0.0
+    inflight = collections.deque()  # Frame sent and waiting for ACK or NAK, (command code, reply deadline)
+
+    # Open serial communication port with VOX controller - Serial port missing or busy are reopened by the serial reader
+    voxSerComm = serial.Serial(None, voxBaudRate, timeout=voxReadTmo)
+    voxSerComm.port = chan.serPort
+    try:
+        voxSerComm.open()
+        voxSerComm.flushInput()
+    except Exception as error:
+        logEvent('VOX', 'SERIAL OPEN FAILED', {'channel' : chan.chanId, 'port' : chan.serPort, 'error' : str(error)},
+                 logging.WARNING)
+        chan.voxStat['linkdown'] += 1
+        voxSerComm.close()
+
+    # Create thread for serial data receive from VOX controller
+    try:
+        thread.start_new_thread(serial_vox_reader, ("[serial_vox_reader_%s]" % (chan.chanId), chan, voxSerComm ))
+    except:
+        logger.info("Error: Unable to start [serial_vox_reader_%s] thread" % (chan.chanId))
+
+    # First VOX controller status request shortly after start, then every 1 minute
+    daemonTimer.arm(1.0, chan.voxTxQueue.put, ('ALIVE', ))
+
+    while True:
+        work = chan.voxTxQueue.get()
+
+        # Config command queued, sent below once there is no command in progress
+        if work[0] == 'CMD':
+            pass
+
+        # VOX profile transaction, started below once there is no command in progress
+        elif work[0] == 'TXN':
+            txnWaiting.append(work[1])
+
+        # VOX profile transaction NOT received all ACK within the round trip budget
+        elif work[0] == 'TXN_TMO':
+            if txn is not None and work[1] == txnSeq:
+                chan.voxStat['timeouts'] += 1
+                restore = voxTxnRollback(chan, txn, 'TIME OUT')
+                if restore is not None:
+                    txnWaiting.appendleft(restore)
+                txn = None
+
+        # Received data from VOX controller
+        elif work[0] == 'RX':
+            rxKind = work[1]
+            rxData = '<' + work[2] + '>'
+
+            # Any frame from VOX controller prove the controller are alive
+            chan.voxLastRx = work[3]
+            aliveWait = False
+            aliveMiss = 0
+            if chan.daemonStat['voxstatus'] != 'ALIVE':
+                # Update RIC daemon status REST API data
+                chan.daemonStat['voxstatus'] = 'ALIVE'
+                logger.info("DEBUG_VOX: VOX controller ALIVE")
+
+            # ACK and NAK do NOT carry the command code - VOX controller answer in order, so the reply are matched
+            # to the oldest frame waiting for a reply. Frame NOT answered before its reply deadline are lost.
+            # Reply matched to a command no longer waiting (late ACK of a resent or rolled back command) are ignored
+            rxCode = ''
+            if rxKind == 'ACK' or rxKind == 'NAK':
+                while len(inflight) > 0 and inflight[0][1] < work[3]:
+                    inflight.popleft()
+                if len(inflight) > 0:
+                    rxCode = inflight.popleft()[0]
+            txnCode = txn.commands[txn.acked][1][1:5] if txn is not None else ''
 
-                        logger.info("DEBUG_VOX: SEND ALIVE CMD: %s" % (command))
-                    except:
-                        sendAliveCnt = 0
-                        logger.info("DEBUG_VOX: ERROR during sending ALIVE request!")
-                    sendAliveCnt = 0
-            txOneSec = 0
-            
-        # Check for data availability
-        if voxSerComm.inWaiting() > 0:
-            rxData = voxSerComm.readline()
             # Received ACK from VOX controller
-            if rxData == ackCommand:
-                if commBusy == True:
-                    commBusy = False
-                    cmdSent = False
-                    sendCmdType = 0
+            if rxKind == 'ACK':
+                # VOX profile transaction - ACK are matched to the pipelined command in order
+                if txnCode != '' and rxCode == txnCode:
+                    voxAckedUpdate(chan, txn.commands[txn.acked][1])
+                    txn.acked += 1
+                    if txn.acked == len(txn.commands):
+                        daemonTimer.cancel(txnTimer)
+                        txn.rtt = work[3] - txn.sendTime
+                        if txn.restore == False:
+                            voxRttRecord(chan, 'profile', txn.rtt)
+                        restore = voxTxnCommit(chan, txn)
+                        if restore is not None:
+                            txnWaiting.appendleft(restore)
+                        txn = None
+                elif retryDatToSend != '' and rxCode == retryDatToSend[1:5]:
+                    # Round trip time of a resent command are ambiguous, only the first send are recorded
+                    if sendAtmptCnt == 0:
+                        voxRttRecord(chan, retryDatToSend[1:5], work[3] - sendTime)
+                    daemonTimer.cancel(retryTimer)
+
+                    # VOX controller parameter are now known
+                    voxAckedUpdate(chan, retryDatToSend)
+
+                    # Same parameter queued again, its backup are now the acknowledged value
+                    with chan.voxLock:
+                        if chan.sendCmdType in chan.voxPending:
+                            field, backup = voxBackupAttr[chan.sendCmdType]
+                            setattr(chan, backup, sentValue)
+                        chan.sendCmdType = 0
+                    retryDatToSend = ''
 
                     # Print serial data receive from VOX controller
                     logger.info("DEBUG_VOX: RECEIVE ACK FOR CONFIG. CMD: %s" % (rxData))
-                else:
-                    # Update RIC daemon status REST API data
-                    ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                    ric[0]['voxstatus'] = 'ALIVE'
-        
-                    sendAliveCnt = 0
+                elif rxCode == '03':
+                    if aliveTime > 0.0:
+                        voxRttRecord(chan, '03', work[3] - aliveTime)
+                        aliveTime = 0.0
                     # Print serial data receive from VOX controller
                     logger.info("DEBUG_VOX: RECEIVE ACK FOR ALIVE: %s" % (rxData))
-                
-        # Check for any command to send 
+                else:
+                    chan.voxStat['strayreplies'] += 1
+                    logger.info("DEBUG_VOX: RECEIVE ACK NOT MATCHING ANY COMMAND: %s" % (rxData))
+
+            # VOX controller reject the config command, resend the command now
+            elif rxKind == 'NAK':
+                if txnCode != '' and rxCode == txnCode:
+                    logger.info("DEBUG_VOX: RECEIVE NAK FOR PROFILE. CMD: %s" % (txn.commands[txn.acked][1]))
+                    daemonTimer.cancel(txnTimer)
+                    restore = voxTxnRollback(chan, txn, 'NAK')
+                    if restore is not None:
+                        txnWaiting.appendleft(restore)
+                    txn = None
+                elif retryDatToSend != '' and rxCode == retryDatToSend[1:5]:
+                    logger.info("DEBUG_VOX: RECEIVE NAK FOR CONFIG. CMD: %s" % (retryDatToSend))
+                    daemonTimer.cancel(retryTimer)
+                    chan.voxTxQueue.put(('RETRY', cmdSeq))
+                else:
+                    chan.voxStat['strayreplies'] += 1
+                    logger.info("DEBUG_VOX: RECEIVE NAK NOT MATCHING ANY COMMAND: %s" % (rxData))
+
+            # VOX controller status
+            elif rxKind == 'STATUS':
+                logger.info("DEBUG_VOX: RECEIVE STATUS: %s" % (rxData))
+            else:
+                logger.info("DEBUG_VOX: RECEIVE UNKNOWN FRAME: %s" % (rxData))
+
+        # NOT received any ACK command from VOX controller, resend the command
+        elif work[0] == 'RETRY':
+            if work[1] == cmdSeq and retryDatToSend != '':
+                sendAtmptCnt += 1 # Increment send command attempt counter
+
+                # Reach the resend limit, no need to send the command, update VOX configuration data to previous value
+                # Reset necessary variable
+                if sendAtmptCnt > voxRetryMax:
+                    chan.voxStat['timeouts'] += 1
+                    logger.info("DEBUG_VOX: NO ACK after %d resend, CMD: %s" % (voxRetryMax, retryDatToSend))
+
+                    chan.voxAcked.pop(retryDatToSend[1:5], None)
+                    retryDatToSend = ''
+                    revertVOXdata(chan, chan.sendCmdType)
+                    chan.sendCmdType = 0
+                else:
+                    # Resend interval are doubled for each resend
+                    retryIntv = min(voxRetryIntv * 2 ** sendAtmptCnt, voxRetryMaxIntv)
+                    try:
+                        # Send command to VOX controller
+                        sendTime = time.time()
+                        voxSerComm.write(retryDatToSend.encode())
+                        inflight.append((retryDatToSend[1:5], sendTime + retryIntv))
+                        chan.voxStat['retries'] += 1
+
+                        logger.info("DEBUG_VOX: RETRY SEND CMD: %s" % (retryDatToSend))
+                    except:
+                        logger.info("DEBUG_VOX: ERROR during sending command!")
+
+                    retryTimer = daemonTimer.arm(retryIntv, chan.voxTxQueue.put, ('RETRY', cmdSeq))
+
+        # Request current VOX controller status, only when there is no config command in progress
+        elif work[0] == 'ALIVE':
+            # Previous ALIVE request NOT answered, VOX controller OFFLINE after several request in a row
+            if aliveWait == True:
+                aliveMiss += 1
+                chan.voxStat['missedalive'] += 1
+                if aliveMiss >= voxAliveMiss and chan.daemonStat['voxstatus'] != 'OFFLINE':
+                    # Update RIC daemon status REST API data
+                    chan.daemonStat['voxstatus'] = 'OFFLINE'
+                    logger.info("DEBUG_VOX: VOX controller OFFLINE, %d ALIVE request NOT answered" % (aliveMiss))
+
+            # Serial port closed (serial link lost), the ALIVE request are NOT answered
+            if voxSerComm.isOpen() == False:
+                aliveWait = True
+            elif retryDatToSend == '' and txn is None:
+                # ALIVE request failed to send are NOT answered either
+                aliveWait = True
+                try:
+                    command = '<03>'
+                    # Send command to VOX controller
+                    aliveTime = time.time()
+                    voxSerComm.write(command.encode())
+                    inflight.append(('03', aliveTime + voxRetryIntv))
+                    chan.voxStat['heartbeats'] += 1
+
+                    logger.info("DEBUG_VOX: SEND ALIVE CMD: %s" % (command))
+                except:
+                    logger.info("DEBUG_VOX: ERROR during sending ALIVE request!")
+            daemonTimer.arm(voxAliveIntv, chan.voxTxQueue.put, ('ALIVE', ))
+
+        # Start the next VOX profile transaction once there is no command in progress
+        # Whole parameter set are sent at once, ACK are expected within one round trip budget
+        while retryDatToSend == '' and txn is None and len(txnWaiting) > 0:
+            txn = txnWaiting.popleft()
+            if txn.abandoned == True:
+                txn = None
+                continue
+
+            chan.commBusy = True
+            txnSeq += 1
+            if txn.restore == False:
+                chan.voxStat['transactions'] += 1
+                txn.ackedSnapshot = dict(chan.voxAcked)
+            command = ''.join([ txnCmd for cmdType, txnCmd in txn.commands ])
+            try:
+                # Send command to VOX controller
+                txn.sendTime = time.time()
+                voxSerComm.write(command.encode())
+                inflight.extend([ (txnCmd[1:5], txn.sendTime + voxTxnBudget) for cmdType, txnCmd in txn.commands ])
+                logger.info("DEBUG_VOX: SEND PROFILE CMD: %s" % (command))
+            except:
+                logger.info("DEBUG_VOX: ERROR during sending profile!")
+            txnTimer = daemonTimer.arm(voxTxnBudget, chan.voxTxQueue.put, ('TXN_TMO', txnSeq))
+
+        # Send the next queued config command once the previous command ACK received
+        while retryDatToSend == '' and txn is None:
+            with chan.voxLock:
+                if len(chan.voxPending) == 0:
+                    chan.commBusy = False
+                    break
+                cmdType = chan.voxPending.popitem(last=False)[0]
+                chan.sendCmdType = cmdType
+
+            command = voxCommand(chan, cmdType)
+            if command is None:
+                chan.sendCmdType = 0
+                continue
+
+            # VOX controller already have the same parameter value
+            if chan.voxAcked.get(command[1:5]) == command:
+                chan.sendCmdType = 0
+                chan.voxStat['skipped'] += 1
+                logger.info("DEBUG_VOX: Parameter already set, SKIP CMD: %s" % (command))
+                continue
+
+            retryDatToSend = command
+            sentValue = getattr(chan, voxBackupAttr[cmdType][0])
+            sendAtmptCnt = 0
+            cmdSeq += 1
+            chan.voxStat['commands'] += 1
+            try:
+                # Send command to VOX controller
+                sendTime = time.time()
+                voxSerComm.write(command.encode())
+                inflight.append((command[1:5], sendTime + voxRetryIntv))
+                logger.info("DEBUG_VOX: SEND CMD: %s" % (command))
+            except:
+                logger.info("DEBUG_VOX: ERROR during sending command!")
+            retryTimer = daemonTimer.arm(voxRetryIntv, chan.voxTxQueue.put, ('RETRY', cmdSeq))
+
+# RIH VOX controller simulator - Answer VOX controller serial protocol at a pseudo-terminal
+# Config command (<0101xx>..<0202xxx>) and status request (<03>) are answered with ACK (<06>), invalid command
+# with NAK (<15>). The answer can be delayed, lost or follow a garbage byte, and serial link can be disconnected.
+# Daemon serial port are a symlink to the pty, the symlink are re-pointed to a new pty after each disconnect
+class rihSimulator:
+    def __init__(self, linkPath, latency=0.0, loss=0.0, garbage=0.0, disconnect=0.0, seed=None):
+        self.linkPath = linkPath
+        self.latency = latency        # Answer delay (s)
+        self.loss = loss              # Answer lost probability
+        self.garbage = garbage        # Garbage byte before the answer probability
+        self.disconnect = disconnect  # Serial link disconnect after a command probability
+        self.rand = random.Random(seed)
+        self.lock = threading.Lock()  # Guard the pty, delayed answer are dropped after the pty closed
+        self.link = 0                 # Serial link number, increased on each connect and disconnect
+        self.master = None
+        self.downTime = None          # Serial link disconnect requested, disconnect duration (s)
+        self.wake = os.pipe()         # Wake up simulator thread for disconnect request
+        self.voxMode = ''             # Simulated VOX controller mode
+        self.params = {}              # Simulated VOX controller parameter, command code -> value
+        self.stat = {'commands' : 0, 'acks' : 0, 'naks' : 0, 'lost' : 0, 'garbage' : 0, 'disconnects' : 0}
+        self.connect()
+
+    # Create a new pty and point the serial port symlink to it
+    def connect(self):
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        tmpPath = self.linkPath + '.tmp'
+        if os.path.lexists(tmpPath):
+            os.remove(tmpPath)
+        os.symlink(os.ttyname(slave), tmpPath)
+        os.rename(tmpPath, self.linkPath)
+        with self.lock:
+            self.link += 1
+            self.master = master
+        thread.start_new_thread(self.serve, (master, slave, self.link))
+
+    # Disconnect the serial link for the duration (s), then connect again
+    def drop(self, downTime=rihDownTime):
+        self.downTime = downTime
+        os.write(self.wake[1], b'x')
+
+    # Send the answer, unless the serial link are disconnected since
+    def send(self, link, data):
+        with self.lock:
+            if link == self.link:
+                os.write(self.master, data)
+
+    # Answer one received frame
+    def answer(self, payload):
+        self.stat['commands'] += 1
+        reply = b'<15>\n'
+        if payload == '03':
+            reply = voxAckCmd.encode()
         else:
-            if cmdSent == False:
-                # PTT delay analog input delay division factor
-                if sendCmdType == 1:
-                    # Mode 1
-                    if voxMode == '1':
-                        # Check param length - Valid value length are 1 - Default value are 5
-                        # Experimental configuration range - 1 to 5
-                        lengthStr = len(delayaindiv)
-                        # Valid length
-                        if lengthStr == 1:
-                            dataToSend = '0' + delayaindiv
-                            try:
-                                command = '<0101' + dataToSend + '>'
-                                retryDatToSend = command
-                                
-                                # Send command to VOX controller
-                                voxSerComm.write(command.encode())
-                                commBusy = True
-                                cmdSent = True
-
-                                logger.info("DEBUG_VOX: SEND CMD: %s" % (command))
-                            except:
-                                commBusy = True
-                                cmdSent = True
-                                
-                                logger.info("DEBUG_VOX: ERROR during sending command!")
-                        # Invalid length, don't send the command
-                        else:
-                            sendCmdType = 0
-                            logger.info("DEBUG_VOX: Invalid data length for Mode 1 and data type [01]!")
-                    else:
-                        # Update VOX configuration data to previous value
-                        revertVOXdata(sendCmdType)
-                        
-                        sendCmdType = 0
-                        logger.info("DEBUG_VOX: Setting parameter with a wrong MODE")
-                # VOX PTT delay addition factors
-                elif sendCmdType == 2:
-                    # Mode 1
-                    if voxMode == '1':
-                        # Check param length - Valid value length are are 1 or 2 - Default value are 2
-                        # Experimental configuration range - 2 to 99
-                        lengthStr = len(delayvaladd)
-                        if (lengthStr == 1):
-                            dataToSend = '0' + delayvaladd
-                        elif (lengthStr == 2):
-                            dataToSend = delayvaladd
-                        # Valid length are 1 or 2
-                        if lengthStr == 1 or lengthStr == 2:
-                            try:
-                                command = '<0102' + dataToSend + '>'
-                                retryDatToSend = command
-                                
-                                # Send command to VOX controller
-                                voxSerComm.write(command.encode())
-                                commBusy = True
-                                cmdSent = True
-                                                                
-                                logger.info("DEBUG_VOX: SEND CMD: %s" % (command))
-                            except:
-                                commBusy = True
-                                cmdSent = True
-                                
-                                logger.info("DEBUG_VOX: ERROR during sending command!")
-                        # Invalid length
-                        else:
-                            sendCmdType = 0
-                            logger.info("DEBUG_VOX: Invalid data length for Mode 1 and data type [02]!")
-                    else:
-                        # Update VOX configuration data to previous value
-                        revertVOXdata(sendCmdType)
-                        
-                        sendCmdType = 0
-                        logger.info("DEBUG_VOX: Setting parameter with a wrong MODE")            
-                # VOX threshold analog input multiplication factor
-                elif sendCmdType == 3:
-                    # Mode 1
-                    if voxMode == '1':
-                        # Check param length - Valid value length are are 3 (floating point) - Default value are 0.8
-                        # Experimental configuration range - ???
-                        lengthStr = len(threshmultp)
-                        if (lengthStr == 3):
-                            dataToSend = threshmultp
-                            try:
-                                command = '<0103' + dataToSend + '>'
-                                retryDatToSend = command
-                                
-                                # Send command to VOX controller
-                                voxSerComm.write(command.encode())
-                                commBusy = True
-                                cmdSent = True
-
-                                logger.info("DEBUG_VOX: SEND CMD: %s" % (command))
-                            except:
-                                commBusy = True
-                                cmdSent = True
-                                
-                                logger.info("DEBUG_VOX: ERROR during sending command!")
-                        # Invalid length
-                        else:
-                            sendCmdType = 0
-                            logger.info("DEBUG_VOX: Invalid data length for Mode 1 and data type [03]!")
-                    else:
-                        # Update VOX configuration data to previous value
-                        revertVOXdata(sendCmdType)
-                        
-                        sendCmdType = 0
-                        logger.info("DEBUG_VOX: Setting parameter with a wrong MODE")
-                # VOX threshold analog input addition factor
-                elif sendCmdType == 4:
-                    # Mode 1
-                    if voxMode == '1':
-                        # Check param length - Valid value length are 1 or 2 - Default value are 70
-                        # Experimental configuration range - 1 to 99
-                        lengthStr = len(threshadd)
-                        if (lengthStr == 1):
-                            dataToSend = '0' + threshadd
-                        elif (lengthStr == 2):
-                            dataToSend = threshadd
-                        # Valid length are 1 or 2
-                        if lengthStr == 1 or lengthStr == 2:
-                            try:
-                                command = '<0104' + dataToSend + '>'
-                                retryDatToSend = command
-                                
-                                # Send command to VOX controller
-                                voxSerComm.write(command.encode())
-                                commBusy = True
-                                cmdSent = True
-
-                                logger.info("DEBUG_VOX: SEND CMD: %s" % (command))
-                            except:
-                                commBusy = True
-                                cmdSent = True
-                                
-                                logger.info("DEBUG_VOX: ERROR during sending command!")
-                        # Invalid length
-                        else:
-                            sendCmdType = 0
-                            logger.info("DEBUG_VOX: Invalid data length for Mode 1 and data type [04]!")
-                    else:
-                        # Update VOX configuration data to previous value
-                        revertVOXdata(sendCmdType)
-                        
-                        sendCmdType = 0
-                        logger.info("DEBUG_VOX: Setting parameter with a wrong MODE")
-
-                # VOX total delay
-                elif sendCmdType == 5:
-                    # Mode 2
-                    if voxMode == '2':
-                        # Check param length - Valid value length are 1, 2 or 3 - Default value are 95
-                        # Experimental configuration range - 2 to 999
-                        lengthStr = len(delayvalue)
-                        if lengthStr == 1:
-                            dataToSend = '00' + delayvalue
-                        elif lengthStr == 2:
-                            dataToSend = '0' + delayvalue
-                        elif lengthStr == 3:
-                            dataToSend = delayvalue
-                        # Valid length are 1, 2 or 3
-                        if lengthStr == 1 or lengthStr == 2 or lengthStr == 3:
-                            try:
-                                command = '<0201' + dataToSend + '>'
-                                retryDatToSend = command
-                                
-                                # Send command to VOX controller
-                                voxSerComm.write(command.encode())
-                                commBusy = True
-                                cmdSent = True
-
-                                logger.info("DEBUG_VOX: SEND CMD: %s" % (command))
-                            except:
-                                commBusy = True
-                                cmdSent = True
-                                
-                                logger.info("DEBUG_VOX: ERROR during sending command!")
-                        # Invalid length
-                        else:
-                            sendCmdType = 0
-                            logger.info("DEBUG_VOX: Invalid data length for Mode 2 and data type [01]!")    
-                    else:
-                        # Update VOX configuration data to previous value
-                        revertVOXdata(sendCmdType)
-                        
-                        sendCmdType = 0
-                        logger.info("DEBUG_VOX: Setting parameter with a wrong MODE")
-                # VOX total threshold
-                elif sendCmdType == 6:
-                    # Mode 2
-                    if voxMode == '2':
-                        # Check param length - Valid value length are 1, 2 or 3 - Default value are 267
-                        # Experimental configuration range - 70 to 999
-                        lengthStr = len(thresholdvalue)
-                        if lengthStr == 1:
-                            dataToSend = '00' + thresholdvalue
-                        elif lengthStr == 2:
-                            dataToSend = '0' + thresholdvalue
-                        elif lengthStr == 3:
-                            dataToSend = thresholdvalue
-                        # Valid length are 1, 2 or 3
-                        if lengthStr == 1 or lengthStr == 2 or lengthStr == 3:
-                            try:
-                                command = '<0202' + dataToSend + '>'
-                                retryDatToSend = command
-                                
-                                # Send command to VOX controller
-                                voxSerComm.write(command.encode())
-                                commBusy = True
-                                cmdSent = True
-
-                                logger.info("DEBUG_VOX: SEND CMD: %s" % (command))
-                            except:
-                                commBusy = True
-                                cmdSent = True
-                                
-                                logger.info("DEBUG_VOX: ERROR during sending command!")
-                        # Invalid length
-                        else:
-                            sendCmdType = 0
-                            logger.info("DEBUG_VOX: Invalid data length for Mode 2 and data type [02]!")    
-                    else:
-                        # Update VOX configuration data to previous value
-                        revertVOXdata(sendCmdType)
-                        
-                        sendCmdType = 0
-                        logger.info("DEBUG_VOX: Setting parameter with a wrong MODE")
-                # VOX controller current mode
-                elif sendCmdType == 7:
-                    # Check param length - Valid value length are 1 - Default value are 2
-                    lengthStr = len(voxMode)
-                    if lengthStr == 1:
-                        modeToSend = '0' + voxMode
-                        # Mode 1
-                        if modeToSend == '01':
-                            lengthStr = len(delayaindiv)
-                            # Valid length
-                            if lengthStr == 1:
-                                datToSend = '0' + delayaindiv
-                                try:
-                                    command = '<' + modeToSend + '01' + datToSend + '>'
-                                    retryDatToSend = command
-                                    
-                                    # Send command to VOX controller
-                                    voxSerComm.write(command.encode())
-                                    commBusy = True
-                                    cmdSent = True
-
-                                    logger.info("DEBUG_VOX: SEND CMD: %s" % (command))
-                                except:
-                                    commBusy = True
-                                    cmdSent = True
-                                
-                                    logger.info("DEBUG_VOX: ERROR during sending command!")
-                            else:
-                                sendCmdType = 0
-                                logger.info("DEBUG_VOX: Invalid data length for Mode 1 and data type [01]!")    
-                        # Mode 2
-                        elif modeToSend == '02':
-                            # Check param length - Valid value length are 1, 2 or 3 - Default value are 95
-                            # Experimental configuration range - 2 to 999
-                            lengthStr = len(delayvalue)
-                            if lengthStr == 1:
-                                datToSend = '00' + delayvalue
-                            elif lengthStr == 2:
-                                datToSend = '0' + delayvalue
-                            elif lengthStr == 3:
-                                datToSend = delayvalue
-                            # Valid length are 1, 2 or 3
-                            if lengthStr == 1 or lengthStr == 2 or lengthStr == 3:
-                                try:
-                                    command = '<' + modeToSend + '01' + datToSend + '>'
-                                    retryDatToSend = command
-                                    
-                                    # Send command to VOX controller
-                                    voxSerComm.write(command.encode())
-                                    commBusy = True
-                                    cmdSent = True
-
-                                    logger.info("DEBUG_VOX: SEND CMD: %s" % (command))
-                                except:
-                                    commBusy = True
-                                    cmdSent = True
-                                
-                                    logger.info("DEBUG_VOX: ERROR during sending command!")
-                            # Invalid length
-                            else:
-                                sendCmdType = 0
-                                logger.info("DEBUG_VOX: Invalid data length for Mode 2 and data type [01]!")
-                    # Invalid length
-                    else:
-                        sendCmdType = 0
-                        logger.info("DEBUG_VOX: Invalid data length for VOX Mode!")
-                                    
+            for voxMode, cmdCode, field, validLen, width in voxCmdTable.values():
+                value = payload[4:]
+                if payload[:4] == cmdCode and len(value) == width and value.replace('.', '', 1).isdigit():
+                    self.voxMode = voxMode
+                    self.params[cmdCode] = value
+                    reply = voxAckCmd.encode()
+                    break
+        if reply == voxAckCmd.encode():
+            self.stat['acks'] += 1
+        else:
+            self.stat['naks'] += 1
+
+        if self.rand.random() < self.loss:
+            self.stat['lost'] += 1
+            return
+        if self.rand.random() < self.garbage:
+            self.stat['garbage'] += 1
+            noise = bytearray(self.rand.choice(bytearray(b'0123456789AF\x00\xff !')) for n in range(self.rand.randint(1, 8)))
+            reply = bytes(noise) + b'\n' + reply
+        if self.latency > 0:
+            daemonTimer.arm(self.latency, self.send, self.link, reply)
+        else:
+            self.send(self.link, reply)
+
+    # Simulator thread - Receive command frame from the daemon until the serial link disconnected
+    def serve(self, master, slave, link):
+        parser = voxFrameParser()
+        while self.downTime is None:
+            readable = select.select([master, self.wake[0]], [], [])[0]
+            if self.wake[0] in readable:
+                os.read(self.wake[0], 64)
+                continue
+            for kind, payload in parser.feed(os.read(master, 256)):
+                self.answer(payload)
+                if self.rand.random() < self.disconnect:
+                    self.downTime = rihDownTime
+                    break
+
+        # Serial link disconnected - Daemon serial port read fail and the serial port disappear until connect again
+        with self.lock:
+            self.link += 1
+            os.close(master)
+            os.close(slave)
+        if os.path.lexists(self.linkPath):
+            os.remove(self.linkPath)
+        self.stat['disconnects'] += 1
+        daemonTimer.arm(self.downTime, self.connect)
+        self.downTime = None
+
+# Thread for config file write-behind
+# Each updated config group are written once after the coalescing window elapsed
+def config_write_behind (threadname, delay):
+    while True:
+        with cnfgCond:
+            # Wait for config update
+            while len(cnfgDirty) == 0:
+                cnfgCond.wait()
+
+            # Wait until the coalescing window of the oldest update elapsed
+            currTime = time.time()
+            groups = [ group for group in cnfgDirty if (cnfgDirty[group] + delay <= currTime) ]
+            if len(groups) == 0:
+                cnfgCond.wait(min(cnfgDirty.values()) + delay - currTime)
+                continue
+            for group in groups:
+                del cnfgDirty[group]
+
+        # Write config file outside the lock, REST API can keep updating config data
+        for group in groups:
+            writeConfigGroup(group)
+
+# Thread for config file hot reload
+# Config file edited outside the daemon are applied without restarting the daemon
+def config_file_watcher (threadname, delay):
+    groupFile = {}
+    for group in cnfgReload:
+        groupFile[os.path.basename(cnfgGroups[group][0])] = group
+
+    try:
+        fd = inotifyWatch(cnfgDir)
+    except (OSError, AttributeError):
+        fd = None
+        logger.info("DEBUG_CNFG: inotify NOT available, check config file every %s s" % (delay))
+
+    while True:
+        # Block until config directory are updated
+        if fd is not None:
+            groups = set()
+            for name in inotifyNames(os.read(fd, 4096)):
+                if name in groupFile:
+                    groups.add(groupFile[name])
+        # Fall back to check config file stamp periodically
+        else:
+            time.sleep(delay)
+            groups = cnfgReload.keys()
+
+        for group in groups:
+            reloadConfigGroup(group)
+
+# Create production web server - Bounded worker thread pool with HTTP keep-alive
+def createProdServer(host, port, secure):
+    server = cherootWsgi.Server((host, port), app, numthreads=restWorkers, max=restWorkers,
+                                accepted_queue_size=restQueueSize, timeout=restKeepAlive)
+    # Secure web server (HTTPS)
+    if secure == True:
+        server.ssl_adapter = BuiltinSSLAdapter(sslCertFile, sslKeyFile)
+    return server
+
 # Thread for RESTFul API web server
 def restful_web_server (threadname):
     logger.info("DEBUG_REST_API: RestFul API web server STARTED")
     if __name__ == "__main__":
+        # RUN production web server, Flask web server are only for development
+        if macProdServer == True:
+            if cherootWsgi is not None:
+                logger.info("DEBUG_REST_API: Production web server, %s worker thread" % (restWorkers))
+                server = createProdServer('0.0.0.0', restPort, macSecInSec)
+                server.start()
+                return
+            logger.info("DEBUG_REST_API: cheroot NOT installed, use Flask web server")
+
         # RUN RestFul API web server
         # Add a certificate to make sure REST web API can support HTTPS request
         # Generate first cert.pem (new certificate) and key.pem (new key) by initiate below command:
@@ -3180,209 +4324,1133 @@ def restful_web_server (threadname):
         if macSecInSec == True:
             #app.run(host='0.0.0.0', ssl_context=('cert.pem', 'key.pem'))
             #app.run(host='0.0.0.0', ssl_context=('asterisk.pem', 'ca.key'))
-            app.run(host='0.0.0.0', port=5000, ssl_context=('asterisk.pem', 'ca.key'))
+            app.run(host='0.0.0.0', port=restPort, ssl_context=(sslCertFile, sslKeyFile))
         # Insecure web server (HTTP) - Default port 5000
         else:
             app.run(host='0.0.0.0')
 
-# Thread for monitor daemon activities
-def monitor_this_daemon(threadname, delay):
-    global wdog
-    global pttIsON
-    global pttRx    
-    global pttTOcnt
-    global pttCnt
-    global pttTimeOut
-    global pttModeOper
-    global dtmfRx
-    global dtmfSmplCnt
-    global ledBlnkCnt
-    global ledEn
-    global DTMFMETHOD
-    global icomEnaDis
-    global joinIcomCnt
-    global strtJoinIcom
-    global strtTmrJoin
-    
+# Stream web server client connection
+class streamClient:
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.inBuf = b''         # Received data not processed yet
+        self.outBuf = b''        # Data waiting to be sent
+        self.handshake = False   # SSL handshake still in progress
+        self.sslWant = ''        # SSL handshake, read or write wait for the socket - 'read' readable, 'write' writable
+        self.kind = None         # Client type after request received - 'sse' status stream, 'ws' WebSocket PTT control
+        self.lastSeq = 0         # Last status event sequence sent to client
+        self.closing = False     # Close connection once all data are sent
+        self.pttHold = False     # WebSocket PTT control client currently hold the PTT
+        self.chan = None         # WebSocket PTT control radio channel
+
+    def fileno(self):
+        return self.sock.fileno()
+
+# Format server sent event
+def sseEvent(eventName, seq, eventData):
+    return ('id: %s-%d\nevent: %s\ndata: %s\n\n' % (bootId, seq, eventName, json.dumps(eventData))).encode()
+
+# Handle status stream request, send current daemon status or resume from Last-Event-ID
+def startStatusStream(client, headers, query):
+    lastEventId = headers.get('last-event-id', query.get('lastEventId', ''))
+
+    client.kind = 'sse'
+    client.outBuf += ('HTTP/1.1 200 OK\r\n'
+                      'Content-Type: text/event-stream\r\n'
+                      'Cache-Control: no-cache\r\n'
+                      'Connection: keep-alive\r\n'
+                      'Access-Control-Allow-Origin: *\r\n\r\n'
+                      'retry: 2000\n\n').encode()
+
+    # Status event are published under daemon status lock, snapshot and sequence number are consistent
+    # Each channel daemon status lock are always taken in channel order
+    statStores = [ channels[chanId].daemonStat for chanId in channels ]
+    for data in statStores:
+        data.lock.acquire()
+    try:
+        snapshot = [ data.snapshot() for data in statStores ]
+        with ricEventLock:
+            currSeq = ricEventSeq
+            oldestSeq = ricEvents[0][0] if len(ricEvents) > 0 else currSeq + 1
+    finally:
+        for data in statStores:
+            data.lock.release()
+
+    # Resume from Last-Event-ID, only if the missed status event still available
+    try:
+        eventBootId, lastSeq = lastEventId.rsplit('-', 1)
+        lastSeq = int(lastSeq)
+    except ValueError:
+        eventBootId, lastSeq = '', -1
+    if eventBootId == bootId and oldestSeq - 1 <= lastSeq <= currSeq:
+        client.lastSeq = lastSeq
+    # Start with current daemon status
+    else:
+        client.outBuf += sseEvent('snapshot', currSeq, snapshot)
+        client.lastSeq = currSeq
+
+# Create WebSocket frame, server frame are not masked
+def wsFrame(opcode, payload):
+    if len(payload) < 126:
+        return struct.pack('!BB', 0x80 | opcode, len(payload)) + payload
+    return struct.pack('!BBH', 0x80 | opcode, 126, len(payload)) + payload
+
+# Handle WebSocket PTT control request, client must carry the radio channel PTT access token
+# Radio channel are optional, default to primary channel (000)
+# Example request:
+# ws://192.168.101.1:5001/ptt?token=<PTTTOKEN>&channel=001
+def startPttSocket(client, headers, query):
+    chan = channels.get(query.get('channel', primChanDef[0]))
+    wsKey = headers.get('sec-websocket-key', '')
+    token = query.get('token', '')
+    auth = headers.get('authorization', '')
+    if auth.startswith('Bearer '):
+        token = auth[7:]
+
+    client.closing = True
+    if headers.get('upgrade', '').lower() != 'websocket' or wsKey == '':
+        client.outBuf += b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+    # Unknown radio channel
+    elif chan is None:
+        client.outBuf += b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+    # WebSocket PTT control disable
+    elif chan.pttToken == '':
+        client.outBuf += b'HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+    elif not hmac.compare_digest(token.encode('utf-8'), chan.pttToken.encode('utf-8')):
+        logger.info("DEBUG_WS_PTT: Invalid PTT access token from %s" % (client.addr[0]))
+        client.outBuf += b'HTTP/1.1 401 Unauthorized\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+    else:
+        wsAccept = base64.b64encode(hashlib.sha1((wsKey + wsGuid).encode()).digest()).decode()
+        client.kind = 'ws'
+        client.chan = chan
+        client.closing = False
+        client.outBuf += ('HTTP/1.1 101 Switching Protocols\r\n'
+                          'Upgrade: websocket\r\n'
+                          'Connection: Upgrade\r\n'
+                          'Sec-WebSocket-Accept: %s\r\n\r\n' % (wsAccept)).encode()
+        logger.info("DEBUG_WS_PTT: PTT control client connected from %s, channel %s" % (client.addr[0], chan.chanId))
+
+# Handle PTT command from WebSocket PTT control client
+# Reply PTT_ON_ACK/PTT_OFF_ACK, or PTT_ON_BUSY, PTT_OFF_IDLE, PTT_ON_DENIED ...
+def handlePttCommand(client, msgtext):
+    rxTime = time.time()
+    streamStat['pttframes'] += 1
+    if msgtext != 'PTT_ON' and msgtext != 'PTT_OFF':
+        client.outBuf += wsFrame(0x1, b'UNKNOWN')
+        return
+
+    pttResult = manualPtt(client.chan, msgtext == 'PTT_ON', 'WS', rxTime)
+    client.outBuf += wsFrame(0x1, (msgtext + '_' + pttResult).encode())
+    if pttResult == 'ACK':
+        client.pttHold = msgtext == 'PTT_ON'
+        logger.info("DEBUG_WS_PTT: Receive PTT signal, %s PTT" % (msgtext[4:]))
+
+# Close WebSocket connection with a status code
+def closePttSocket(client, code):
+    client.outBuf += wsFrame(0x8, struct.pack('!H', code))
+    client.closing = True
+    client.inBuf = b''
+
+# Process received WebSocket frame, client frame are always masked
+def readPttFrames(client):
+    while client.closing == False and len(client.inBuf) >= 2:
+        byte0, byte1 = struct.unpack('!BB', client.inBuf[:2])
+        opcode = byte0 & 0x0f
+        length = byte1 & 0x7f
+        offset = 2
+        if length == 126:
+            if len(client.inBuf) < 4:
+                return
+            length = struct.unpack('!H', client.inBuf[2:4])[0]
+            offset = 4
+        elif length == 127:
+            closePttSocket(client, 1009)
+            return
+
+        # Protocol error - unmasked client frame
+        if byte1 & 0x80 == 0:
+            closePttSocket(client, 1002)
+            return
+        # Frame too large
+        if length > wsFrameMax:
+            closePttSocket(client, 1009)
+            return
+        if len(client.inBuf) < offset + 4 + length:
+            return
+
+        mask = bytearray(client.inBuf[offset:offset + 4])
+        payload = bytearray(client.inBuf[offset + 4:offset + 4 + length])
+        client.inBuf = client.inBuf[offset + 4 + length:]
+        for i in range(length):
+            payload[i] ^= mask[i % 4]
+
+        # Fragmented frame are not used by PTT command
+        if byte0 & 0x80 == 0 or opcode == 0x0:
+            closePttSocket(client, 1003)
+        # Text frame - PTT command
+        elif opcode == 0x1:
+            handlePttCommand(client, payload.decode('latin-1').strip())
+        # Close frame
+        elif opcode == 0x8:
+            closePttSocket(client, 1000)
+        # Ping frame
+        elif opcode == 0x9:
+            client.outBuf += wsFrame(0xa, bytes(payload))
+        # Pong frame
+        elif opcode == 0xa:
+            pass
+        # Binary frame
+        else:
+            closePttSocket(client, 1003)
+
+# Release PTT held by a dropped WebSocket PTT control client
+def releasePttSocket(client):
+    if client.pttHold == True:
+        client.pttHold = False
+        logger.info("DEBUG_WS_PTT: PTT control client %s dropped, OFF PTT" % (client.addr[0]))
+        manualPtt(client.chan, False, 'WS')
+
+# Parse HTTP request from stream web server client, return False if request still incomplete
+def parseStreamRequest(client):
+    headerEnd = client.inBuf.find(b'\r\n\r\n')
+    if headerEnd < 0:
+        # Request header too large
+        if len(client.inBuf) > 8192:
+            client.closing = True
+            client.outBuf += b'HTTP/1.1 431 Request Header Fields Too Large\r\nConnection: close\r\n\r\n'
+        return False
+
+    lines = client.inBuf[:headerEnd].decode('latin-1').split('\r\n')
+    client.inBuf = client.inBuf[headerEnd + 4:]
+
+    requestLine = lines[0].split(' ')
+    headers = {}
+    for line in lines[1:]:
+        sep = line.find(':')
+        if sep > 0:
+            headers[line[:sep].strip().lower()] = line[sep + 1:].strip()
+
+    path = requestLine[1] if len(requestLine) > 1 else ''
+    query = {}
+    if '?' in path:
+        path, queryStr = path.split('?', 1)
+        for param in queryStr.split('&'):
+            if '=' in param:
+                # Percent-encoded query parameter (token, channel) are decoded before used
+                key, value = param.split('=', 1)
+                query[unquote(key)] = unquote(value)
+
+    if requestLine[0] == 'GET' and path == '/ricinfo/stream':
+        startStatusStream(client, headers, query)
+    elif requestLine[0] == 'GET' and path == '/ptt':
+        startPttSocket(client, headers, query)
+    else:
+        client.closing = True
+        client.outBuf += b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+    return True
+
+# Read data from stream web server client, return False if connection closed
+def readStreamClient(client):
+    try:
+        if client.handshake == True:
+            client.sock.do_handshake()
+            client.handshake = False
+        client.sslWant = ''
+        data = client.sock.recv(4096)
+    except ssl.SSLWantReadError:
+        client.sslWant = 'read'
+        return True
+    except ssl.SSLWantWriteError:
+        client.sslWant = 'write'
+        return True
+    except (socket.error, ssl.SSLError):
+        return False
+    if not data:
+        return False
+
+    client.inBuf += data
+    if client.kind is None:
+        parseStreamRequest(client)
+    # PTT command are handled as soon as the frame received
+    if client.kind == 'ws':
+        readPttFrames(client)
+    # Status stream client never send anything after the request
+    elif client.kind == 'sse':
+        client.inBuf = b''
+    return True
+
+# Send pending data to stream web server client, return False if connection closed
+def writeStreamClient(client):
+    try:
+        if client.handshake == True:
+            client.sock.do_handshake()
+            client.handshake = False
+            client.sslWant = ''
+            return True
+        client.sslWant = ''
+        sent = client.sock.send(client.outBuf)
+    except ssl.SSLWantReadError:
+        client.sslWant = 'read'
+        return True
+    except ssl.SSLWantWriteError:
+        client.sslWant = 'write'
+        return True
+    except (socket.error, ssl.SSLError):
+        return False
+    client.outBuf = client.outBuf[sent:]
+    return not (client.closing and len(client.outBuf) == 0)
+
+# Thread for stream web server
+# All status stream subscriber are served by this single thread, status change publisher never
+# wait for a subscriber
+def stream_web_server (threadname, delay):
+    listenSock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listenSock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listenSock.bind(('0.0.0.0', streamPort))
+    listenSock.listen(16)
+    listenSock.setblocking(False)
+
+    # Secure web server (HTTPS)
+    sslCtx = None
+    if macSecInSec == True:
+        sslCtx = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        sslCtx.load_cert_chain(sslCertFile, sslKeyFile)
+
+    logger.info("DEBUG_REST_API: Stream web server STARTED, port %s" % (streamPort))
+
+    clients = []
+    keepAliveTime = time.time() + delay
     while True:
-        time.sleep(delay)
-
-        # ON ALIVE led
-        if wdog == False:
-            if ledEn == False:
-                #GPIO.output(17, GPIO.HIGH)
-                GPIO.output(6, GPIO.HIGH)
-                ledEn = True
-            wdog = True
-        # OFF ALIVE led
+        # Client waiting for SSL data from the peer are NOT polled for writable, a socket are almost always writable
+        writeList = [ client for client in clients if client.sslWant == 'write' or (len(client.outBuf) > 0 and
+                      client.sslWant != 'read' and client.handshake == False) ]
+        readList, writeList, errList = select.select([listenSock, ricEventWake[0]] + clients, writeList, [], delay)
+
+        closed = []
+        for sock in readList:
+            # New client connection
+            if sock is listenSock:
+                try:
+                    newSock, addr = listenSock.accept()
+                except socket.error:
+                    continue
+                if len(clients) >= streamMaxClients:
+                    newSock.close()
+                    continue
+                newSock.setblocking(False)
+                client = streamClient(newSock, addr)
+                if sslCtx is not None:
+                    client.sock = sslCtx.wrap_socket(newSock, server_side=True, do_handshake_on_connect=False)
+                    client.handshake = True
+                clients.append(client)
+            # Status event published, clear wake up pipe
+            elif sock is ricEventWake[0]:
+                os.read(ricEventWake[0], 4096)
+            elif readStreamClient(sock) == False:
+                closed.append(sock)
+
+        for client in writeList:
+            if client not in closed and writeStreamClient(client) == False:
+                closed.append(client)
+
+        # Send new status event to status stream subscriber
+        sseClients = [ client for client in clients if client.kind == 'sse' and client not in closed ]
+        minSeq = min([ client.lastSeq for client in sseClients ] + [ricEventSeq])
+        with ricEventLock:
+            events = [ event for event in ricEvents if event[0] > minSeq ]
+            currSeq = ricEventSeq
+        sendKeepAlive = time.time() >= keepAliveTime
+        if sendKeepAlive == True:
+            keepAliveTime = time.time() + delay
+        for client in sseClients:
+            for seq, eventData in events:
+                if seq > client.lastSeq:
+                    client.outBuf += sseEvent('delta', seq, eventData)
+            client.lastSeq = currSeq
+            # Comment line keep the connection open and detect dead subscriber
+            if sendKeepAlive == True:
+                client.outBuf += b': keepalive\n\n'
+            # Subscriber too slow
+            if len(client.outBuf) > streamBufMax:
+                closed.append(client)
+
+        # Ping WebSocket PTT control client to detect a dead connection
+        if sendKeepAlive == True:
+            for client in clients:
+                if client.kind == 'ws' and client not in closed:
+                    client.outBuf += wsFrame(0x9, b'')
+
+        for client in closed:
+            clients.remove(client)
+            releasePttSocket(client)
+            try:
+                client.sock.close()
+            except socket.error:
+                pass
+
+        streamStat['subscribers'] = len([ client for client in clients if client.kind == 'sse' ])
+        streamStat['pttclients'] = len([ client for client in clients if client.kind == 'ws' ])
+        streamStat['events'] = currSeq
+
+# Thread for secondary channel SIP client, primary channel SIP client run at main thread
+def sip_client_thread (threadname, chan):
+    chan.sipClient = radioSIPclient(chan)
+    chan.sipClient.run()
+
+# Alive LED blink - LED OFF for a moment every half of primary channel PTT time out setting
+def aliveLedBlink(ledOn):
+    if ledOn == True:
+        GPIO.output(aliveLedPin, GPIO.HIGH)
+        daemonTimer.arm(max(primChan.pttTimeOut / 2.0, 1.0), aliveLedBlink, False)
+    else:
+        GPIO.output(aliveLedPin, GPIO.LOW)
+        daemonTimer.arm(ledBlinkOff, aliveLedBlink, True)
+
+# Thread for monitor daemon activities - Run daemon timer scheduler
+# PTT time out, alive LED blink, intercom rejoin delay and DTMF debounce are daemon timer
+def monitor_this_daemon(threadname):
+    aliveLedBlink(True)
+    daemonTimer.run()
+
+# Benchmark SIP contact whitelist lookup against the previous contact python list lookup
+def benchSipWhitelist():
+    for size in (10000, 100000):
+        whitelist = sipWhitelist()
+        contacts = []
+
+        startTime = time.time()
+        for i in range(size):
+            contact = 'sip:%d@192.168.8.%d' % (100000 + i, i % 250)
+            whitelist.add(contact)
+            contacts.append(contact)
+        # Extension range entry - 1% of the whitelist
+        for i in range(size // 100):
+            whitelist.add('sip:9%05d*@10.0.%d.1' % (i, i % 250))
+        buildTime = time.time() - startTime
+
+        # Exact hit, extension range hit and miss lookup
+        probes = []
+        for i in range(0, size, size // 1000):
+            probes.append('sip:%d@192.168.8.%d' % (100000 + i, i % 250))
+            probes.append('sip:9%05d12@10.0.%d.1' % (i // 100, (i // 100) % 250))
+            probes.append('sip:%d@172.16.0.1' % (100000 + i))
+
+        startTime = time.time()
+        for uri in probes:
+            whitelist.match(uri)
+        lookupTime = (time.time() - startTime) / len(probes)
+
+        startTime = time.time()
+        for uri in probes[:300]:
+            uri in contacts
+        listLookupTime = (time.time() - startTime) / 300
+
+        print("whitelist %6d entry: build %.3f s, lookup %.2f us, python list lookup %.2f us" %
+              (len(whitelist), buildTime, lookupTime * 1e6, listLookupTime * 1e6))
+
+# Benchmark REST web API /ricinfo polling - Flask web server (app.run) against production web server
+def benchRestServer():
+    from werkzeug.serving import make_server
+
+    servers = [ ('app.run', 5081) ]
+    if cherootWsgi is not None:
+        servers.append(('production', 5082))
+
+    for serverName, port in servers:
+        if serverName == 'app.run':
+            server = make_server('127.0.0.1', port, app, threaded=True)
+            thread.start_new_thread(server.serve_forever, ())
         else:
-            if ledEn == False:
-                #GPIO.output(17, GPIO.LOW)
-                GPIO.output(6, GPIO.LOW)
-
-            pttTOcnt += 1    # Increment time out counter
-            dtmfSmplCnt += 1 # Increment DTMF character '#' sampling counter
-            wdog = False
-
-        # PTT DTMF checking only valid in none intercom mode
-        if icomEnaDis == False:
-            # New DTMF method
-            if DTMFMETHOD == True:
-                # Every 2 seconds check DTMF character '#' for PTT signal
-                if dtmfSmplCnt == 2:
-                    # Previously received DTMF character '#' for PTT signal
-                    # Start process a PTT operation
-                    if dtmfRx == True:
-                        # ON PTT
-                        if pttRx == False:
-                            logger.info("DEBUG_DTMF_PTT: Receive PTT signal, ON PTT")
-                            
-                            # Checking PTT mode of operation
-                            # Mode 1
-                            if pttModeOper == 1:
-                                # Activate GPIO for PTT mode MANUAL
-                                GPIO.output(12, GPIO.HIGH)
-                                # Activate GPIO for PTT control
-                                GPIO.output(4, GPIO.HIGH)
-                            # Mode 3
-                            elif pttModeOper == 3:
-                                # Activate GPIO for PTT control
-                                GPIO.output(4, GPIO.HIGH)
-                            
-                            dtmfRx = False
-                            pttRx = True
-                            pttTOcnt = 0
+            server = createProdServer('127.0.0.1', port, False)
+            server.prepare()
+            thread.start_new_thread(server.serve, ())
+
+        # Dispatcher console polling - Each client reuse its connection when server allow keep-alive
+        clients = 8
+        requests = 300
+        latency = []
+        latencyLock = threading.Lock()
+        done = threading.Semaphore(0)
+
+        def pollRicInfo():
+            conn = httplib.HTTPConnection('127.0.0.1', port, timeout=10)
+            clientLatency = []
+            for i in range(requests):
+                startTime = time.time()
+                conn.request('GET', '/ricinfo')
+                conn.getresponse().read()
+                clientLatency.append(time.time() - startTime)
+            conn.close()
+            with latencyLock:
+                latency.extend(clientLatency)
+            done.release()
+
+        startTime = time.time()
+        for i in range(clients):
+            thread.start_new_thread(pollRicInfo, ())
+        for i in range(clients):
+            done.acquire()
+        elapsed = time.time() - startTime
+
+        if serverName == 'app.run':
+            server.shutdown()
+        else:
+            server.stop()
 
-                            # Update RIC daemon status REST API data
-                            ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                            ric[0]['pttstatus'] = 'ON'
-                        # OFF PTT
-                        elif pttRx == True:
-                            logger.info("DEBUG_DTMF_PTT: Receive PTT signal, OFF PTT")
-                            
-                            # Checking PTT mode of operation
-                            # Mode 1
-                            if pttModeOper == 1:
-                                # Deactivate GPIO for PTT control
-                                GPIO.output(4, GPIO.LOW)
-                                # Deactivate GPIO for PTT mode MANUAL
-                                GPIO.output(12, GPIO.LOW)
-                            # Mode 3
-                            elif pttModeOper == 3:
-                                # Deactivate GPIO for PTT control
-                                GPIO.output(4, GPIO.LOW)
-                            
-                            dtmfRx = False
-                            pttRx = False
-                            pttTOcnt = 0
+        latency.sort()
+        print("%-10s %d client: %.0f request/s, p50 %.2f ms, p99 %.2f ms" %
+              (serverName, clients, len(latency) / elapsed, latency[len(latency) // 2] * 1e3,
+               latency[int(len(latency) * 0.99)] * 1e3))
 
-                            # Update RIC daemon status REST API data
-                        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                        ric[0]['pttstatus'] = 'OFF'
-                    dtmfSmplCnt = 0
+# Benchmark WebSocket PTT control - PTT_ON/PTT_OFF frame to PTT GPIO output and ACK latency
+def benchPttSocket():
+    global GPIO
+    global streamPort
+    global icomEnaDis
 
-        # Intercom group delay reconnection by 10s
-        else:
-            # Start a delay before intercom reconnection process are initiated
-            if strtTmrJoin == True:
-                if joinIcomCnt < 20:
-                    joinIcomCnt += 1
+    # Primary channel manual PTT Mode 3 with a connected call, PTT GPIO replaced by mock GPIO
+    GPIO = mockGpio()
+    streamPort = 5083
+    primChan.pttToken = 'benchmark'
+    primChan.pttModeOper = 3
+    primChan.pttEnDis = True
+    primChan.callconn = True
+    icomEnaDis = False
+    thread.start_new_thread(stream_web_server, ("[stream_web_server]", streamKeepAlive))
+
+    for i in range(50):
+        try:
+            conn = socket.create_connection(('127.0.0.1', streamPort), timeout=10)
+            break
+        except socket.error:
+            time.sleep(0.1)
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    conn.sendall(('GET /ptt?token=%s HTTP/1.1\r\nHost: 127.0.0.1\r\nUpgrade: websocket\r\n'
+                  'Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n'
+                  'Sec-WebSocket-Version: 13\r\n\r\n' % (primChan.pttToken)).encode())
+    response = b''
+    while b'\r\n\r\n' not in response:
+        response += conn.recv(4096)
+
+    frames = 1000
+    gpioLatency = []
+    ackLatency = []
+    for i in range(frames):
+        msgtext = b'PTT_ON' if i % 2 == 0 else b'PTT_OFF'
+        mask = bytearray(b'\x12\x34\x56\x78')
+        payload = bytearray(msgtext)
+        for j in range(len(payload)):
+            payload[j] ^= mask[j % 4]
+
+        startTime = time.time()
+        conn.sendall(struct.pack('!BB', 0x81, 0x80 | len(payload)) + bytes(mask) + bytes(payload))
+        # ACK frame - PTT_ON_ACK/PTT_OFF_ACK
+        ack = b''
+        while len(ack) < 2 + len(msgtext) + 4:
+            ack += conn.recv(64)
+        ackLatency.append(time.time() - startTime)
+        gpioLatency.append(GPIO.edgeTimes(primChan.pttPin)[-1] - startTime)
+    conn.close()
+
+    gpioLatency.sort()
+    ackLatency.sort()
+    print("WebSocket PTT %d frame: frame to GPIO p50 %.3f ms, p99 %.3f ms, frame to ACK p50 %.3f ms, p99 %.3f ms" %
+          (frames, gpioLatency[frames // 2] * 1e3, gpioLatency[int(frames * 0.99)] * 1e3,
+           ackLatency[frames // 2] * 1e3, ackLatency[int(frames * 0.99)] * 1e3))
+
+# Benchmark DTMF PTT - DTMF key received to PTT GPIO output latency
+# DTMF callback are called from SIP client thread core iterate loop, the loop are emulated with the same period
+def benchDtmfPtt():
+    global GPIO
+    global icomEnaDis
 
-                # Initiate intercom reconnection process after 10s
-                elif joinIcomCnt == 20:
-                    strtJoinIcom = True
+    # Primary channel manual PTT Mode 1 with a connected call, PTT GPIO replaced by mock GPIO
+    GPIO = mockGpio()
+    primChan.pttModeOper = 1
+    primChan.pttEnDis = True
+    primChan.callconn = True
+    icomEnaDis = False
 
-                    strtTmrJoin = False
-                    joinIcomCnt = 0
+    pending = collections.deque()
+    running = [True]
+    done = threading.Semaphore(0)
 
-                    logger.info("DEBUG_INTERCOM: Prepare to joining intercom group....")
+    def coreIterate():
+        while running[0] == True:
+            while len(pending) > 0:
+                dtmfPtt(primChan, pending.popleft(), time.time())
+            time.sleep(0.03)
+        done.release()
+    thread.start_new_thread(coreIterate, ())
+
+    # One key press for each PTT ON/OFF, key press are repeated 3 time within 100 ms
+    presses = 40
+    latency = []
+    for i in range(presses):
+        gpioCnt = len(GPIO.edgeTimes(primChan.pttPin))
+        startTime = time.time()
+        for repeat in range(3):
+            pending.append('#')
+            time.sleep(0.05)
+        while len(GPIO.edgeTimes(primChan.pttPin)) == gpioCnt:
+            time.sleep(0.001)
+        latency.append(GPIO.edgeTimes(primChan.pttPin)[gpioCnt] - startTime)
+        time.sleep(primChan.dtmfDebounce)
+    running[0] = False
+    done.acquire()
+
+    latency.sort()
+    print("DTMF PTT %d key press: key to GPIO p50 %.1f ms, p99 %.1f ms, max %.1f ms, %d key debounced, %d PTT" %
+          (presses, latency[presses // 2] * 1e3, latency[int(presses * 0.99)] * 1e3, latency[-1] * 1e3,
+           dtmfStat['debounced'], dtmfStat['ptt']))
+
+# Benchmark PTT state machine - Manual PTT ON/OFF transition time and GPIO write for each PTT mode
+def benchPttFsm():
+    global GPIO
+    global icomEnaDis
 
-        # Blink LED every half of PTT time out setting
-        # Initialize LED blink counter
-        if ledBlnkCnt == 0:
-            ledBlnkCnt = pttTimeOut / 2
-        # Check PTT time out counter against LED blink counter setting
-        else:
-            # Enable the LED Blink
-            if pttTOcnt == ledBlnkCnt:
-                ledEn = False
-        
-        # Create time out for PTT signal, if caller are NOT deactivate it
-        # After 1 minute check PTT, if its still ON, then OFF it
-        # if pttTOcnt == 60:
-        if pttTOcnt == pttTimeOut:
-            # ON LED again after PTT time out counter reaches the count setting
-            GPIO.output(6, GPIO.LOW)
-            # Enable back the LED blink
-            ledEn = False
-            
-            # Check for PTT mode
-            # Hybrid PTT mode:
-            # Mode 1:
-            # When there is no PTT signal, PTT are in VOX mode
-            # When there is a PTT signal, PTT are in MANUAL mode
-
-            # Mode 2:
-            # Always in VOX PTT activation
-            
-            # Mode 3:
-            # Always in MANUAL PTT activation
-
-            # Intercom mode:
-            # Always in intercom mode, and all functionalities related to RoIP
-            # will be disable, the current setting status will remain as
-            # previous except the intercom features will enable
-
-            # PTT time out checking only valid in none intercom mode
-            if icomEnaDis == False:
-                # Manual PTT are available only in Mode 1 and 3
-                if pttModeOper == 1 or pttModeOper == 3:
-                    # Previously PTT is still ON after 10 seconds time out elapsed 
-                    if pttRx == True or pttIsON == True:
-                        # Previous PTT are using DTMF '#' - From IP phone
-                        if pttRx == True:
-                            logger.info("DEBUG_DTMF_PTT: Time OUT! PTT still ON, OFF PTT")
-
-                            pttCnt = 0
-                            pttRx = False
-                        # Previous PTT are using SIP message - From Tactical SIP application
-                        elif pttIsON == True:
-                            logger.info("DEBUG_SIP_PTT: Time OUT! PTT still ON, OFF PTT")
-
-                            pttIsON = False
-                        # Mode 1
-                        if pttModeOper == 1:
-                            # Deactivate GPIO for PTT control
-                            GPIO.output(4, GPIO.LOW)
-                            # Deactivate GPIO for PTT mode MANUAL
-                            GPIO.output(12, GPIO.LOW)
-                        # Mode 3
-                        elif pttModeOper == 3:
-                            # Deactivate GPIO for PTT control
-                            GPIO.output(4, GPIO.LOW)
-                        # Update RIC daemon status REST API data
-                        ric = [ ricC for ricC in daemonStat if (ricC['id'] == '000') ]
-                        ric[0]['pttstatus'] = 'OFF'
-                else:
-                    logger.info("DEBUG_TOUT_PTT: PTT are in VOX mode (Mode 2)")    
+    # Primary channel with a connected call, PTT GPIO replaced by mock GPIO
+    GPIO = mockGpio()
+    primChan.pttEnDis = True
+    primChan.callconn = True
+    icomEnaDis = False
 
-            pttTOcnt = 0
-            # Print time out counter
-            logger.info("DEBUG_TOUT_PTT: SEC BEFORE T.O: %s, SET: %s" % (pttTOcnt, pttTimeOut))
+    events = 10000
+    for pttMode in (1, 3):
+        primChan.pttModeOper = pttMode
+        pttEvent(primChan, 'MODE', 'CFG')
+        writes = GPIO.writes
+        latency = []
+        for i in range(events):
+            startTime = time.time()
+            manualPtt(primChan, i % 2 == 0, 'BENCH')
+            latency.append(time.time() - startTime)
+        latency.sort()
+        print("PTT Mode %d %d transition: p50 %.1f us, p99 %.1f us, %.1f GPIO write per transition" %
+              (pttMode, events, latency[events // 2] * 1e6, latency[int(events * 0.99)] * 1e6,
+               float(GPIO.writes - writes) / events))
+
+# Benchmark SIP client core iterate loop - Previous fixed 30 ms sleep against core iterate scheduler
+# Idle daemon, other thread post a work every 200 ms (mode change, SIP account update ...)
+def benchCoreIterate():
+    duration = 4.0
+
+    for loopName in ('fixed 30 ms', 'scheduler'):
+        sched = coreScheduler()
+        postTime = [0.0]
+        running = [True]
+        done = threading.Semaphore(0)
+
+        def postWork():
+            while running[0] == True:
+                time.sleep(0.2)
+                postTime[0] = time.time()
+                sched.post()
+            done.release()
+        thread.start_new_thread(postWork, ())
+
+        latency = []
+        wakeups = 0
+        startTime = time.time()
+        startCpu = sum(os.times()[:2])
+        while time.time() - startTime < duration:
+            if postTime[0] > 0.0:
+                latency.append(time.time() - postTime[0])
+                postTime[0] = 0.0
+            wakeups += 1
+            if loopName == 'scheduler':
+                sched.wait(False)
+            else:
+                time.sleep(0.03)
+        elapsed = time.time() - startTime
+        cpu = sum(os.times()[:2]) - startCpu
+        running[0] = False
+        done.acquire()
+
+        latency.sort()
+        print("%-11s: %.1f wakeups/s, CPU %.2f %%, posted work latency p50 %.2f ms, p99 %.2f ms" %
+              (loopName, wakeups / elapsed, cpu * 100.0 / elapsed, latency[len(latency) // 2] * 1e3,
+               latency[int(len(latency) * 0.99)] * 1e3))
+
+# Benchmark daemon timer scheduler - Timer fired time after its deadline and idle wake up, against the previous
+# 0.5 s monitor counter (PTT time out counted in 1 s step from an unrelated phase)
+def benchDaemonTimer():
+    count = 200
+    fired = []
+    done = threading.Semaphore(0)
+
+    def timerFired(deadline):
+        fired.append(monoTime() - deadline)
+        if len(fired) == count:
+            done.release()
+
+    for i in range(count):
+        delay = 0.01 + (i * 7919 % 200) / 1000.0
+        daemonTimer.arm(delay, timerFired, monoTime() + delay)
+    done.acquire()
+    fired.sort()
+
+    # Previous monitor counter - Time out at the first 1 s counter step after the deadline
+    counter = sorted([ 1.0 - ((i * 0.37) % 1.0) for i in range(count) ])
+
+    # No armed timer - Timer scheduler thread should not wake up
+    wakeups = daemonTimer.wakeups
+    time.sleep(1.0)
+    print("timer      : %d timer, fired after deadline p50 %.3f ms, p99 %.3f ms, %d wake up in 1 s idle" %
+          (count, fired[count // 2] * 1e3, fired[int(count * 0.99)] * 1e3, daemonTimer.wakeups - wakeups))
+    print("counter    : %d timer, fired after deadline p50 %.1f ms, p99 %.1f ms, 2 wake up in 1 s idle" %
+          (count, counter[count // 2] * 1e3, counter[int(count * 0.99)] * 1e3))
+
+# Start primary channel serial writer and reader at the RIH VOX controller simulator, once for all VOX benchmark
+def benchVoxStart():
+    if primChan.chanId in rihSim:
+        return
+    rihSim[primChan.chanId] = rihSimulator(rihLinkPath + '_bench', seed=17)
+    primChan.serPort = rihSim[primChan.chanId].linkPath
+    thread.start_new_thread(serial_vox_comm, ("[serial_vox_comm_bench]", primChan))
+
+# Benchmark VOX config command round trip against the previous 0.5 s serial polling loop
+# VOX controller are simulated at a pty, round trip are measured from the command queued to the ACK matched
+def benchVoxSerial():
+    benchVoxStart()
+    primChan.voxMode = '2'
+
+    commands = 50
+    latency = []
+    for i in range(commands):
+        primChan.delayvalue = str(90 + i % 9)
+        startTime = time.time()
+        voxSend(primChan, 5)
+        while primChan.commBusy == True:
+            time.sleep(0.0002)
+        latency.append(time.time() - startTime)
+    latency.sort()
+    rtt = sorted(primChan.voxRtt)
+    print("reader     : %d command, queued to ACK p50 %.2f ms, p99 %.2f ms, serial RTT p50 %.2f ms" %
+          (commands, latency[commands // 2] * 1e3, latency[int(commands * 0.99)] * 1e3, rtt[len(rtt) // 2] * 1e3))
+
+    # Previous serial polling loop - Check received data, otherwise send the pending command every 0.5 s
+    pollSim = rihSimulator(rihLinkPath + '_poll')
+    pollSer = serial.Serial(pollSim.linkPath, voxBaudRate)
+    pollCmd = collections.deque()
+    pollAck = []
+
+    def pollLoop():
+        while True:
+            time.sleep(0.5)
+            if pollSer.inWaiting() > 0:
+                pollSer.readline()
+                pollAck.append(time.time())
+            elif len(pollCmd) > 0:
+                pollSer.write(pollCmd.popleft())
+    thread.start_new_thread(pollLoop, ())
+
+    commands = 6
+    latency = []
+    for i in range(commands):
+        startTime = time.time()
+        pollCmd.append(b'<0201095>')
+        while len(pollAck) == i:
+            time.sleep(0.0002)
+        latency.append(pollAck[i] - startTime)
+    latency.sort()
+    print("polling    : %d command, queued to ACK p50 %.2f ms, max %.2f ms" %
+          (commands, latency[commands // 2] * 1e3, latency[-1] * 1e3))
+
+# Benchmark VOX controller serial frame parser - Parser throughput against the serial baudrate (10 bit for each
+# byte). Parser fuzz check are at tests/test_sipradio.py
+def benchVoxParser():
+    # Throughput - ACK and status frame received in 64 byte chunk
+    stream = b'<06>\n<0302A1>\n' * 20000
+    chunks = [ stream[pos:pos + 64] for pos in range(0, len(stream), 64) ]
+    parser = voxFrameParser()
+    startTime = time.time()
+    for chunk in chunks:
+        parser.feed(chunk)
+    elapsed = time.time() - startTime
+    print("throughput : %d frame, %.2f MB/s, %.0f x 115200 baud" %
+          (parser.stat['frames'], len(stream) / elapsed / 1e6, len(stream) * 10 / elapsed / 115200))
+
+# Benchmark VOX profile transaction against one config command at a time (separate update for each parameter)
+# VOX controller simulator ACK each command after 20 ms
+def benchVoxProfile():
+    benchVoxStart()
+    rihSim[primChan.chanId].latency = 0.02
+    profiles = 10
+    for mode in ('1', '2'):
+        sequential = []
+        pipelined = []
+        for i in range(profiles):
+            params = {'delayaindiv' : str(1 + i % 5), 'delayvaladd' : str(10 + i), 'threshmultp' : '0.%d' % (1 + i % 9),
+                      'threshadd' : str(60 + i), 'delayvalue' : str(90 + i), 'thresholdvalue' : str(200 + i)}
+
+            # One config command at a time - VOX mode then each parameter of the mode
+            for field in params:
+                setattr(primChan, field, params[field])
+            primChan.voxMode = mode
+            startTime = time.time()
+            voxSend(primChan, 7)
+            for cmdType in voxProfileTypes[mode][1:]:
+                voxSend(primChan, cmdType)
+            while primChan.commBusy == True:
+                time.sleep(0.0002)
+            sequential.append(time.time() - startTime)
+
+            # VOX profile transaction - Different value from the sequential update, nothing are skipped
+            params = dict((field, params[field][:-1] + str((int(params[field][-1]) + 5) % 10)) for field in params)
+            startTime = time.time()
+            txn = voxApplyProfile(primChan, mode, params)
+            pipelined.append(time.time() - startTime)
+            if txn.status != 'APPLIED':
+                print("VOX profile Mode %s %s" % (mode, txn.status))
+        sequential.sort()
+        pipelined.sort()
+        print("Mode %s     : %d command, one at a time p50 %.1f ms, transaction p50 %.1f ms" %
+              (mode, len(voxProfileTypes[mode]), sequential[profiles // 2] * 1e3, pipelined[profiles // 2] * 1e3))
+    rihSim[primChan.chanId].latency = 0.0
+
+# Benchmark VOX serial link recovery - VOX controller simulator delay, lose and corrupt the answer, and the serial
+# link are disconnected once. Each config command should be ACK and the simulator end up with the last value
+def benchVoxFault():
+    global voxRetryIntv, voxRetryMaxIntv, voxReopenIntv
+
+    benchVoxStart()
+    sim = rihSim[primChan.chanId]
+    prevIntv = (voxRetryIntv, voxRetryMaxIntv, voxReopenIntv)
+    voxRetryIntv, voxRetryMaxIntv, voxReopenIntv = 0.05, 0.2, 0.05
+    sim.latency, sim.loss, sim.garbage = 0.002, 0.2, 0.2
+    primChan.voxMode = '2'
+    voxStat = dict(primChan.voxStat)
+    simStat = dict(sim.stat)
+    rxErrors = primChan.voxParser.stat['errors']
+
+    commands = 100
+    startTime = time.time()
+    for i in range(commands):
+        if i == commands // 2:
+            sim.drop(0.3)
+        primChan.delayvalue = str(100 + i)
+        voxSend(primChan, 5)
+        while primChan.commBusy == True:
+            time.sleep(0.0005)
+    elapsed = time.time() - startTime
+
+    delta = dict((key, primChan.voxStat[key] - voxStat[key]) for key in ('retries', 'timeouts', 'linkdown'))
+    print("fault      : %d lost, %d garbage, %d framing error, %d disconnect in %d command" %
+          (sim.stat['lost'] - simStat['lost'], sim.stat['garbage'] - simStat['garbage'],
+           primChan.voxParser.stat['errors'] - rxErrors, sim.stat['disconnects'] - simStat['disconnects'],
+           sim.stat['commands'] - simStat['commands']))
+    print("recovery   : %d command, %d ACK, %d resend, %d time out, %d link down, %.2f s, last value %s" %
+          (commands, commands - delta['timeouts'], delta['retries'], delta['timeouts'], delta['linkdown'], elapsed,
+           'MATCH' if sim.params.get('0201') == primChan.delayvalue.zfill(3) else 'MISMATCH'))
+    sim.latency, sim.loss, sim.garbage = 0.0, 0.0, 0.0
+    voxRetryIntv, voxRetryMaxIntv, voxReopenIntv = prevIntv
+
+# Benchmark GPIO write latency for each GPIO backend - ALIVE LED GPIO are toggled, PTT GPIO are never written
+# GPIO backend NOT available on this machine are skipped
+def benchGpioWrite():
+    writes = 10000
+    for backend in ('MOCK', 'RPI', 'GPIOD'):
+        if backend == GPIO.name:
+            gpio = GPIO
         else:
-            # Print time out counter
-            logger.info("DEBUG_TOUT_PTT: SEC BEFORE T.O: %s, SET: %s" % (pttTOcnt, pttTimeOut))            
-                
+            gpio = openGpio(backend, gpioCnfg.typed['chip'].strip())
+            if gpio.name != backend:
+                print("%-10s : NOT available" % (backend))
+                continue
+            gpio.setup(aliveLedPin)
+
+        latency = []
+        for i in range(writes):
+            startTime = time.time()
+            gpio.output(aliveLedPin, gpio.HIGH if i % 2 == 0 else gpio.LOW)
+            latency.append(time.time() - startTime)
+        gpio.output(aliveLedPin, gpio.LOW)
+        latency.sort()
+        print("%-10s : %d write, p50 %.2f us, p99 %.2f us" %
+              (backend, writes, latency[writes // 2] * 1e6, latency[int(writes * 0.99)] * 1e6))
+
+# Thread for simulation driver - Run with SIMULATION and BENCHMARK macro
+# SIP event are injected at the primary channel simulated SIP core, daemon are observed via REST API, mock GPIO,
+# sent SIP message and VOX controller simulator. Daemon are terminated after the last measurement
+def simulation_driver(threadname):
+    while primChan.sipClient is None:
+        time.sleep(0.01)
+    core = primChan.sipClient.core
+    core.wake = primChan.coreSched.post
+    sim = rihSim[primChan.chanId]
+
+    # Wait for REST web server
+    conn = httplib.HTTPConnection('127.0.0.1', restPort, timeout=10)
+    for i in range(100):
+        try:
+            conn.connect()
+            break
+        except socket.error:
+            time.sleep(0.1)
+
+    def restRequest(method, path, body=None):
+        headers = {'Content-type': 'application/json'} if body is not None else {}
+        conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+        return json.loads(conn.getresponse().read().decode('utf-8'))
+
+    def callStatus():
+        return restRequest('GET', '/ricinfo')['RICInfo'][0]['callstatus']
+
+    def waitFor(condition, timeout=5.0):
+        endTime = time.time() + timeout
+        while condition() == False:
+            if time.time() > endTime:
+                return False
+            time.sleep(0.0005)
+        return True
+
+    def percentile(latency, ratio):
+        latency = sorted(latency)
+        return latency[min(int(len(latency) * ratio), len(latency) - 1)] * 1e3
+
+    # SIP registration
+    core.registration(simLinphone.RegistrationState.Ok)
+    waitFor(lambda: primChan.sipClient.registInProgress() == False)
+
+    # REST API throughput - Dispatcher console polling
+    requests = 500
+    latency = []
+    startTime = time.time()
+    for i in range(requests):
+        reqTime = time.time()
+        restRequest('GET', '/ricinfo')
+        latency.append(time.time() - reqTime)
+    elapsed = time.time() - startTime
+    print("rest       : %d request, %.0f request/s, p50 %.2f ms, p99 %.2f ms" %
+          (requests, requests / elapsed, percentile(latency, 0.5), percentile(latency, 0.99)))
+
+    # Incoming call - Call injected to CONNECTED at /ricinfo
+    startTime = time.time()
+    core.incomingCall('sip:1003@' + primChan.asteriskIP)
+    connected = waitFor(lambda: callStatus() == 'CONNECTED')
+    print("call       : incoming call to CONNECTED at /ricinfo %.2f ms, %s" %
+          ((time.time() - startTime) * 1e3, 'CONNECTED' if connected == True else 'NOT CONNECTED'))
+
+    # SIP message PTT - Message injected to PTT GPIO edge and to PTT ACK message sent
+    messages = 100
+    gpioLatency = []
+    ackLatency = []
+    for i in range(messages):
+        edgeCnt = len(GPIO.edgeTimes(primChan.pttPin))
+        sentCnt = len(core.sent)
+        startTime = time.time()
+        core.message('sip:1003@' + primChan.asteriskIP, 'PTT_ON' if i % 2 == 0 else 'PTT_OFF')
+        if waitFor(lambda: len(core.sent) > sentCnt) == False:
+            break
+        ackLatency.append(core.sent[-1][0] - startTime)
+        gpioLatency.append(GPIO.edgeTimes(primChan.pttPin)[edgeCnt] - startTime)
+    print("sip ptt    : %d message, message to GPIO p50 %.2f ms, p99 %.2f ms, message to ACK p50 %.2f ms, p99 %.2f ms" %
+          (len(ackLatency), percentile(gpioLatency, 0.5), percentile(gpioLatency, 0.99),
+           percentile(ackLatency, 0.5), percentile(ackLatency, 0.99)))
+
+    # DTMF PTT - Key injected to PTT GPIO edge, one key press after each debounce time
+    presses = 4
+    gpioLatency = []
+    for i in range(presses):
+        edgeCnt = len(GPIO.edgeTimes(primChan.pttPin))
+        startTime = time.time()
+        core.dtmf(primChan.dtmfPttOn if i % 2 == 0 else primChan.dtmfPttOff)
+        if waitFor(lambda: len(GPIO.edgeTimes(primChan.pttPin)) > edgeCnt) == True:
+            gpioLatency.append(GPIO.edgeTimes(primChan.pttPin)[edgeCnt] - startTime)
+        time.sleep(primChan.dtmfDebounce + 0.1)
+    print("dtmf ptt   : %d key press, key to GPIO p50 %.2f ms, max %.2f ms" %
+          (len(gpioLatency), percentile(gpioLatency, 0.5), percentile(gpioLatency, 1.0)))
+
+    # VOX config - REST API update to VOX controller simulator parameter
+    updates = 20
+    latency = []
+    primChan.voxMode = '2'
+    for i in range(updates):
+        value = str(300 + i)
+        startTime = time.time()
+        restRequest('PUT', '/voxconfig/' + primChan.chanId, {'delayvalue' : value})
+        if waitFor(lambda: sim.params.get('0201') == value) == True:
+            latency.append(time.time() - startTime)
+    print("vox config : %d update, REST API to VOX controller p50 %.2f ms, p99 %.2f ms" %
+          (len(latency), percentile(latency, 0.5), percentile(latency, 0.99)))
+
+    # Remote call end - Call end to LISTENING at /ricinfo
+    startTime = time.time()
+    core.endCall()
+    ended = waitFor(lambda: callStatus() == 'LISTENING')
+    print("call end   : call end to LISTENING at /ricinfo %.2f ms, %s, PTT %s" %
+          ((time.time() - startTime) * 1e3, 'LISTENING' if ended == True else 'NOT LISTENING', primChan.pttState))
+    conn.close()
+
+    # Terminate the daemon
+    for chanId in channels:
+        if channels[chanId].sipClient is not None:
+            channels[chanId].sipClient.quit = True
+            channels[chanId].coreSched.post()
+
+# Benchmark log pipeline - Logging call time at the logging thread, log file written at the logging thread against
+# log record queued for the log writer thread, then linphone debug log below SIPLOG level
+def benchLogPipeline():
+    global logRateBurst
+
+    records = 4000
+    logDir = tempfile.mkdtemp(prefix='sipradio-log-')
+    syncLogger = logging.getLogger('bench.sync')
+    syncLogger.propagate = False
+    syncFile = logging.handlers.TimedRotatingFileHandler(logDir + '/sync.log', when="midnight", backupCount=3)
+    syncFile.setFormatter(formatter)
+    syncLogger.addHandler(syncFile)
+
+    # Log record are logged from one log call site, NOT rate limited here
+    rateBurst = logRateBurst
+    logRateBurst = records
+    for logName, benchLogger in (('file', syncLogger), ('queue', logger)):
+        flushLog()
+        written = logStat['written']
+        latency = []
+        for i in range(records):
+            startTime = time.time()
+            benchLogger.info("DEBUG_BENCH: %d SIP client core iterate, %d SIP event dispatched" % (i, i % 7))
+            latency.append(time.time() - startTime)
+        latency.sort()
+        flushLog()
+        print("%-10s : %d log record, logging call p50 %.1f us, p99 %.1f us%s" %
+              (logName, records, latency[records // 2] * 1e6, latency[int(records * 0.99)] * 1e6,
+               '' if benchLogger is syncLogger else ', %d written' % (logStat['written'] - written)))
+    logRateBurst = rateBurst
+
+    latency = []
+    for i in range(records):
+        startTime = time.time()
+        sipLog('debug', 'transaction [%x]: received 200 OK for REGISTER' % (i))
+        latency.append(time.time() - startTime)
+    latency.sort()
+    print("sip debug  : %d log below %s, logging call p50 %.1f us, p99 %.1f us" %
+          (records, macSipLog, latency[records // 2] * 1e6, latency[int(records * 0.99)] * 1e6))
+
+    # Log ring buffer - Filtered REST API query over a full log ring buffer
+    client = app.test_client()
+    flushLog()
+    since = max(logRingSeq - logRingSize, 0)
+    for limit in (logPageSize, logRingSize):
+        latency = []
+        for i in range(50):
+            startTime = time.time()
+            response = client.get('/logs?since=%d&level=info&subsystem=BENCH&limit=%d' % (since, limit))
+            latency.append(time.time() - startTime)
+        latency.sort()
+        print("logs query : %d log event, %d match, REST API p50 %.2f ms, p99 %.2f ms" %
+              (len(logRing), len(json.loads(response.get_data().decode('utf-8'))['logs']), latency[25] * 1e3, latency[49] * 1e3))
+
+    # Rate limit - Same log call site repeated, then log call site sharing the same message prefix
+    suppressed = logStat['suppressed']
+    for i in range(records):
+        logger.info("DEBUG_BENCH: REST API GET /ricinfo request %d" % (i))
+    print("rate limit : %d same log call site, %d suppressed" % (records, logStat['suppressed'] - suppressed))
+    suppressed = logStat['suppressed']
+    for i in range(logRateBurst):
+        logger.info("DEBUG_BENCH: RECEIVE ACK FOR CONFIG %d" % (i))
+        logger.info("DEBUG_BENCH: RECEIVE ACK FOR ALIVE %d" % (i))
+        logEvent('BENCH', 'PTT ON', {'count' : i})
+        logEvent('BENCH', 'PTT OFF', {'count' : i})
+    print("rate limit : %d log call site, %d log message, %d suppressed" %
+          (4, logRateBurst * 4, logStat['suppressed'] - suppressed))
+    syncFile.close()
+
+# Benchmark metric update - Metric shard against a counter guarded by a lock, 4 thread updating the same counter,
+# then /metrics request time
+def benchMetrics():
+    updates = 200000
+    threads = 4
+    counter = metricCounter('bench_updates_total', 'Benchmark counter', ('source', ))
+    metrics.remove(counter)
+    lockCounter = {}
+    lock = threading.Lock()
+
+    def lockInc(labels):
+        with lock:
+            lockCounter[labels] = lockCounter.get(labels, 0) + 1
+
+    for counterName, incFunc in (('shard', counter.inc), ('lock', lockInc)):
+        done = threading.Semaphore(0)
+
+        def updateLoop():
+            for i in range(updates // threads):
+                incFunc(('BENCH', ))
+            done.release()
+
+        startTime = time.time()
+        for i in range(threads):
+            thread.start_new_thread(updateLoop, ())
+        for i in range(threads):
+            done.acquire()
+        elapsed = time.time() - startTime
+        total = counter.collect()[('BENCH', )] if counterName == 'shard' else lockCounter[('BENCH', )]
+        print("%-10s : %d thread, %d update, %.3f us per update, %d counted" %
+              (counterName, threads, updates, elapsed / updates * 1e6, total))
+
+    hist = metricHistogram('bench_latency_seconds', 'Benchmark histogram', latencyBuckets, ('source', ))
+    metrics.remove(hist)
+    startTime = time.time()
+    for i in range(updates):
+        hist.observe(('BENCH', ), (i % 1000) * 1e-4)
+    print("histogram  : %d observe, %.3f us per observe" % (updates, (time.time() - startTime) / updates * 1e6))
+
+    client = app.test_client()
+    latency = []
+    for i in range(50):
+        startTime = time.time()
+        response = client.get('/metrics')
+        latency.append(time.time() - startTime)
+    latency.sort()
+    print("metrics    : %d byte, %d metric, /metrics p50 %.2f ms, p99 %.2f ms" %
+          (len(response.get_data()), len(metrics), latency[25] * 1e3, latency[49] * 1e3))
+
+# Benchmark list - Run with BENCHMARK macro
+benchmarks = [
+    ('SIP contact whitelist', benchSipWhitelist),
+    ('REST web server', benchRestServer),
+    ('WebSocket PTT control', benchPttSocket),
+    ('DTMF PTT', benchDtmfPtt),
+    ('PTT state machine', benchPttFsm),
+    ('GPIO write', benchGpioWrite),
+    ('SIP client core iterate', benchCoreIterate),
+    ('Daemon timer', benchDaemonTimer),
+    ('VOX serial config command', benchVoxSerial),
+    ('VOX serial frame parser', benchVoxParser),
+    ('VOX profile transaction', benchVoxProfile),
+    ('VOX serial link recovery', benchVoxFault),
+    ('Log pipeline', benchLogPipeline),
+    ('Metrics', benchMetrics)
+]
+
+# Run all benchmark
+def runBenchmarks():
+    # PTT time out and DTMF debounce are daemon timer
+    thread.start_new_thread(daemonTimer.run, ())
+
+    for benchName, benchFunc in benchmarks:
+        print("BENCHMARK: %s" % (benchName))
+        benchFunc()
+
 def main():
     #hfradio = HFRadioSIPclient(username='1002', password='1234', snd_capture='ALSA: audioinjector-octo-soundcard')
     #hfradio = HFRadioSIPclient(username='1002', password='1234', snd_capture='ALSA: default device')
     
-    global sipUserName
-    global sipPswd
+    if macSimulation == True:
+        logger.info("DEBUG_SIM: Simulation mode, config directory %s" % (cnfgDir))
+
+    # Run benchmark instead of the daemon, simulation mode benchmark are run against the whole daemon
+    if macBenchmark == True and macSimulation == False:
+        runBenchmarks()
+        flushLog()
+        sys.exit()
 
     # Create thread for monitor a daemon activities
     try:
-        thread.start_new_thread(monitor_this_daemon, ("[monitor_this_daemon]", 0.5 ))
+        thread.start_new_thread(monitor_this_daemon, ("[monitor_this_daemon]", ))
     except:
         logger.info("Error: Unable to start [monitor_this_daemon] thread")
 
@@ -3392,18 +5460,67 @@ def main():
     except:
         logger.info("Error: Unable to start [restful_web_server] thread")
 
-    # Create thread for serial communication with VOX controller 
+    # Create thread for stream web server
     try:
-        thread.start_new_thread(serial_vox_comm, ("[serial_vox_comm]", 0.5 ))
+        thread.start_new_thread(stream_web_server, ("[stream_web_server]", streamKeepAlive ))
     except:
-        logger.info("Error: Unable to start [serial_vox_comm] thread")    
+        logger.info("Error: Unable to start [stream_web_server] thread")
+
+    # Simulated VOX controller for each channel instead of the serial port
+    if macRihSim is not None or macSimulation == True:
+        for chan in channels.values():
+            linkPath = (cnfgDir + '/rihsim' if macSimulation == True else rihLinkPath) + '_' + chan.chanId
+            rihSim[chan.chanId] = rihSimulator(linkPath, *(macRihSim or []))
+            chan.serPort = rihSim[chan.chanId].linkPath
+            logger.info("DEBUG_VOX: Channel %s VOX controller simulator at %s" % (chan.chanId, chan.serPort))
+
+    # Create thread for serial communication with each channel VOX controller 
+    for chan in channels.values():
+        try:
+            thread.start_new_thread(serial_vox_comm, ("[serial_vox_comm_%s]" % (chan.chanId), chan ))
+        except:
+            logger.info("Error: Unable to start [serial_vox_comm_%s] thread" % (chan.chanId))    
+
+    # Create thread for config file write-behind
+    try:
+        thread.start_new_thread(config_write_behind, ("[config_write_behind]", cnfgFlushDly ))
+    except:
+        logger.info("Error: Unable to start [config_write_behind] thread")
+
+    # Create thread for config file hot reload
+    try:
+        thread.start_new_thread(config_file_watcher, ("[config_file_watcher]", 5 ))
+    except:
+        logger.info("Error: Unable to start [config_file_watcher] thread")
         
+    # Create thread for each secondary channel SIP client
+    for chan in channels.values():
+        if chan.primary == False:
+            try:
+                thread.start_new_thread(sip_client_thread, ("[sip_client_%s]" % (chan.chanId), chan ))
+            except:
+                logger.info("Error: Unable to start [sip_client_%s] thread" % (chan.chanId))
+
+    # Create thread for simulation driver
+    if macSimulation == True and macBenchmark == True:
+        try:
+            thread.start_new_thread(simulation_driver, ("[simulation_driver]", ))
+        except:
+            logger.info("Error: Unable to start [simulation_driver] thread")
+
     #hfradio = HFRadioSIPclient(username=sipUserName, password=sipPswd, snd_capture='ALSA: USB PnP Sound Device')
-    hfradio = radioSIPclient(username=sipUserName, password=sipPswd, snd_capture='audioinjector-pi-soundcard')
+    hfradio = radioSIPclient(primChan)
+    primChan.sipClient = hfradio
     hfradio.run()
 
+    # Write pending config update and log before terminate
+    flushConfigNow()
+
     logger.info("THREAD:")
+    flushLog()
     
     sys.exit()
     
-main()
+# Daemon are NOT started when imported (tests)
+if __name__ == '__main__':
+    main()
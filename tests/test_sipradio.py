@@ -0,0 +1,872 @@
+#############################################################################################################
+# File   : test_sipradio.py
+# Desc   : Behaviour check for the RIC daemon building block - VOX controller serial frame parser, config file
+#          persistence (atomic write, write-behind, keyed parse and hot reload), SIP contact whitelist (lookup,
+#          contact journal compaction and REST API), REST API ETag, daemon timer scheduler, PTT state machine,
+#          VOX controller serial writer, config command queue and VOX profile transaction (commit, rollback and
+#          restore) against the RIH VOX controller simulator.
+#          Run with: python -m pytest tests (or python -m unittest discover tests)
+#          Timing of the same building block are measured with the daemon BENCHMARK macro.
+#############################################################################################################
+
+import os
+import random
+import select
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import sipradio
+
+# Feed data to the parser in random chunk size - Return received frame payload
+def feedChunks(parser, data, rand, maxBuf=None):
+    received = []
+    pos = 0
+    while pos < len(data):
+        size = rand.randint(1, 64)
+        received += [ payload for kind, payload in parser.feed(data[pos:pos + size]) ]
+        if maxBuf is not None:
+            maxBuf.append(len(parser.buf))
+        pos += size
+    return received
+
+# Wait until the condition are true - Return False after the time out (s)
+def waitFor(condition, timeout=5.0):
+    endTime = time.time() + timeout
+    while condition() == False:
+        if time.time() >= endTime:
+            return False
+        time.sleep(0.01)
+    return True
+
+# Daemon timer scheduler thread, started once for all test needing daemon timer
+timerStarted = []
+
+def startDaemonTimer():
+    if len(timerStarted) == 0:
+        sipradio.thread.start_new_thread(sipradio.daemonTimer.run, ())
+        timerStarted.append(True)
+
+# Test radio channel - Config file are NOT written (config file writer NOT started)
+chanSeq = []
+
+def newChannel(serPort='/dev/null'):
+    chanSeq.append(True)
+    chanId = '9%02d' % (len(chanSeq))
+    chan = sipradio.radioChannel(chanId, 40 + len(chanSeq), 80 + len(chanSeq), serPort, 'test', 15060 + len(chanSeq))
+    chan.loadConfig()
+    return chan
+
+# VOX controller serial frame parser
+class voxFrameParserTest(unittest.TestCase):
+    def test_frame_kind(self):
+        parser = sipradio.voxFrameParser()
+        frames = parser.feed(b'<06>\n<15>\r\n<0302A1>\n<0201095>\n')
+        self.assertEqual(frames, [('ACK', '06'), ('NAK', '15'), ('STATUS', '0302A1'), ('UNKNOWN', '0201095')])
+        self.assertEqual(parser.stat['errors'], 0)
+
+    def test_frame_split_at_every_byte(self):
+        parser = sipradio.voxFrameParser()
+        frames = []
+        for byte in bytearray(b'<06>\n<0302A1>\n'):
+            frames += parser.feed(bytes(bytearray([byte])))
+        self.assertEqual(frames, [('ACK', '06'), ('STATUS', '0302A1')])
+
+    def test_invalid_frame_character(self):
+        parser = sipradio.voxFrameParser()
+        self.assertEqual(parser.feed(b'<0G>\n<06>\n'), [('ACK', '06')])
+        self.assertEqual(parser.stat['errors'], 1)
+
+    def test_frame_start_inside_frame(self):
+        parser = sipradio.voxFrameParser()
+        self.assertEqual(parser.feed(b'<06<15>\n'), [('NAK', '15')])
+        self.assertEqual(parser.stat['errors'], 1)
+
+    def test_oversize_frame(self):
+        parser = sipradio.voxFrameParser()
+        frames = parser.feed(b'<' + b'0' * (sipradio.voxFrameMax + 1) + b'>\n<06>\n')
+        self.assertEqual(frames, [('ACK', '06')])
+        self.assertEqual(len(parser.buf), 0)
+
+    # Valid frame mixed with line end and noise, received in a random chunk size, are all received in order
+    def test_fuzz_round_trip(self):
+        rand = random.Random(17)
+        frameSet = [b'06', b'15', b'0302A1', b'0201095', b'01030.8']
+        noiseSet = bytearray(b'0123456789ABC\x00\xff\r\n !#')
+
+        sent = []
+        stream = bytearray()
+        for i in range(20000):
+            if rand.random() < 0.8:
+                frame = rand.choice(frameSet)
+                sent.append(frame.decode('ascii'))
+                stream += b'<' + frame + b'>\n'
+            else:
+                stream += bytearray(rand.choice(noiseSet) for n in range(rand.randint(1, 8)))
+                stream += b'\n'
+
+        parser = sipradio.voxFrameParser()
+        self.assertEqual(feedChunks(parser, bytes(stream), rand), sent)
+        self.assertGreater(parser.stat['errors'], 0)
+
+    # Random byte including frame start and end - Parser never fail or grow its buffer above the maximum frame
+    def test_fuzz_garbage(self):
+        rand = random.Random(17)
+        garbageSet = bytearray(b'<>06\n\x00A')
+        garbage = bytes(bytearray(rand.choice(garbageSet) for n in range(200000)))
+
+        parser = sipradio.voxFrameParser()
+        maxBuf = []
+        feedChunks(parser, garbage, rand, maxBuf)
+        self.assertLessEqual(max(maxBuf), sipradio.voxFrameMax)
+
+        # Parser recover once valid frame received again
+        self.assertEqual(parser.feed(b'>\n<06>\n')[-1:], [('ACK', '06')])
+
+# SIP contact whitelist lookup
+class sipWhitelistTest(unittest.TestCase):
+    def setUp(self):
+        self.whitelist = sipradio.sipWhitelist()
+        for entry in ('sip:1001@192.168.8.101', 'sip:2001', 'sip:30*@192.168.8.101', 'sip:40*', 'sip:*@10.0.0.1'):
+            self.assertTrue(self.whitelist.add(entry))
+
+    def test_match(self):
+        hits = ['sip:1001@192.168.8.101', '<sip:1001@192.168.8.101;transport=udp>', 'sips:1001@192.168.8.101',
+                'sip:2001@172.16.0.1', 'sip:3000@192.168.8.101', 'sip:30@192.168.8.101', 'sip:4099@172.16.0.1',
+                'sip:5001@10.0.0.1']
+        misses = ['sip:1001@192.168.8.102', 'sip:1002@192.168.8.101', 'sip:2002@172.16.0.1', 'sip:3000@192.168.8.102',
+                  'sip:3@192.168.8.101', 'sip:5001@10.0.0.2', 'sip:@192.168.8.101']
+        for uri in hits:
+            self.assertTrue(self.whitelist.match(uri), uri)
+        for uri in misses:
+            self.assertFalse(self.whitelist.match(uri), uri)
+
+    def test_add_remove(self):
+        self.assertEqual(len(self.whitelist), 5)
+        self.assertFalse(self.whitelist.add('sip:1001@192.168.8.101'))
+        self.assertFalse(self.whitelist.add('sip:30*@192.168.8.101'))
+        self.assertFalse(self.whitelist.remove('sip:1002@192.168.8.101'))
+        self.assertFalse(self.whitelist.remove('sip:31*@192.168.8.101'))
+
+        for entry in self.whitelist.entries():
+            self.assertTrue(self.whitelist.remove(entry), entry)
+        self.assertEqual(len(self.whitelist), 0)
+        self.assertEqual(self.whitelist.exact, set())
+        # Empty trie node are pruned
+        self.assertEqual(self.whitelist.trie, {})
+        self.assertFalse(self.whitelist.match('sip:3000@192.168.8.101'))
+
+    def test_entries(self):
+        self.assertEqual(self.whitelist.entries(), ['sip:*@10.0.0.1', 'sip:1001@192.168.8.101', 'sip:2001',
+                                                    'sip:30*@192.168.8.101', 'sip:40*'])
+
+# Config file persistence - Atomic config file write and write-behind coalescing of config group update
+class configPersistTest(unittest.TestCase):
+    def setUp(self):
+        self.cnfgDir = tempfile.mkdtemp(prefix='sipradio-test-')
+        self.cnfgFile = self.cnfgDir + '/test.conf'
+        self.cnfgText = []
+        self.saved = dict(sipradio.cnfgDirty)
+        sipradio.cnfgDirty.clear()
+        sipradio.cnfgGroups['test'] = (self.cnfgFile, self.text)
+
+    def tearDown(self):
+        del sipradio.cnfgGroups['test']
+        sipradio.cnfgDirty.clear()
+        sipradio.cnfgDirty.update(self.saved)
+        shutil.rmtree(self.cnfgDir)
+
+    # Config file text of the test config group, each call are recorded
+    def text(self):
+        self.cnfgText.append('KEY:%d\n' % (len(self.cnfgText)))
+        return self.cnfgText[-1]
+
+    def read(self):
+        file = open(self.cnfgFile, 'r')
+        text = file.read()
+        file.close()
+        return text
+
+    def test_atomic_write(self):
+        stat = dict(sipradio.persistStat)
+        sipradio.atomicWriteFile(self.cnfgFile, 'KEY:old\n')
+        sipradio.atomicWriteFile(self.cnfgFile, 'KEY:new\n')
+        self.assertEqual(self.read(), 'KEY:new\n')
+        self.assertEqual(os.listdir(self.cnfgDir), ['test.conf'])
+        self.assertEqual(sipradio.persistStat['filewrite'] - stat['filewrite'], 2)
+        self.assertEqual(sipradio.persistStat['byteswritten'] - stat['byteswritten'], 16)
+        # Own write are known by config file hot reload
+        self.assertEqual(sipradio.cnfgOwnStamp[self.cnfgFile], sipradio.fileStamp(self.cnfgFile))
+
+    # Write failed before rename - Current config file are left intact
+    def test_atomic_write_error(self):
+        sipradio.atomicWriteFile(self.cnfgFile, 'KEY:old\n')
+        fsync = os.fsync
+
+        def failFsync(fd):
+            raise OSError(5, 'Input/output error')
+        os.fsync = failFsync
+        try:
+            self.assertRaises(OSError, sipradio.atomicWriteFile, self.cnfgFile, 'KEY:new\n')
+        finally:
+            os.fsync = fsync
+        self.assertEqual(self.read(), 'KEY:old\n')
+
+    def test_write_behind_coalescing(self):
+        stat = dict(sipradio.persistStat)
+        for i in range(3):
+            sipradio.markConfigDirty('test')
+        self.assertEqual(list(sipradio.cnfgDirty.keys()), ['test'])
+        self.assertEqual(sipradio.persistStat['updatereq'] - stat['updatereq'], 3)
+        self.assertEqual(sipradio.persistStat['coalesced'] - stat['coalesced'], 2)
+
+        # Config file written once with the latest config data
+        sipradio.flushConfigNow()
+        self.assertEqual(self.cnfgText, ['KEY:0\n'])
+        self.assertEqual(self.read(), 'KEY:0\n')
+        self.assertEqual(sipradio.cnfgDirty, {})
+        self.assertEqual(sipradio.persistStat['filewrite'] - stat['filewrite'], 1)
+
+        # Nothing pending, nothing written
+        sipradio.flushConfigNow()
+        self.assertEqual(len(self.cnfgText), 1)
+
+# Keyed config file - Parse in any line order and config file hot reload of the changed config data only
+class configReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.cnfgDir = tempfile.mkdtemp(prefix='sipradio-test-')
+        self.cnfgFile = self.cnfgDir + '/icom.conf'
+        self.current = {'icomset' : 'FALSE', 'icomloc' : 'NA', 'icomextid' : 'NA'}
+        self.applied = []
+        sipradio.cnfgGroups['test'] = (self.cnfgFile, self.text)
+        sipradio.cnfgReload['test'] = (sipradio.icomCnfgDef, self.apply)
+
+    def tearDown(self):
+        del sipradio.cnfgGroups['test']
+        del sipradio.cnfgReload['test']
+        shutil.rmtree(self.cnfgDir)
+
+    # Config file text of the current config data in memory
+    def text(self):
+        return 'ICOMSET:%(icomset)s\nICOMLOC:%(icomloc)s\nEXTID:%(icomextid)s\n' % (self.current)
+
+    def apply(self, changed):
+        self.applied.append(changed)
+        self.current.update(changed)
+
+    # Config file edited outside the daemon
+    def edit(self, text):
+        file = open(self.cnfgFile, 'w')
+        file.write(text)
+        file.close()
+
+    def test_parse(self):
+        cnfg = sipradio.parseConfigText('EXTID:2001\nbad line\nicomset:TRUE\nLOCATION:A\n', sipradio.icomCnfgDef)
+        self.assertEqual(cnfg.raw, {'icomset' : 'TRUE', 'icomloc' : 'NA', 'icomextid' : '2001'})
+        self.assertEqual(cnfg.typed['icomset'], True)
+        self.assertEqual(cnfg.missing, ['ICOMLOC'])
+        self.assertEqual(cnfg.unknown, ['LOCATION'])
+
+        # Invalid value fall back to the default value
+        cnfg = sipradio.parseConfigText('PTTTO:abc\nPTTMODE:3\n', sipradio.sipCnfgDef)
+        self.assertEqual((cnfg.raw['pttto'], cnfg.typed['pttto'], cnfg.typed['pttmode']), ('60', 60, 3))
+
+    # Config file are parsed again only when changed
+    def test_load_cache(self):
+        self.edit('ICOMLOC:A\n')
+        cnfg = sipradio.loadConfigFile(self.cnfgFile, sipradio.icomCnfgDef)
+        self.assertIs(sipradio.loadConfigFile(self.cnfgFile, sipradio.icomCnfgDef), cnfg)
+        self.edit('ICOMLOC:AB\n')
+        self.assertEqual(sipradio.loadConfigFile(self.cnfgFile, sipradio.icomCnfgDef).raw['icomloc'], 'AB')
+
+    def test_reload_diff(self):
+        # Config file written by this daemon are NOT reloaded
+        sipradio.atomicWriteFile(self.cnfgFile, 'ICOMSET:FALSE\nICOMLOC:LOBBY\nEXTID:NA\n')
+        sipradio.reloadConfigGroup('test')
+        self.assertEqual(self.applied, [])
+
+        # Only changed config data are applied
+        self.edit('EXTID:2001\nICOMLOC:NA\nICOMSET:FALSE\n')
+        sipradio.reloadConfigGroup('test')
+        self.assertEqual(self.applied, [{'icomextid' : '2001'}])
+
+        # Nothing changed against config data in memory
+        sipradio.reloadConfigGroup('test')
+        self.assertEqual(len(self.applied), 1)
+
+        # Missing config key are reloaded as its default value
+        self.current['icomloc'] = 'LOBBY'
+        self.edit('ICOMSET:TRUE\nEXTID:2001\n')
+        sipradio.reloadConfigGroup('test')
+        self.assertEqual(self.applied[1], {'icomset' : 'TRUE', 'icomloc' : 'NA'})
+
+# SIP contact whitelist persistence - Contact update are appended to the contact journal, journal are compacted into
+# the contact list file
+class contactJournalBase(unittest.TestCase):
+    def setUp(self):
+        self.cnfgDir = tempfile.mkdtemp(prefix='sipradio-test-')
+        self.saved = dict((name, getattr(sipradio, name)) for name in
+                          ('contListFile', 'contJournalFile', 'contJournal', 'contJournalCnt', 'contCompactCnt',
+                           'contBatchSize', 'siplist'))
+        sipradio.contListFile = self.cnfgDir + '/sipradioCont.list'
+        sipradio.contJournalFile = self.cnfgDir + '/sipradioCont.journal'
+        sipradio.contJournal = None
+        sipradio.contJournalCnt = 0
+        sipradio.contCompactCnt = 3
+        sipradio.siplist = sipradio.sipWhitelist()
+        sipradio.cnfgDirty.pop('contacts', None)
+
+    def tearDown(self):
+        if sipradio.contJournal is not None:
+            sipradio.contJournal.close()
+        for name in self.saved:
+            setattr(sipradio, name, self.saved[name])
+        sipradio.cnfgDirty.pop('contacts', None)
+        shutil.rmtree(self.cnfgDir)
+
+    # Contact whitelist loaded from the contact list file and its journal
+    def reload(self):
+        whitelist = sipradio.loadContactList(sipradio.contListFile) if os.path.exists(sipradio.contListFile) \
+                    else sipradio.sipWhitelist()
+        sipradio.replayContactJournal(whitelist)
+        return whitelist
+
+class contactJournalTest(contactJournalBase):
+    def test_journal_replay(self):
+        self.assertEqual(sipradio.addContacts(['sip:1001@192.168.8.101', 'sip:20*']), 2)
+        self.assertEqual(sipradio.addContacts(['sip:1001@192.168.8.101']), 0)
+        self.assertEqual(sipradio.contJournalCnt, 2)
+        self.assertNotIn('contacts', sipradio.cnfgDirty)
+
+        with sipradio.contLock:
+            self.assertTrue(sipradio.siplist.remove('sip:20*'))
+            sipradio.appendContactJournal(['-sip:20*'])
+        self.assertEqual(self.reload().entries(), ['sip:1001@192.168.8.101'])
+
+    def test_compaction(self):
+        sipradio.addContacts(['sip:1001@192.168.8.101', 'sip:1002@192.168.8.101'])
+        self.assertNotIn('contacts', sipradio.cnfgDirty)
+        # Journal reach the compaction threshold, compaction are requested from the config writer
+        sipradio.addContacts(['sip:30*@192.168.8.101'])
+        self.assertIn('contacts', sipradio.cnfgDirty)
+
+        sipradio.compactContactList()
+        self.assertEqual(sipradio.contJournalCnt, 0)
+        self.assertEqual(os.path.getsize(sipradio.contJournalFile), 0)
+        self.assertEqual(self.reload().entries(), sipradio.siplist.entries())
+
+        # Update after compaction are journalled again on top of the contact list file
+        sipradio.addContacts(['sip:4001'])
+        self.assertEqual(sipradio.contJournalCnt, 1)
+        self.assertEqual(self.reload().entries(), sipradio.siplist.entries())
+        self.assertEqual(len(sipradio.siplist), 4)
+
+# SIP contact whitelist REST API - Contact are journaled before replied
+class contactApiTest(contactJournalBase):
+    def setUp(self):
+        contactJournalBase.setUp(self)
+        self.client = sipradio.app.test_client()
+
+    # Journal content, empty if nothing journaled yet
+    def journal(self):
+        if not os.path.exists(sipradio.contJournalFile):
+            return ''
+        file = open(sipradio.contJournalFile, 'r')
+        data = file.read()
+        file.close()
+        return data
+
+    def test_add_remove(self):
+        response = self.client.post('/contacts', json={'contact' : ' sip:1001@192.168.8.101 '})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json(), {'contact' : 'sip:1001@192.168.8.101', 'status' : 'ADDED'})
+        response = self.client.post('/contacts', json={'contact' : 'sip:1001@192.168.8.101'})
+        self.assertEqual((response.status_code, response.get_json()['status']), (200, 'EXIST'))
+        self.assertEqual(self.client.post('/contacts', json={'uri' : 'sip:1002'}).status_code, 400)
+        # Added contact are available for call filtering immediately
+        self.assertTrue(sipradio.siplist.match('sip:1001@192.168.8.101'))
+
+        response = self.client.delete('/contacts/sip:1001@192.168.8.101')
+        self.assertEqual((response.status_code, response.get_json()['status']), (200, 'REMOVED'))
+        response = self.client.delete('/contacts/sip:1001@192.168.8.101')
+        self.assertEqual((response.status_code, response.get_json()['status']), (404, 'NOT FOUND'))
+        self.assertEqual(self.client.get('/contacts').get_json(), {'contacts' : []})
+        self.assertEqual(self.journal(), '+sip:1001@192.168.8.101\n-sip:1001@192.168.8.101\n')
+
+    # CSV import - Header, comment, empty and duplicated line, contact at the first column
+    def test_import(self):
+        sipradio.contBatchSize = 2
+        data = (b'contact,name\n# Site A\n\n"sip:1001@192.168.8.101",Lobby\nsip:1002@192.168.8.101\n'
+                b'sip:1001@192.168.8.101\nsip:30*\n' + b'x' * (sipradio.contLineMax + 10) + b'\n@bad\n')
+        response = self.client.post('/contacts/import', data=data, content_type='text/csv')
+        self.assertEqual(response.get_json()['contactimport'], {'received' : 5, 'added' : 3, 'invalid' : 2, 'total' : 3})
+        self.assertEqual(self.reload().entries(), sipradio.siplist.entries())
+        self.assertEqual(self.client.get('/contacts').get_json()['contacts'], sipradio.siplist.entries())
+
+    def test_add_invalid(self):
+        for contact in ('sip:1@x\n-sip:2@y', 'sip:1@x\r+sip:2@y', 'sip:10\x0001@x', 'sip:1\x7f@x', '@192.168.8.101'):
+            response = self.client.post('/contacts', json={'contact' : contact})
+            self.assertEqual(response.status_code, 400, repr(contact))
+            self.assertEqual(response.get_json()['status'], 'INVALID')
+        self.assertEqual(sipradio.siplist.entries(), [])
+        self.assertEqual(self.journal(), '')
+
+        response = self.client.post('/contacts/import', data=b'sip:1001@x\nsip:10\x0102@x\nsip:1003\t@x\n')
+        self.assertEqual(response.get_json()['contactimport'], {'received' : 3, 'added' : 1, 'invalid' : 2, 'total' : 1})
+        self.assertEqual(self.journal(), '+sip:1001@x\n')
+
+# REST API data set response - JSON body cached until the data set changed, conditional GET with ETag
+class dataSetResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.client = sipradio.app.test_client()
+        self.icomLoc = sipradio.icomParamData['icomloc']
+
+    def tearDown(self):
+        sipradio.icomParamData['icomloc'] = self.icomLoc
+
+    def test_etag(self):
+        response = self.client.get('/icomconfig')
+        etag = response.headers['ETag']
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(etag, '"%s-%s"' % (sipradio.bootId, sipradio.icomParamData.version))
+        self.assertEqual(response.get_json()['intercomconfig'], [sipradio.icomParamData.snapshot()])
+        # Cached JSON body are served again while the data set NOT changed
+        cached = sipradio.dataCache['icomconfig']
+        self.assertEqual(self.client.get('/icomconfig').get_data(), response.get_data())
+        self.assertIs(sipradio.dataCache['icomconfig'], cached)
+
+        # Client already have the current version
+        response = self.client.get('/icomconfig', headers={'If-None-Match' : etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        # ETag from before the daemon restart
+        response = self.client.get('/icomconfig', headers={'If-None-Match' : '"0-%s"' % (sipradio.icomParamData.version)})
+        self.assertEqual(response.status_code, 200)
+
+        # Data set changed, new version are sent
+        sipradio.icomParamData['icomloc'] = self.icomLoc + 'X'
+        response = self.client.get('/icomconfig', headers={'If-None-Match' : etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.get_json()['intercomconfig'][0]['icomloc'], self.icomLoc + 'X')
+
+# Daemon timer scheduler - Timer heap ordering and cancel, monotonic clock are replaced by the test clock
+class timerSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.monoTime = sipradio.monoTime
+        sipradio.monoTime = lambda: self.now
+        self.sched = sipradio.timerScheduler()
+        self.fired = []
+
+    def tearDown(self):
+        sipradio.monoTime = self.monoTime
+        for fd in self.sched.wakePipe:
+            os.close(fd)
+        # Daemon timer thread wait time computed with the test clock
+        sipradio.daemonTimer.wake()
+
+    def arm(self, delay, name):
+        return self.sched.arm(delay, self.fired.append, name)
+
+    # Wake up pipe written since the last call
+    def woken(self):
+        if len(select.select([self.sched.wakePipe[0]], [], [], 0)[0]) == 0:
+            return False
+        os.read(self.sched.wakePipe[0], 4096)
+        return True
+
+    def test_deadline_order(self):
+        for delay, name in ((0.3, 'c'), (0.1, 'a1'), (0.2, 'b'), (0.1, 'a2'), (0.5, 'e')):
+            self.arm(delay, name)
+        self.now += 0.35
+        self.sched.expire()
+        # Same deadline are fired in arm order
+        self.assertEqual(self.fired, ['a1', 'a2', 'b', 'c'])
+        self.assertEqual(self.sched.stats()['armed'], 1)
+
+        self.now += 1.0
+        self.sched.expire()
+        self.assertEqual(self.fired, ['a1', 'a2', 'b', 'c', 'e'])
+        self.assertEqual(self.sched.fired, 5)
+
+    def test_random_order(self):
+        rand = random.Random(17)
+        delays = [ rand.randint(1, 1000) / 1000.0 for i in range(500) ]
+        for i in range(len(delays)):
+            self.arm(delays[i], (delays[i], i))
+        for step in range(10):
+            self.now += 0.1
+            self.sched.expire()
+        self.assertEqual(self.fired, sorted(self.fired))
+        self.assertEqual(len(self.fired), len(delays))
+
+    def test_cancel(self):
+        first = self.arm(0.1, 'a')
+        second = self.arm(0.2, 'b')
+        self.arm(0.3, 'c')
+        self.assertTrue(self.sched.cancel(second))
+        self.assertFalse(self.sched.cancel(second))
+        self.assertFalse(self.sched.cancel(None))
+        self.assertFalse(second.pending)
+
+        self.now += 0.15
+        self.sched.expire()
+        self.assertFalse(first.pending)
+        self.assertFalse(self.sched.cancel(first))
+
+        self.now += 1.0
+        self.sched.expire()
+        self.assertEqual(self.fired, ['a', 'c'])
+
+    def test_wake_up(self):
+        self.arm(1.0, 'a')
+        self.assertTrue(self.woken())
+        # Later deadline do NOT change the scheduler wait time
+        later = self.arm(2.0, 'b')
+        self.assertFalse(self.woken())
+        self.assertTrue(self.sched.cancel(later))
+        self.assertFalse(self.woken())
+        # New earliest deadline and cancelling the earliest timer wake up the scheduler
+        earliest = self.arm(0.5, 'c')
+        self.assertTrue(self.woken())
+        self.assertTrue(self.sched.cancel(earliest))
+        self.assertTrue(self.woken())
+
+    def test_callback_error(self):
+        def failed():
+            raise ValueError('callback error')
+        self.sched.arm(0.1, failed)
+        self.arm(0.2, 'a')
+        self.now += 1.0
+        self.sched.expire()
+        self.assertEqual(self.fired, ['a'])
+
+# PTT state machine - Manual PTT, PTT time out, call end, PTT mode and intercom transition of one radio channel
+class pttFsmTest(unittest.TestCase):
+    def setUp(self):
+        startDaemonTimer()
+        self.chan = newChannel()
+        self.chan.pttModeOper = 1
+        self.chan.pttEnDis = True
+        self.chan.callconn = True
+        self.chan.pttTimeOut = 0
+
+    # Current (PTT control, PTT mode relay) GPIO level
+    def outputs(self):
+        return self.chan.gpioLevel[self.chan.pttPin], self.chan.gpioLevel[self.chan.modePin]
+
+    def test_manual_ptt(self):
+        HIGH, LOW = sipradio.GPIO.HIGH, sipradio.GPIO.LOW
+        self.assertEqual(sipradio.manualPtt(self.chan, True, 'WS'), 'ACK')
+        self.assertEqual((self.chan.pttState, self.outputs()), ('ON', (HIGH, HIGH)))
+        self.assertEqual(self.chan.daemonStat['pttstatus'], 'ON')
+        self.assertEqual(sipradio.manualPtt(self.chan, True, 'DTMF'), 'BUSY')
+        self.assertEqual(self.chan.pttSrc, 'WS')
+
+        self.assertEqual(sipradio.manualPtt(self.chan, False, 'SIP'), 'ACK')
+        self.assertEqual((self.chan.pttState, self.outputs()), ('OFF', (LOW, LOW)))
+        self.assertEqual(self.chan.daemonStat['pttstatus'], 'OFF')
+        self.assertEqual(sipradio.manualPtt(self.chan, False, 'SIP'), 'IDLE')
+        self.assertEqual([ entry[1:] for entry in self.chan.pttLog ],
+                         [('WS', 'PTT_ON', 'OFF', 'ON'), ('SIP', 'PTT_OFF', 'ON', 'OFF')])
+
+    # Manual PTT only in Mode 1 and 3, PTT enable and the call connected
+    def test_manual_ptt_guard(self):
+        for field, value in (('callconn', False), ('pttModeOper', 2), ('pttEnDis', False)):
+            saved = getattr(self.chan, field)
+            setattr(self.chan, field, value)
+            self.assertEqual(sipradio.manualPtt(self.chan, True, 'WS'), 'DENIED', field)
+            self.assertEqual(sipradio.manualPtt(self.chan, False, 'WS'), 'DENIED', field)
+            setattr(self.chan, field, saved)
+        self.assertEqual(self.chan.pttState, 'OFF')
+        self.assertEqual(len(self.chan.pttLog), 0)
+
+    # Mode 3 - PTT mode relay always ON, call END release the PTT control only
+    def test_mode3_call_end(self):
+        HIGH, LOW = sipradio.GPIO.HIGH, sipradio.GPIO.LOW
+        self.chan.pttModeOper = 3
+        self.assertEqual(sipradio.pttEvent(self.chan, 'MODE', 'CFG'), 'ACK')
+        self.assertEqual(self.outputs(), (LOW, HIGH))
+        self.assertEqual(sipradio.manualPtt(self.chan, True, 'DTMF'), 'ACK')
+        self.assertEqual(sipradio.pttEvent(self.chan, 'CALL_END', 'CALL'), 'ACK')
+        self.assertEqual((self.chan.pttState, self.outputs()), ('OFF', (LOW, HIGH)))
+        self.assertEqual(sipradio.pttEvent(self.chan, 'CALL_END', 'CALL'), 'IDLE')
+
+    def test_timeout(self):
+        self.chan.pttTimeOut = 0.2
+        self.assertEqual(sipradio.manualPtt(self.chan, True, 'WS'), 'ACK')
+        # PTT time out timer still pending
+        self.assertEqual(sipradio.pttEvent(self.chan, 'TIMEOUT', 'TOUT'), 'DENIED')
+        self.assertTrue(waitFor(lambda: self.chan.pttState == 'OFF'))
+        self.assertEqual(self.chan.pttLog[-1][1:], ('TOUT', 'TIMEOUT', 'ON', 'OFF'))
+
+        # PTT released before time out, timer are cancelled
+        self.assertEqual(sipradio.manualPtt(self.chan, True, 'WS'), 'ACK')
+        timer = self.chan.pttTimer
+        self.assertEqual(sipradio.manualPtt(self.chan, False, 'WS'), 'ACK')
+        self.assertIsNone(self.chan.pttTimer)
+        self.assertFalse(sipradio.daemonTimer.cancel(timer))
+
+    # Intercom mode - PTT always ON, manual PTT and PTT time out are NOT valid
+    def test_intercom(self):
+        HIGH, LOW = sipradio.GPIO.HIGH, sipradio.GPIO.LOW
+        self.assertEqual(sipradio.manualPtt(self.chan, True, 'WS'), 'ACK')
+        self.assertEqual(sipradio.pttEvent(self.chan, 'ICOM_ON', 'ICOM'), 'ACK')
+        self.assertEqual((self.chan.pttState, self.outputs()), ('ICOM', (HIGH, HIGH)))
+        for event in ('PTT_ON', 'PTT_OFF', 'TIMEOUT', 'CALL_END', 'MODE'):
+            self.assertEqual(sipradio.pttEvent(self.chan, event, 'WS'), 'DENIED', event)
+        self.assertEqual(sipradio.pttEvent(self.chan, 'ICOM_OFF', 'ICOM'), 'ACK')
+        self.assertEqual((self.chan.pttState, self.outputs()), ('OFF', (LOW, LOW)))
+        self.assertEqual(self.chan.daemonStat['pttstatus'], 'OFF')
+
+# Daemon status of PTT and VOX mode - Published as a single status event
+class daemonModeStatTest(unittest.TestCase):
+    def setUp(self):
+        self.chan = newChannel()
+        self.events = []
+        self.chan.daemonStat.publish = self.events.append
+
+    def test_roip_mode(self):
+        self.chan.pttModeOper = 2
+        self.chan.voxMode = '1'
+        sipradio.initRoIpMode(self.chan, {'intercom' : 'DISABLE', 'callstatus' : 'LISTENING'})
+        self.assertEqual(self.events, [{'id' : self.chan.daemonStat['id'], 'pttmode' : 'Mode 2', 'voxmode' : 'Mode 1'}])
+
+        self.chan.pttModeOper = 3
+        self.chan.voxMode = '2'
+        self.chan.daemonStat['intercom'] = 'ENABLE'
+        del self.events[:]
+        sipradio.initRoIpMode(self.chan, {'intercom' : 'DISABLE'})
+        self.assertEqual(self.events, [{'id' : self.chan.daemonStat['id'], 'pttmode' : 'Mode 3', 'voxmode' : 'Mode 2',
+                                        'intercom' : 'DISABLE'}])
+
+    def test_ptt_mode(self):
+        self.chan.pttModeOper = 3
+        self.chan.voxMode = '1'
+        self.chan.initPttMode()
+        self.assertEqual(self.events, [{'id' : self.chan.daemonStat['id'], 'pttmode' : 'Mode 3', 'voxmode' : 'Mode 1'}])
+
+# Stream web server request - Percent-encoded WebSocket PTT control query parameter
+class streamRequestTest(unittest.TestCase):
+    def setUp(self):
+        self.chan = newChannel()
+        self.chan.pttToken = 'k+9/x=='
+        sipradio.channels[self.chan.chanId] = self.chan
+
+    def tearDown(self):
+        del sipradio.channels[self.chan.chanId]
+
+    def request(self, queryStr):
+        client = sipradio.streamClient(None, ('127.0.0.1', 0))
+        client.inBuf = ('GET /ptt?%s HTTP/1.1\r\nUpgrade: websocket\r\nSec-WebSocket-Key: dGVzdA==\r\n\r\n' %
+                        (queryStr)).encode()
+        self.assertTrue(sipradio.parseStreamRequest(client))
+        return client
+
+    def test_ptt_token(self):
+        chanQuery = ''.join([ '%%%02X' % (ord(c)) for c in self.chan.chanId ])
+        client = self.request('token=k%2B9%2Fx%3D%3D&channel=' + chanQuery)
+        self.assertTrue(client.outBuf.startswith(b'HTTP/1.1 101 '))
+        self.assertIs(client.chan, self.chan)
+
+        client = self.request('to%6Ben=k%2B9%2Fx%3D%3D&channel=' + self.chan.chanId)
+        self.assertTrue(client.outBuf.startswith(b'HTTP/1.1 101 '))
+
+        client = self.request('token=k%2B9%2Fx%3D&channel=' + self.chan.chanId)
+        self.assertTrue(client.outBuf.startswith(b'HTTP/1.1 401 '))
+
+# VOX controller serial writer and reader - Channel serial port are the RIH VOX controller simulator pty
+class voxSerialBase(unittest.TestCase):
+    writerStarted = True   # Serial writer started by setUp, otherwise by the test
+
+    def setUp(self):
+        startDaemonTimer()
+        self.saved = dict((name, getattr(sipradio, name)) for name in ('voxAliveIntv', 'voxTxnBudget'))
+        sipradio.voxAliveIntv = 3600
+        self.tmpDir = tempfile.mkdtemp(prefix='sipradio-test-')
+        self.sim = sipradio.rihSimulator(self.tmpDir + '/rihsim', seed=17)
+        self.chan = newChannel(self.sim.linkPath)
+        if self.writerStarted == True:
+            self.startWriter()
+
+    def startWriter(self):
+        sipradio.thread.start_new_thread(sipradio.serial_vox_comm, ("[serial_vox_comm_test]", self.chan))
+
+    def tearDown(self):
+        for name in self.saved:
+            setattr(sipradio, name, self.saved[name])
+        shutil.rmtree(self.tmpDir)
+
+    # Reply to the first command with the command code are lost, the command are still applied by the simulator
+    def loseReply(self, cmdCode):
+        answer = self.sim.answer
+        lost = []
+
+        def lossyAnswer(payload):
+            self.sim.loss = 1.0 if payload[:4] == cmdCode and len(lost) == 0 else 0.0
+            if self.sim.loss > 0.0:
+                lost.append(payload)
+            answer(payload)
+        self.sim.answer = lossyAnswer
+
+class voxSerialTest(voxSerialBase):
+    # Send ALIVE request now
+    def alive(self):
+        self.chan.voxTxQueue.put(('ALIVE', ))
+
+    # Serial link lost - ALIVE request can NOT be sent, VOX controller OFFLINE after voxAliveMiss request in a row
+    def test_alive_serial_lost(self):
+        self.alive()
+        self.assertTrue(waitFor(lambda: self.chan.daemonStat['voxstatus'] == 'ALIVE'))
+
+        self.sim.drop(3600)
+        self.assertTrue(waitFor(lambda: self.chan.voxStat['linkdown'] == 1))
+        for i in range(sipradio.voxAliveMiss):
+            self.alive()
+        time.sleep(0.2)
+        self.assertEqual(self.chan.daemonStat['voxstatus'], 'ALIVE')
+        self.alive()
+        self.assertTrue(waitFor(lambda: self.chan.daemonStat['voxstatus'] == 'OFFLINE'))
+        self.assertEqual(self.chan.voxStat['missedalive'], sipradio.voxAliveMiss)
+
+# VOX config command queue - Queued parameter are coalesced and sent with its latest value, parameter already
+# acknowledged with the same value are skipped. Config command are queued before the serial writer started
+class voxSendTest(voxSerialBase):
+    writerStarted = False
+
+    # Update a Mode 2 parameter as the REST API do
+    def update(self, cmdType, value):
+        sipradio.voxBackup(self.chan, cmdType)
+        setattr(self.chan, sipradio.voxBackupAttr[cmdType][0], value)
+        sipradio.voxSend(self.chan, cmdType)
+
+    def idle(self):
+        return waitFor(lambda: self.chan.commBusy == False and self.chan.voxTxQueue.qsize() == 0)
+
+    def test_coalescing(self):
+        self.chan.delayvalue = '95'
+        for value in ('100', '110', '120'):
+            self.update(5, value)
+        self.update(6, '300')
+        self.assertEqual(self.chan.voxStat['coalesced'], 2)
+        self.assertEqual(self.chan.voxTxQueue.qsize(), 2)
+        self.assertEqual(sipradio.voxCmdState(self.chan)['pending'], ['delayvalue', 'thresholdvalue'])
+        # Backup are the value before the first queued update
+        self.assertEqual(self.chan.pDelayvalue, '95')
+
+        self.startWriter()
+        self.assertTrue(self.idle())
+        self.assertEqual((self.sim.params['0201'], self.sim.params['0202']), ('120', '300'))
+        self.assertEqual(self.sim.stat['commands'], 2)
+        self.assertEqual(self.chan.voxStat['commands'], 2)
+
+    def test_skip_acked(self):
+        self.startWriter()
+        self.update(5, '100')
+        self.assertTrue(self.idle())
+        self.assertEqual(self.chan.voxAcked['0201'], '<0201100>')
+
+        # Same value again - NOT sent to VOX controller
+        self.update(5, '100')
+        self.assertTrue(self.idle())
+        self.assertEqual(self.chan.voxStat['skipped'], 1)
+        self.assertEqual(self.sim.stat['commands'], 1)
+
+        self.update(5, '101')
+        self.assertTrue(self.idle())
+        self.assertEqual((self.sim.params['0201'], self.sim.stat['commands'], self.chan.voxStat['commands']), ('101', 2, 2))
+
+# VOX profile transaction - All ACK commit, NAK and time out rollback, abandoned caller and restore of every changed
+# parameter. VOX controller are at Mode 1 with the base profile (Mode 2 parameter also known) before each test
+class voxProfileTest(voxSerialBase):
+    baseProfile = {
+        '2' : {'delayvalue' : '95', 'thresholdvalue' : '267'},
+        '1' : {'delayaindiv' : '5', 'delayvaladd' : '2', 'threshmultp' : '0.8', 'threshadd' : '70'}
+    }
+
+    def setUp(self):
+        voxSerialBase.setUp(self)
+        for mode in ('2', '1'):
+            self.assertEqual(sipradio.voxApplyProfile(self.chan, mode, dict(self.baseProfile[mode])).status, 'APPLIED')
+        self.baseParams = dict(self.sim.params)
+
+    # Parameter of the base profile are kept by the daemon and restored at the simulator
+    def assertBaseProfile(self):
+        self.assertTrue(waitFor(lambda: self.sim.params == self.baseParams and self.sim.voxMode == '1'),
+                        (self.sim.voxMode, self.sim.params))
+        self.assertEqual(self.chan.voxMode, '1')
+        for mode in self.baseProfile:
+            for field in self.baseProfile[mode]:
+                self.assertEqual(getattr(self.chan, field), self.baseProfile[mode][field])
+        self.assertEqual(self.chan.daemonStat['voxmode'], 'Mode 1')
+
+    def test_commit(self):
+        txn = sipradio.voxApplyProfile(self.chan, '2', {'delayvalue' : '111', 'thresholdvalue' : '222'})
+        self.assertEqual(txn.status, 'APPLIED')
+        self.assertEqual((self.chan.voxMode, self.chan.delayvalue, self.chan.thresholdvalue), ('2', '111', '222'))
+        self.assertEqual(self.chan.voxParamData['delayvalue'], '111')
+        self.assertEqual(self.chan.daemonStat['voxmode'], 'Mode 2')
+        self.assertEqual((self.sim.voxMode, self.sim.params['0201'], self.sim.params['0202']), ('2', '111', '222'))
+        self.assertEqual(self.chan.voxAcked, {'0201' : '<0201111>', '0202' : '<0202222>'})
+
+    def test_nak_rollback(self):
+        # Last command rejected by VOX controller (invalid parameter character)
+        txn = sipradio.voxApplyProfile(self.chan, '1', {'delayaindiv' : '3', 'delayvaladd' : '9', 'threshmultp' : '0.5',
+                                                       'threshadd' : 'AB'})
+        self.assertEqual(txn.status, 'ROLLBACK')
+        self.assertEqual(txn.acked, 3)
+        self.assertBaseProfile()
+        self.assertEqual(self.chan.voxStat['rollbacks'], 1)
+
+    def test_timeout_rollback(self):
+        sipradio.voxTxnBudget = 0.3
+        # Last command applied by VOX controller, its ACK lost
+        self.loseReply('0104')
+        txn = sipradio.voxApplyProfile(self.chan, '1', {'delayaindiv' : '3', 'delayvaladd' : '9', 'threshmultp' : '0.5',
+                                                       'threshadd' : '55'})
+        self.assertEqual(txn.status, 'ROLLBACK')
+        self.assertEqual(self.chan.voxStat['timeouts'], 1)
+        self.assertBaseProfile()
+
+    # VOX mode changed by the rolled back transaction - Parameter of the new mode already applied are restored too,
+    # then the VOX controller are back to the previous mode
+    def test_mode_change_restore(self):
+        sipradio.voxTxnBudget = 0.3
+        self.loseReply('0202')
+        txn = sipradio.voxApplyProfile(self.chan, '2', {'delayvalue' : '111', 'thresholdvalue' : '222'})
+        self.assertEqual(txn.status, 'ROLLBACK')
+        self.assertBaseProfile()
+        # Acknowledged command are the restored value, NOT the transaction value
+        self.assertTrue(waitFor(lambda: self.chan.voxAcked.get('0101') == '<010105>'))
+        self.assertNotIn('<0202222>', self.chan.voxAcked.values())
+        self.assertNotIn('<0201111>', self.chan.voxAcked.values())
+
+    # Caller stop waiting - Transaction are NOT applied, even when all ACK received afterward
+    def test_abandoned(self):
+        chan = newChannel()
+        chan.voxMode = '1'
+        chan.delayvalue = '95'
+        chan.thresholdvalue = '267'
+        sipradio.voxTxnBudget = 0.05
+        # No serial writer for this channel, transaction never started
+        txn = sipradio.voxApplyProfile(chan, '2', {'delayvalue' : '111', 'thresholdvalue' : '222'})
+        self.assertEqual(txn.status, 'TIMEOUT')
+        self.assertTrue(txn.abandoned)
+        self.assertIs(chan.voxTxQueue.get_nowait()[1], txn)
+
+        # All ACK received after the caller stop waiting
+        txn.acked = len(txn.commands)
+        restore = sipradio.voxTxnCommit(chan, txn)
+        self.assertEqual(txn.status, 'TIMEOUT')
+        self.assertEqual((chan.voxMode, chan.delayvalue, chan.thresholdvalue), ('1', '95', '267'))
+        self.assertTrue(restore.restore)
+        self.assertEqual([ command for cmdType, command in restore.commands ],
+                         ['<0202267>', '<0201095>', sipradio.voxFrame(1, chan.delayaindiv)])
+
+if __name__ == '__main__':
+    unittest.main()